@@ -0,0 +1,96 @@
+"""
+批量启动工作流基准
+
+对比逐个 await start_workflow（等同于逐次调用 POST /workflows/cleaning/start）
+与 WorkflowService.start_workflows 受限并发批量启动的总耗时。
+
+默认启动本地 Temporal 开发服务器（首次运行需下载）；无法下载时可用
+--simulated-latency 以固定 RPC 延迟的假客户端对比。
+
+运行:
+    python -m benchmarks.bench_bulk_start
+    python -m benchmarks.bench_bulk_start --simulated-latency 0.005
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from types import SimpleNamespace
+from typing import Any, List, Optional
+
+from temporalio.testing import WorkflowEnvironment
+
+from src.services.workflow_service import WorkflowService, WorkflowStartRequest
+from src.workflows.registry import WORKFLOW_TYPE_ATTRIBUTE
+
+WORKFLOWS = 500
+CONCURRENCY_LEVELS = [8, 32, 64]
+
+
+class _SimulatedClient:
+    """每次 start_workflow 固定延迟的假客户端"""
+
+    def __init__(self, latency: float):
+        self._latency = latency
+
+    async def start_workflow(self, *args: Any, id: str, **kwargs: Any) -> Any:
+        await asyncio.sleep(self._latency)
+        return SimpleNamespace(id=id)
+
+
+def _requests(n: int) -> List[WorkflowStartRequest]:
+    return [WorkflowStartRequest(input={"floor_id": f"floor-{i % 30 + 1}"}) for i in range(n)]
+
+
+async def _sequential(service: WorkflowService, n: int) -> float:
+    start = time.perf_counter()
+    for i in range(n):
+        await service.start_cleaning_workflow(floor_id=f"floor-{i % 30 + 1}")
+    return time.perf_counter() - start
+
+
+async def _bulk(service: WorkflowService, n: int, concurrency: int) -> float:
+    start = time.perf_counter()
+    results = await service.start_workflows(
+        "cleaning", _requests(n), batch_id=uuid.uuid4().hex[:8], concurrency=concurrency
+    )
+    elapsed = time.perf_counter() - start
+    failed = [r for r in results if not r.success]
+    if failed:
+        raise RuntimeError(f"{len(failed)} starts failed: {failed[0].error}")
+    return elapsed
+
+
+async def _run(service: WorkflowService, n: int) -> None:
+    sequential = await _sequential(service, n)
+    print(f"{'mode':>18} {'total (s)':>10} {'starts/s':>10} {'speedup':>9}")
+    print(f"{'sequential':>18} {sequential:>10.2f} {n / sequential:>10.0f} {'1.0x':>9}")
+    for concurrency in CONCURRENCY_LEVELS:
+        elapsed = await _bulk(service, n, concurrency)
+        print(
+            f"{'bulk c=' + str(concurrency):>18} {elapsed:>10.2f} {n / elapsed:>10.0f} "
+            f"{sequential / elapsed:>8.1f}x"
+        )
+
+
+async def main(simulated_latency: Optional[float], n: int) -> None:
+    if simulated_latency is not None:
+        print(f"{n} cleaning workflows, simulated RPC latency {simulated_latency * 1000:.1f}ms")
+        await _run(WorkflowService(_SimulatedClient(simulated_latency)), n)
+        return
+
+    # 未启动 Worker：只测启动耗时，工作流停留在 Running 状态
+    async with await WorkflowEnvironment.start_local(
+        search_attributes=[WORKFLOW_TYPE_ATTRIBUTE]
+    ) as env:
+        print(f"{n} cleaning workflows, local Temporal dev server")
+        await _run(WorkflowService(env.client), n)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--simulated-latency", type=float, default=None, metavar="SECONDS")
+    parser.add_argument("-n", type=int, default=WORKFLOWS)
+    args = parser.parse_args()
+    asyncio.run(main(args.simulated_latency, args.n))
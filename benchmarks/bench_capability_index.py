@@ -0,0 +1,88 @@
+"""
+能力索引微基准
+
+对比 TaskDispatcher.find_available_agents 的索引查找与原全量扫描
+在不同机队规模下的单次查找耗时。
+
+运行:
+    python -m benchmarks.bench_capability_index
+"""
+
+import random
+import timeit
+from typing import List
+
+from src.services.capability_index import capability_matches
+from src.services.task_dispatcher import AgentInfo, TaskDispatcher
+
+FLEET_SIZES = [100, 1_000, 10_000, 50_000]
+
+CAPABILITY_POOL = [
+    "cleaning.floor.standard",
+    "cleaning.floor.deep",
+    "cleaning.floor.quick",
+    "cleaning.window",
+    "delivery.*",
+    "patrol.*",
+    "elevator.call",
+    "door.open",
+    "door.close",
+    "access.grant",
+]
+
+QUERIES = ["cleaning.floor.standard", "delivery.package", "site-7.patrol.night"]
+
+
+def _build_dispatcher(size: int) -> TaskDispatcher:
+    rng = random.Random(size)
+    dispatcher = TaskDispatcher()
+    for i in range(size):
+        capabilities = rng.sample(CAPABILITY_POOL, 3)
+        # 按站点划分的专用能力，每个站点约 1% 的 Agent 具备
+        capabilities.append(f"site-{i % 100}.patrol.*")
+        dispatcher.register_agent(
+            AgentInfo(
+                agent_id=f"agent-{i:06d}",
+                agent_type="robot" if i % 4 else "facility",
+                capabilities=capabilities,
+                status="ready" if i % 10 else "busy",
+                max_load=5,
+            )
+        )
+    return dispatcher
+
+
+def _linear_scan(dispatcher: TaskDispatcher, capability: str) -> List[AgentInfo]:
+    """原实现：遍历全部 Agent 并逐条匹配能力"""
+    return [
+        agent
+        for agent in dispatcher._agents.values()
+        if agent.status == "ready"
+        and agent.current_load < agent.max_load
+        and any(capability_matches(cap, capability) for cap in agent.capabilities)
+    ]
+
+
+def main() -> None:
+    print(f"{'agents':>8} {'query':<26} {'scan (us)':>12} {'index (us)':>12} {'speedup':>9}")
+    for size in FLEET_SIZES:
+        dispatcher = _build_dispatcher(size)
+        number = max(1, 20_000 // size)
+        for query in QUERIES:
+            assert {a.agent_id for a in _linear_scan(dispatcher, query)} == {
+                a.agent_id for a in dispatcher.find_available_agents(query)
+            }
+            scan = timeit.timeit(lambda: _linear_scan(dispatcher, query), number=number)
+            indexed = timeit.timeit(
+                lambda: dispatcher.find_available_agents(query), number=number
+            )
+            scan_us = scan / number * 1e6
+            index_us = indexed / number * 1e6
+            print(
+                f"{size:>8} {query:<26} {scan_us:>12.1f} {index_us:>12.1f} "
+                f"{scan_us / index_us:>8.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+JSON 响应序列化基准
+
+以 10k Agent 列表（GET /api/v1/tasks/agents 的响应内容）对比：
+- FastAPI 默认路径：jsonable_encoder 逐项转换 + 标准库 json
+- jsonable_encoder + orjson（仅替换默认响应类）
+- 直接返回 FastJSONResponse（orjson，跳过 jsonable_encoder）
+- FastJSONResponse 在未安装 orjson 时的标准库回退
+
+运行:
+    python -m benchmarks.bench_json_response
+"""
+
+import argparse
+import json
+import time
+from typing import Any, Callable, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+
+from src.api import responses
+from src.api.responses import FastJSONResponse
+
+AGENTS = 10_000
+ROUNDS = 20
+
+
+def _agents(n: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "agent_id": f"robot-{i:05d}",
+            "agent_type": "cleaning_robot" if i % 2 else "delivery_robot",
+            "capabilities": ["cleaning", "mopping", "vacuum"][: i % 3 + 1],
+            "status": "idle",
+            "current_load": i % 4,
+            "max_load": 5,
+        }
+        for i in range(n)
+    ]
+
+
+def _stdlib_default(content: Any) -> bytes:
+    # 与 starlette JSONResponse.render 一致
+    return json.dumps(
+        jsonable_encoder(content),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def _encoder_orjson(content: Any) -> bytes:
+    return FastJSONResponse(jsonable_encoder(content)).body
+
+
+def _fast(content: Any) -> bytes:
+    return FastJSONResponse(content).body
+
+
+def _fast_without_orjson(content: Any) -> bytes:
+    orjson, responses.orjson = responses.orjson, None
+    try:
+        return FastJSONResponse(content).body
+    finally:
+        responses.orjson = orjson
+
+
+def _measure(render: Callable[[Any], bytes], content: Any, rounds: int) -> float:
+    render(content)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        render(content)
+    return (time.perf_counter() - start) / rounds
+
+
+def main(n: int, rounds: int) -> None:
+    content = _agents(n)
+    assert json.loads(_fast(content)) == json.loads(_stdlib_default(content))
+
+    cases = [
+        ("jsonable_encoder + json", _stdlib_default),
+        ("jsonable_encoder + orjson", _encoder_orjson),
+        ("FastJSONResponse", _fast),
+        ("FastJSONResponse (no orjson)", _fast_without_orjson),
+    ]
+    print(f"{n} agents, {rounds} rounds")
+    print(f"{'mode':>30} {'ms/response':>12} {'speedup':>9}")
+    baseline = None
+    for name, render in cases:
+        elapsed = _measure(render, content, rounds)
+        baseline = baseline or elapsed
+        print(f"{name:>30} {elapsed * 1000:>12.2f} {baseline / elapsed:>8.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=AGENTS)
+    parser.add_argument("--rounds", type=int, default=ROUNDS)
+    args = parser.parse_args()
+    main(args.n, args.rounds)
@@ -0,0 +1,180 @@
+"""
+本地 Activity 基准
+
+在本地 Temporal 开发服务器上（首次运行需下载）运行 RobotCleaningWorkflow，对比
+普通 Activity 与将门禁 / 通知类 Activity 改为本地 Activity 后的历史事件数与端到端耗时。
+Activity 使用同名的假实现（固定延迟），只衡量编排开销。
+
+运行:
+    python -m benchmarks.bench_local_activities
+    python -m benchmarks.bench_local_activities -n 50 --activity-latency 0.002
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Set
+
+from temporalio import activity
+from temporalio.client import Client
+from temporalio.testing import WorkflowEnvironment
+from temporalio.worker import Worker
+
+from src.activities.robot import RobotTaskParams
+from src.workers.routing import ActivityRoutingInterceptor
+from src.workflows.cleaning import CleaningWorkflowInput, RobotCleaningWorkflow
+
+WORKFLOWS = 20
+ACTIVITY_LATENCY = 0.002
+LOCAL_ACTIVITIES = {
+    "open_door",
+    "close_door",
+    "get_doors_on_route",
+    "send_task_update",
+    "send_notification",
+}
+
+_latency = ACTIVITY_LATENCY
+
+
+@activity.defn(name="get_floor_status")
+async def _get_floor_status(floor_id: str) -> Dict[str, Any]:
+    await asyncio.sleep(_latency)
+    return {"floor_id": floor_id, "status": "normal"}
+
+
+@activity.defn(name="find_available_robot")
+async def _find_available_robot(
+    capability: str, preferred_floor: Optional[int] = None
+) -> Optional[Dict[str, Any]]:
+    await asyncio.sleep(_latency)
+    return {"robot_id": "robot-001"}
+
+
+@activity.defn(name="get_doors_on_route")
+async def _get_doors_on_route(start_location: str, end_location: str) -> List[str]:
+    await asyncio.sleep(_latency)
+    return ["door-001", "door-002"]
+
+
+@activity.defn(name="open_door")
+async def _open_door(door_id: str, requester_id: str, hold_seconds: int = 30) -> Dict[str, Any]:
+    await asyncio.sleep(_latency)
+    return {"door_id": door_id, "status": "opened"}
+
+
+@activity.defn(name="call_elevator")
+async def _call_elevator(
+    from_floor: int, to_floor: int, robot_id: str, robot_size: str = "medium"
+) -> Dict[str, Any]:
+    await asyncio.sleep(_latency)
+    return {"status": "arrived"}
+
+
+@activity.defn(name="grant_zone_access")
+async def _grant_zone_access(
+    zone_id: str, entity_id: str, entity_type: str, duration_minutes: int
+) -> Dict[str, Any]:
+    await asyncio.sleep(_latency)
+    return {"access_id": f"access-{zone_id}"}
+
+
+@activity.defn(name="assign_task_to_robot")
+async def _assign_task_to_robot(params: RobotTaskParams) -> Dict[str, Any]:
+    await asyncio.sleep(_latency)
+    return {"status": "assigned", "task_id": f"task-{uuid.uuid4().hex[:8]}"}
+
+
+@activity.defn(name="wait_for_robot_task_completion")
+async def _wait_for_robot_task_completion(
+    task_id: str, timeout_seconds: int = 3600
+) -> Dict[str, Any]:
+    await asyncio.sleep(_latency)
+    return {"status": "completed", "result": {"duration_minutes": 30, "area_cleaned_sqm": 200}}
+
+
+@activity.defn(name="send_notification")
+async def _send_notification(
+    message: str,
+    channel: str,
+    recipients: Optional[List[str]] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    await asyncio.sleep(_latency)
+    return {"status": "sent"}
+
+
+ACTIVITIES = [
+    _get_floor_status,
+    _find_available_robot,
+    _get_doors_on_route,
+    _open_door,
+    _call_elevator,
+    _grant_zone_access,
+    _assign_task_to_robot,
+    _wait_for_robot_task_completion,
+    _send_notification,
+]
+
+
+async def _run(client: Client, local_activities: Set[str], n: int) -> Dict[str, float]:
+    queue = f"bench-local-activities-{uuid.uuid4().hex[:8]}"
+    worker = Worker(
+        client,
+        task_queue=queue,
+        workflows=[RobotCleaningWorkflow],
+        activities=ACTIVITIES,
+        interceptors=[ActivityRoutingInterceptor({}, local_activities)],
+    )
+    durations: List[float] = []
+    events: List[int] = []
+    async with worker:
+        for _ in range(n):
+            start = time.perf_counter()
+            handle = await client.start_workflow(
+                RobotCleaningWorkflow.run,
+                CleaningWorkflowInput(floor_id="floor-3"),
+                id=f"bench-cleaning-{uuid.uuid4().hex}",
+                task_queue=queue,
+            )
+            result = await handle.result()
+            durations.append(time.perf_counter() - start)
+            assert result.success, result.message
+            history = await handle.fetch_history()
+            events.append(len(history.events))
+    return {
+        "events": statistics.mean(events),
+        "p50_ms": statistics.median(durations) * 1000,
+        "mean_ms": statistics.mean(durations) * 1000,
+    }
+
+
+async def main(n: int) -> None:
+    async with await WorkflowEnvironment.start_local() as env:
+        print(
+            f"RobotCleaningWorkflow x {n}, floor-3 (2 doors + elevator), "
+            f"activity latency {_latency * 1000:.1f}ms, local Temporal dev server"
+        )
+        print(f"{'mode':>10} {'history events':>15} {'p50 (ms)':>10} {'mean (ms)':>10}")
+        baseline = await _run(env.client, set(), n)
+        local = await _run(env.client, LOCAL_ACTIVITIES, n)
+        for name, stats in (("activity", baseline), ("local", local)):
+            print(
+                f"{name:>10} {stats['events']:>15.0f} {stats['p50_ms']:>10.1f} "
+                f"{stats['mean_ms']:>10.1f}"
+            )
+        print(
+            f"history -{1 - local['events'] / baseline['events']:.0%}, "
+            f"p50 latency -{1 - local['p50_ms'] / baseline['p50_ms']:.0%}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=WORKFLOWS)
+    parser.add_argument("--activity-latency", type=float, default=ACTIVITY_LATENCY)
+    args = parser.parse_args()
+    _latency = args.activity_latency
+    asyncio.run(main(args.n))
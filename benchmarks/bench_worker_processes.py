@@ -0,0 +1,121 @@
+"""
+Worker 多进程吞吐基准
+
+在本地 Temporal 开发服务器上（首次运行需下载），用 WorkerSupervisor 启动 1..N 个
+Worker 进程轮询同一任务队列，执行一批纯 CPU 的工作流，对比完成耗时。
+工作流代码在 GIL 下运行，单进程的工作流任务吞吐受限于一个核。
+
+运行:
+    python -m benchmarks.bench_worker_processes
+    python -m benchmarks.bench_worker_processes -n 400 --iterations 200000 --processes 1 2 4
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import time
+import uuid
+from typing import List
+
+from temporalio import workflow
+from temporalio.client import Client
+from temporalio.testing import WorkflowEnvironment
+from temporalio.worker import UnsandboxedWorkflowRunner, Worker
+
+from src.workers.supervisor import WorkerSupervisor
+
+WORKFLOWS = 400
+ITERATIONS = 200_000
+
+# 子进程通过环境变量获取服务器地址和任务队列（spawn 时继承）
+_ADDRESS_ENV = "BENCH_TEMPORAL_ADDRESS"
+_QUEUE_ENV = "BENCH_TASK_QUEUE"
+
+
+@workflow.defn
+class CpuBoundWorkflow:
+    """一次激活内完成的纯计算工作流"""
+
+    @workflow.run
+    async def run(self, iterations: int) -> int:
+        total = 0
+        for i in range(iterations):
+            total += i * i % 7
+        return total
+
+
+async def _serve(heartbeat) -> None:
+    client = await Client.connect(os.environ[_ADDRESS_ENV])
+    stop = asyncio.Event()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+    worker = Worker(
+        client,
+        task_queue=os.environ[_QUEUE_ENV],
+        workflows=[CpuBoundWorkflow],
+        workflow_runner=UnsandboxedWorkflowRunner(),
+    )
+    async with worker:
+        while not stop.is_set():
+            heartbeat.value = time.time()
+            try:
+                await asyncio.wait_for(stop.wait(), 1.0)
+            except asyncio.TimeoutError:
+                pass
+
+
+def _bench_worker(index: int, heartbeat) -> None:
+    asyncio.run(_serve(heartbeat))
+
+
+async def _execute(client: Client, queue: str, n: int, iterations: int) -> None:
+    await asyncio.gather(
+        *(
+            client.execute_workflow(
+                CpuBoundWorkflow.run, iterations, id=f"bench-{uuid.uuid4().hex}", task_queue=queue
+            )
+            for _ in range(n)
+        )
+    )
+
+
+async def _measure(client: Client, processes: int, n: int, iterations: int) -> float:
+    queue = f"bench-worker-processes-{uuid.uuid4().hex[:8]}"
+    os.environ[_QUEUE_ENV] = queue
+    supervisor = WorkerSupervisor(_bench_worker, processes, shutdown_grace_seconds=5.0)
+    supervisor.start()
+    try:
+        # 预热：每个进程都完成连接并开始轮询
+        await _execute(client, queue, processes * 4, 1)
+        start = time.perf_counter()
+        await _execute(client, queue, n, iterations)
+        return time.perf_counter() - start
+    finally:
+        await asyncio.to_thread(supervisor.shutdown)
+
+
+async def main(n: int, iterations: int, process_counts: List[int]) -> None:
+    async with await WorkflowEnvironment.start_local() as env:
+        os.environ[_ADDRESS_ENV] = env.client.service_client.config.target_host
+        print(f"{n} workflows x {iterations} iterations, local Temporal dev server")
+        print(f"{'processes':>10} {'total (s)':>10} {'workflows/s':>12} {'speedup':>9}")
+        baseline = None
+        for processes in process_counts:
+            elapsed = await _measure(env.client, processes, n, iterations)
+            baseline = baseline or elapsed
+            print(
+                f"{processes:>10} {elapsed:>10.2f} {n / elapsed:>12.0f} "
+                f"{baseline / elapsed:>8.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=WORKFLOWS)
+    parser.add_argument("--iterations", type=int, default=ITERATIONS)
+    parser.add_argument(
+        "--processes", type=int, nargs="+", default=sorted({1, 2, max(cpus // 2, 1), cpus})
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.n, args.iterations, args.processes))
@@ -30,6 +30,7 @@ from .notification import (
 from .robot import (
     RobotTaskParams,
     assign_task_to_robot,
+    await_robot_task_completion,
     find_available_robot,
     get_robot_location,
     get_robot_status,
@@ -43,6 +44,7 @@ __all__ = [
     "get_robot_status",
     "assign_task_to_robot",
     "wait_for_robot_task_completion",
+    "await_robot_task_completion",
     "get_robot_location",
     "find_available_robot",
     "release_robot",
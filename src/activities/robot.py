@@ -145,6 +145,43 @@ async def wait_for_robot_task_completion(
     }
 
 
+@activity.defn
+async def await_robot_task_completion(
+    task_id: str, timeout_seconds: int = 3600
+) -> Dict[str, Any]:
+    """
+    等待机器人任务完成（事件驱动）
+
+    登记 task token 后立即以异步完成方式返回，机器人执行期间不占用 Activity 槽位；
+    完成事件到达时由 API 完成该 Activity（见 services.robot_completions）。
+    完成事件先于登记到达时直接返回其结果。
+
+    参数:
+        task_id: 任务 ID
+        timeout_seconds: 超时时间（调用方应将 start_to_close_timeout 设为该值，超时即任务超时）
+
+    返回:
+        同 wait_for_robot_task_completion
+    """
+    from src.services.robot_completions import get_robot_task_completions
+
+    activity.logger.info(f"Registering for task completion: {task_id}")
+
+    # 登记至少保留到 Activity 超时，避免超时前到达的完成事件找不到 task token
+    info = activity.info()
+    timeouts = [
+        t.total_seconds()
+        for t in (info.start_to_close_timeout, info.schedule_to_close_timeout)
+        if t is not None
+    ]
+    wait_seconds = int(max([timeout_seconds, *timeouts]))
+
+    early = await get_robot_task_completions().register(task_id, info.task_token, wait_seconds)
+    if early is not None:
+        return early
+    activity.raise_complete_async()
+
+
 @activity.defn
 async def get_robot_location(robot_id: str) -> Dict[str, Any]:
     """获取机器人位置"""
@@ -5,34 +5,42 @@ FastAPI 应用主入口
 """
 
 from contextlib import asynccontextmanager
-from typing import Optional
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from temporalio.client import Client
 
+from src.api.responses import default_response_class
 from src.core.config import get_config
-
-# 全局 Temporal 客户端
-temporal_client: Optional[Client] = None
+from src.core.temporal_client import get_temporal_pool
+from src.services.task_dispatcher import get_task_dispatcher
+from src.services.workflow_events import get_workflow_event_hub
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """应用生命周期管理"""
-    global temporal_client
-
     config = get_config()
 
-    # 启动时连接 Temporal
+    # 启动时连接 Temporal（路由与 WorkflowService 共用同一客户端池）
     print(f"Connecting to Temporal: {config.temporal.address}")
-    temporal_client = await Client.connect(config.temporal.address)
-    print("Connected to Temporal")
+    temporal_pool = get_temporal_pool()
+    await temporal_pool.connect()
+    print(f"Connected to Temporal ({temporal_pool.size} connection(s))")
+
+    # 共享分派存储：启动时加载其他副本注册的 Agent
+    dispatcher = get_task_dispatcher()
+    await dispatcher.sync_from_store()
+    dispatcher.start_lease_monitor()
+    dispatcher.start_queue_monitor()
 
     yield
 
     # 关闭时清理
     print("Shutting down...")
+    await dispatcher.close()
+    await get_workflow_event_hub().close()
+    await temporal_pool.close()
 
 
 # 创建 FastAPI 应用
@@ -41,6 +49,7 @@ app = FastAPI(
     description="Workflow orchestration service for ECIS platform",
     version="0.1.0",
     lifespan=lifespan,
+    default_response_class=default_response_class(),
 )
 
 # 配置 CORS
@@ -54,10 +63,8 @@ app.add_middleware(
 
 
 def get_temporal_client() -> Client:
-    """获取 Temporal 客户端"""
-    if temporal_client is None:
-        raise RuntimeError("Temporal client not initialized")
-    return temporal_client
+    """获取 Temporal 客户端（新代码请通过 Depends(get_temporal_pool) 注入）"""
+    return get_temporal_pool().get()
 
 
 # 健康检查
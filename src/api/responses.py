@@ -0,0 +1,106 @@
+"""
+JSON 响应
+
+职责：
+- FastJSONResponse：orjson 序列化，未安装 orjson 时回退到标准库 json
+- 预序列化的静态响应体（如模板列表），内容不变时直接复用字节
+
+大列表接口直接返回 FastJSONResponse，可跳过 FastAPI 的 jsonable_encoder 逐项转换
+（10k Agent 列表约 170ms → 4ms，见 benchmarks/bench_json_response.py）。
+"""
+
+import inspect
+import json
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Type
+
+from fastapi.datastructures import Default
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from fastapi.routing import serialize_response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson 为可选依赖（perf）
+    orjson = None  # type: ignore[assignment]
+
+
+def _default(obj: Any) -> Any:
+    """orjson 无法直接序列化的对象（Pydantic 模型等）"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    return jsonable_encoder(obj)
+
+
+def dumps(content: Any) -> bytes:
+    """序列化为 JSON 字节"""
+    if isinstance(content, BaseModel):
+        return content.model_dump_json().encode()
+    if orjson is not None:
+        return orjson.dumps(
+            content,
+            default=_default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+        )
+    return json.dumps(
+        content,
+        default=_default,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    """orjson 序列化的 JSON 响应（未安装 orjson 时使用标准库）"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def default_response_class() -> Type[Response]:
+    """
+    应用默认响应类
+
+    新版 FastAPI 在声明 response_model 时由 Pydantic 直接序列化为 JSON 字节，
+    但只在未指定默认响应类时启用；此时保留 FastAPI 默认，只在旧版本上使用 FastJSONResponse
+    """
+    if "dump_json" in inspect.signature(serialize_response).parameters:
+        # FastAPI 自身以 Default(JSONResponse) 作为该参数的默认值，类型标注未包含占位符
+        return Default(JSONResponse)  # type: ignore[return-value]
+    return FastJSONResponse
+
+
+class SerializedCache:
+    """
+    预序列化响应体缓存
+
+    内容由 version 标识，version 变化时全部失效；条目数有上限，超出时淘汰最久未用的
+    """
+
+    def __init__(self, max_entries: int = 256) -> None:
+        self._version: Optional[Hashable] = None
+        self._bodies: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._max_entries = max_entries
+
+    def response(self, version: Hashable, key: Hashable, build: Callable[[], Any]) -> Response:
+        """
+        获取响应（未命中时调用 build 生成内容并序列化）
+
+        参数:
+            version: 内容版本
+            key: 缓存键（如查询参数），调用方应只使用有限的取值
+            build: 生成响应内容
+        """
+        if version != self._version:
+            self._bodies.clear()
+            self._version = version
+        body = self._bodies.get(key)
+        if body is None:
+            body = self._bodies[key] = dumps(build())
+            if len(self._bodies) > self._max_entries:
+                self._bodies.popitem(last=False)
+        else:
+            self._bodies.move_to_end(key)
+        return Response(body, media_type="application/json")
@@ -4,10 +4,11 @@
 
 from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 
-from src.api.main import get_temporal_client
+from src.core.temporal_client import TemporalClientPool, get_temporal_pool
+from src.services.workflow_cache import get_workflow_cache
 
 router = APIRouter(prefix="/approvals", tags=["approvals"])
 
@@ -54,19 +55,24 @@ class ApprovalStatusResponse(BaseModel):
 
 
 @router.get("/{workflow_id}", response_model=ApprovalStatusResponse)
-async def get_approval_status(workflow_id: str):
+async def get_approval_status(
+    workflow_id: str,
+    temporal: TemporalClientPool = Depends(get_temporal_pool),
+):
     """
     获取审批状态
 
     查询审批工作流的当前状态
     """
-    client = get_temporal_client()
+    client = await temporal.acquire()
 
     try:
         handle = client.get_workflow_handle(workflow_id)
 
-        # 查询状态
-        status = await handle.query("get_status")
+        # 查询状态（短时缓存，看板并发轮询只查询一次）
+        status = await get_workflow_cache().get(
+            workflow_id, "query:get_status", lambda: handle.query("get_status")
+        )
 
         return ApprovalStatusResponse(
             workflow_id=workflow_id,
@@ -82,13 +88,17 @@ async def get_approval_status(workflow_id: str):
 
 
 @router.post("/{workflow_id}/approve", response_model=ApprovalResponse)
-async def approve(workflow_id: str, request: ApproveRequest):
+async def approve(
+    workflow_id: str,
+    request: ApproveRequest,
+    temporal: TemporalClientPool = Depends(get_temporal_pool),
+):
     """
     审批通过
 
     向审批工作流发送 approve 信号
     """
-    client = get_temporal_client()
+    client = await temporal.acquire()
 
     try:
         handle = client.get_workflow_handle(workflow_id)
@@ -100,6 +110,7 @@ async def approve(workflow_id: str, request: ApproveRequest):
             request.reason,
             request.form_data,
         )
+        get_workflow_cache().invalidate(workflow_id)
 
         return ApprovalResponse(
             workflow_id=workflow_id,
@@ -112,13 +123,17 @@ async def approve(workflow_id: str, request: ApproveRequest):
 
 
 @router.post("/{workflow_id}/reject", response_model=ApprovalResponse)
-async def reject(workflow_id: str, request: RejectRequest):
+async def reject(
+    workflow_id: str,
+    request: RejectRequest,
+    temporal: TemporalClientPool = Depends(get_temporal_pool),
+):
     """
     审批拒绝
 
     向审批工作流发送 reject 信号
     """
-    client = get_temporal_client()
+    client = await temporal.acquire()
 
     try:
         handle = client.get_workflow_handle(workflow_id)
@@ -130,6 +145,7 @@ async def reject(workflow_id: str, request: RejectRequest):
             request.reason,
             request.form_data,
         )
+        get_workflow_cache().invalidate(workflow_id)
 
         return ApprovalResponse(
             workflow_id=workflow_id,
@@ -142,19 +158,24 @@ async def reject(workflow_id: str, request: RejectRequest):
 
 
 @router.post("/{workflow_id}/cancel", response_model=ApprovalResponse)
-async def cancel_approval(workflow_id: str, reason: str = ""):
+async def cancel_approval(
+    workflow_id: str,
+    reason: str = "",
+    temporal: TemporalClientPool = Depends(get_temporal_pool),
+):
     """
     取消审批
 
     向审批工作流发送 cancel 信号
     """
-    client = get_temporal_client()
+    client = await temporal.acquire()
 
     try:
         handle = client.get_workflow_handle(workflow_id)
 
         # 发送 cancel 信号
         await handle.signal("cancel", reason)
+        get_workflow_cache().invalidate(workflow_id)
 
         return ApprovalResponse(
             workflow_id=workflow_id,
@@ -5,12 +5,14 @@
 import uuid
 from typing import Any, Dict, Optional
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
-from temporalio.client import Client
 
 from src.core.config import get_config
+from src.core.temporal_client import TemporalClientPool, get_temporal_pool
+from src.services.workflow_cache import get_workflow_cache
 from src.workflows.delivery import DeliveryWorkflow, DeliveryWorkflowInput
+from src.workflows.registry import workflow_registry
 
 router = APIRouter(prefix="/delivery", tags=["delivery"])
 
@@ -36,12 +38,15 @@ class DeliveryResponse(BaseModel):
 
 
 @router.post("", response_model=DeliveryResponse)
-async def start_delivery(request: StartDeliveryRequest) -> DeliveryResponse:
+async def start_delivery(
+    request: StartDeliveryRequest,
+    temporal: TemporalClientPool = Depends(get_temporal_pool),
+) -> DeliveryResponse:
     """
     启动配送工作流
     """
     config = get_config()
-    client = await Client.connect(config.temporal.address)
+    client = await temporal.acquire()
 
     workflow_id = f"delivery-{uuid.uuid4().hex[:8]}"
 
@@ -63,6 +68,7 @@ async def start_delivery(request: StartDeliveryRequest) -> DeliveryResponse:
             input_data,
             id=workflow_id,
             task_queue=config.temporal.task_queue,
+            search_attributes=workflow_registry.search_attributes("delivery"),
         )
         return DeliveryResponse(
             workflow_id=handle.id,
@@ -74,64 +80,78 @@ async def start_delivery(request: StartDeliveryRequest) -> DeliveryResponse:
 
 
 @router.get("/{workflow_id}")
-async def get_delivery_status(workflow_id: str) -> Dict[str, Any]:
+async def get_delivery_status(
+    workflow_id: str,
+    temporal: TemporalClientPool = Depends(get_temporal_pool),
+) -> Dict[str, Any]:
     """
     获取配送状态
     """
-    config = get_config()
-    client = await Client.connect(config.temporal.address)
+    client = await temporal.acquire()
 
     try:
         handle = client.get_workflow_handle(workflow_id)
-        status = await handle.query("get_status")
-        return status
+        return await get_workflow_cache().get(
+            workflow_id, "query:get_status", lambda: handle.query("get_status")
+        )
     except Exception as e:
         raise HTTPException(status_code=404, detail=f"Delivery not found: {workflow_id}")
 
 
 @router.post("/{workflow_id}/confirm-pickup")
-async def confirm_pickup(workflow_id: str) -> Dict[str, str]:
+async def confirm_pickup(
+    workflow_id: str,
+    temporal: TemporalClientPool = Depends(get_temporal_pool),
+) -> Dict[str, str]:
     """
     确认取货
     """
-    config = get_config()
-    client = await Client.connect(config.temporal.address)
+    client = await temporal.acquire()
 
     try:
         handle = client.get_workflow_handle(workflow_id)
         await handle.signal(DeliveryWorkflow.confirm_pickup)
+        get_workflow_cache().invalidate(workflow_id)
         return {"status": "confirmed", "message": "Pickup confirmed"}
     except Exception as e:
         raise HTTPException(status_code=404, detail=f"Delivery not found: {workflow_id}")
 
 
 @router.post("/{workflow_id}/confirm-delivery")
-async def confirm_delivery(workflow_id: str, signature: Optional[str] = None) -> Dict[str, str]:
+async def confirm_delivery(
+    workflow_id: str,
+    signature: Optional[str] = None,
+    temporal: TemporalClientPool = Depends(get_temporal_pool),
+) -> Dict[str, str]:
     """
     确认送达
     """
-    config = get_config()
-    client = await Client.connect(config.temporal.address)
+    client = await temporal.acquire()
 
     try:
         handle = client.get_workflow_handle(workflow_id)
         await handle.signal(DeliveryWorkflow.confirm_delivery, args=[signature])
+        get_workflow_cache().invalidate(workflow_id)
         return {"status": "confirmed", "message": "Delivery confirmed"}
     except Exception as e:
         raise HTTPException(status_code=404, detail=f"Delivery not found: {workflow_id}")
 
 
 @router.post("/{workflow_id}/cancel")
-async def cancel_delivery(workflow_id: str, reason: str = "User cancelled") -> Dict[str, str]:
+async def cancel_delivery(
+    workflow_id: str,
+    reason: str = "User cancelled",
+    temporal: TemporalClientPool = Depends(get_temporal_pool),
+) -> Dict[str, str]:
     """
     取消配送
     """
-    config = get_config()
-    client = await Client.connect(config.temporal.address)
+    client = await temporal.acquire()
 
     try:
         handle = client.get_workflow_handle(workflow_id)
         await handle.signal(DeliveryWorkflow.cancel_delivery, args=[reason])
+        get_workflow_cache().invalidate(workflow_id)
         return {"status": "cancelled", "message": f"Delivery cancelled: {reason}"}
     except Exception as e:
         raise HTTPException(status_code=404, detail=f"Delivery not found: {workflow_id}")
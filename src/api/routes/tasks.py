@@ -2,19 +2,29 @@
 任务 API 路由
 """
 
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Literal, Optional
 
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field
+from temporalio.service import RPCError, RPCStatusCode
 
+from src.api.responses import FastJSONResponse
+from src.core.config import get_config
+from src.core.exceptions import DispatchQueueFullError
+from src.core.temporal_client import TemporalClientPool, get_temporal_pool
+from src.services.robot_completions import get_robot_task_completions
 from src.services.task_dispatcher import (
     TaskDispatcher,
     AgentInfo,
+    DispatchRequest,
     get_task_dispatcher,
 )
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
+# 等待队列满时建议客户端的重试间隔（秒）
+QUEUE_FULL_RETRY_AFTER = 5
+
 
 class AgentRegisterRequest(BaseModel):
     """Agent 注册请求"""
@@ -23,6 +33,13 @@ class AgentRegisterRequest(BaseModel):
     capabilities: List[str]
     max_load: int = 5
     metadata: Optional[Dict[str, Any]] = None
+    # 心跳租约时长（秒），为空时使用配置默认值，0 表示不设租约
+    lease_ttl: Optional[float] = Field(None, ge=0)
+
+
+class AgentHeartbeatRequest(BaseModel):
+    """Agent 心跳请求"""
+    metadata: Optional[Dict[str, Any]] = None
 
 
 class DispatchTaskRequest(BaseModel):
@@ -31,7 +48,9 @@ class DispatchTaskRequest(BaseModel):
     parameters: Dict[str, Any]
     agent_type: Optional[str] = None
     prefer_agent_id: Optional[str] = None
-    priority: int = 3
+    priority: int = Field(3, ge=1, le=5)
+    # 暂无可用 Agent 时排队等待，而不是立即失败
+    queue: bool = False
 
 
 class TaskResponse(BaseModel):
@@ -41,13 +60,61 @@ class TaskResponse(BaseModel):
     status: str
 
 
-@router.get("/agents")
-async def list_agents() -> List[Dict[str, Any]]:
+class BatchDispatchRequest(BaseModel):
+    """批量分派请求"""
+    tasks: List[DispatchTaskRequest] = Field(..., min_length=1, max_length=1000)
+
+
+class BatchDispatchItem(BaseModel):
+    """批量分派单项结果"""
+    index: int
+    success: bool
+    task_id: Optional[str] = None
+    agent_id: Optional[str] = None
+    status: Optional[str] = None
+    error: Optional[Dict[str, Any]] = None
+
+
+class BatchDispatchResponse(BaseModel):
+    """批量分派响应"""
+    results: List[BatchDispatchItem]
+    succeeded: int
+    failed: int
+
+
+class RobotTaskCompletionRequest(BaseModel):
+    """机器人任务完成回调"""
+    status: Literal["completed", "failed"] = "completed"
+    result: Dict[str, Any] = Field(default_factory=dict)
+
+
+class RobotTaskEvent(BaseModel):
+    """Federation 推送的机器人任务事件"""
+    event_type: str
+    data: Dict[str, Any]
+
+
+class RobotTaskCompletionResponse(BaseModel):
+    """机器人任务完成回调响应"""
+    task_id: str
+    status: str
+    # 是否已完成等待中的 Activity；为 False 时结果已暂存，等待方登记时直接取得
+    delivered: bool
+
+
+# Federation 事件类型 → 任务状态
+ROBOT_TASK_EVENTS = {"task.completed": "completed", "task.failed": "failed"}
+
+
+@router.get("/agents", response_model=List[Dict[str, Any]])
+async def list_agents() -> FastJSONResponse:
     """
     列出所有 Agent
+
+    直接以 orjson 序列化，跳过逐项的 jsonable_encoder 转换
     """
     dispatcher = get_task_dispatcher()
-    return [
+    return FastJSONResponse([
         {
             "agent_id": agent.agent_id,
             "agent_type": agent.agent_type,
@@ -57,7 +124,7 @@ async def list_agents() -> List[Dict[str, Any]]:
             "max_load": agent.max_load,
         }
         for agent in dispatcher._agents.values()
-    ]
+    ])
 
 
 @router.post("/agents")
@@ -76,18 +143,47 @@ async def register_agent(request: AgentRegisterRequest) -> Dict[str, str]:
         metadata=request.metadata or {},
     )
     
-    dispatcher.register_agent(agent)
+    lease_ttl = request.lease_ttl
+    if lease_ttl is None:
+        lease_ttl = get_config().dispatcher.lease_ttl_seconds
+
+    dispatcher.register_agent(agent, lease_ttl=lease_ttl)
     return {"status": "registered", "agent_id": request.agent_id}
 
 
+@router.post("/agents/{agent_id}/heartbeat")
+async def agent_heartbeat(
+    agent_id: str,
+    request: Optional[AgentHeartbeatRequest] = None,
+) -> Dict[str, Any]:
+    """
+    Agent 心跳
+
+    续约心跳租约并更新元数据（楼层、电量、位置等），租约过期的 Agent 恢复为 ready
+    """
+    dispatcher = get_task_dispatcher()
+
+    if not dispatcher.heartbeat(agent_id, request.metadata if request else None):
+        raise HTTPException(status_code=404, detail=f"Agent not found: {agent_id}")
+
+    return {"status": "ok", "agent_id": agent_id, "agent_status": dispatcher._agents[agent_id].status}
+
+
 @router.delete("/agents/{agent_id}")
-async def unregister_agent(agent_id: str) -> Dict[str, str]:
+async def unregister_agent(agent_id: str, requeue: bool = True) -> Dict[str, Any]:
     """
     注销 Agent
+
+    Agent 执行中的任务重新分派给其他 Agent（requeue=false 时标记为失败）
     """
     dispatcher = get_task_dispatcher()
-    dispatcher.unregister_agent(agent_id)
-    return {"status": "unregistered", "agent_id": agent_id}
+    orphaned = dispatcher.unregister_agent(agent_id, requeue=requeue)
+    return {
+        "status": "unregistered",
+        "agent_id": agent_id,
+        "requeued": requeue,
+        "in_flight_tasks": [a.task_id for a in orphaned],
+    }
 
 
 @router.put("/agents/{agent_id}/status")
@@ -104,18 +200,18 @@ async def update_agent_status(agent_id: str, status: str) -> Dict[str, str]:
     return {"status": "updated", "agent_id": agent_id, "new_status": status}
 
 
-@router.get("/agents/available")
+@router.get("/agents/available", response_model=List[Dict[str, Any]])
 async def find_available_agents(
     capability: str,
     agent_type: Optional[str] = None,
-) -> List[Dict[str, Any]]:
+) -> FastJSONResponse:
     """
     查找可用 Agent
     """
     dispatcher = get_task_dispatcher()
     available = dispatcher.find_available_agents(capability, agent_type)
     
-    return [
+    return FastJSONResponse([
         {
             "agent_id": agent.agent_id,
             "agent_type": agent.agent_type,
@@ -124,13 +220,16 @@ async def find_available_agents(
             "max_load": agent.max_load,
         }
         for agent in available
-    ]
+    ])
 
 
 @router.post("/dispatch", response_model=TaskResponse)
 async def dispatch_task(request: DispatchTaskRequest) -> TaskResponse:
     """
     分派任务
+
+    queue=true 时暂无可用 Agent 的任务排队等待（返回 status=queued），
+    队列已满时返回 429
     """
     dispatcher = get_task_dispatcher()
     
@@ -141,23 +240,121 @@ async def dispatch_task(request: DispatchTaskRequest) -> TaskResponse:
             agent_type=request.agent_type,
             prefer_agent_id=request.prefer_agent_id,
             priority=request.priority,
+            queue=request.queue,
         )
         return TaskResponse(
             task_id=assignment.task_id,
             agent_id=assignment.agent_id,
             status=assignment.status,
         )
+    except DispatchQueueFullError as e:
+        raise HTTPException(
+            status_code=429,
+            detail=e.message,
+            headers={"Retry-After": str(QUEUE_FULL_RETRY_AFTER)},
+        )
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.post("/dispatch/batch", response_model=BatchDispatchResponse)
+async def dispatch_tasks(request: BatchDispatchRequest) -> BatchDispatchResponse:
+    """
+    批量分派任务
+
+    按能力分组匹配 Agent，逐项返回分派结果，单项失败不影响其他任务；
+    queue=true 的任务暂无可用 Agent 时排队等待（该项 status=queued），队列已满时该项失败
+    """
+    dispatcher = get_task_dispatcher()
+
+    results = await dispatcher.dispatch_tasks([
+        DispatchRequest(
+            capability=task.capability,
+            parameters=task.parameters,
+            agent_type=task.agent_type,
+            prefer_agent_id=task.prefer_agent_id,
+            priority=task.priority,
+            queue=task.queue,
+        )
+        for task in request.tasks
+    ])
+
+    items = [
+        BatchDispatchItem(
+            index=result.index,
+            success=result.success,
+            task_id=result.assignment.task_id if result.assignment else None,
+            agent_id=result.assignment.agent_id if result.assignment else None,
+            status=result.assignment.status if result.assignment else None,
+            error=result.error,
+        )
+        for result in results
+    ]
+    succeeded = sum(1 for item in items if item.success)
+    return BatchDispatchResponse(
+        results=items,
+        succeeded=succeeded,
+        failed=len(items) - succeeded,
+    )
+
+
+async def _complete_robot_task(
+    temporal: TemporalClientPool, task_id: str, status: str, result: Dict[str, Any]
+) -> RobotTaskCompletionResponse:
+    client = await temporal.acquire()
+    try:
+        delivered = await get_robot_task_completions().complete(client, task_id, status, result)
+    except RPCError as e:
+        # 等待方已超时或已被取消
+        if e.status == RPCStatusCode.NOT_FOUND:
+            raise HTTPException(status_code=404, detail=f"Robot task not waiting: {task_id}")
+        raise HTTPException(status_code=502, detail=str(e))
+    return RobotTaskCompletionResponse(task_id=task_id, status=status, delivered=delivered)
+
+
+@router.post("/robot/events", response_model=RobotTaskCompletionResponse)
+async def robot_task_event(
+    event: RobotTaskEvent,
+    temporal: TemporalClientPool = Depends(get_temporal_pool),
+):
+    """
+    接收 Federation 推送的 task.completed / task.failed 事件
+
+    完成对应的 wait_for_robot_task_completion（WORKER_ROBOT_COMPLETION_ASYNC 模式）
+    """
+    status = ROBOT_TASK_EVENTS.get(event.event_type)
+    if status is None:
+        raise HTTPException(status_code=400, detail=f"Unsupported event: {event.event_type}")
+    task_id = event.data.get("task_id")
+    if not task_id:
+        raise HTTPException(status_code=400, detail="Event data has no task_id")
+    result = event.data.get("result") or {}
+    if status == "failed" and event.data.get("reason"):
+        result = {**result, "reason": event.data["reason"]}
+    return await _complete_robot_task(temporal, task_id, status, result)
+
+
+@router.post("/robot/{task_id}/completion", response_model=RobotTaskCompletionResponse)
+async def robot_task_completion(
+    task_id: str,
+    request: RobotTaskCompletionRequest,
+    temporal: TemporalClientPool = Depends(get_temporal_pool),
+):
+    """
+    机器人任务完成回调（本地 HTTP 回调）
+
+    完成对应的 wait_for_robot_task_completion（WORKER_ROBOT_COMPLETION_ASYNC 模式）
+    """
+    return await _complete_robot_task(temporal, task_id, request.status, request.result)
+
+
 @router.get("/{task_id}")
 async def get_task(task_id: str) -> Dict[str, Any]:
     """
     获取任务信息
     """
     dispatcher = get_task_dispatcher()
-    assignment = dispatcher.get_assignment(task_id)
+    assignment = await dispatcher.lookup_assignment(task_id)
     
     if not assignment:
         raise HTTPException(status_code=404, detail=f"Task not found: {task_id}")
@@ -179,10 +376,9 @@ async def complete_task(task_id: str, success: bool = True) -> Dict[str, str]:
     """
     dispatcher = get_task_dispatcher()
     
-    if not dispatcher.get_assignment(task_id):
+    if not await dispatcher.finish_task(task_id, success):
         raise HTTPException(status_code=404, detail=f"Task not found: {task_id}")
     
-    dispatcher.complete_task(task_id, success)
     return {
         "status": "completed" if success else "failed",
         "task_id": task_id,
@@ -190,9 +386,11 @@ async def complete_task(task_id: str, success: bool = True) -> Dict[str, str]:
 
 
 @router.get("/stats/overview")
-async def get_stats() -> Dict[str, Any]:
+async def get_stats(breakdown: bool = False) -> Dict[str, Any]:
     """
     获取统计信息
+
+    breakdown=true 时附带按 Agent 类型、按能力的分项统计
     """
     dispatcher = get_task_dispatcher()
-    return dispatcher.get_stats()
+    return dispatcher.get_stats(breakdown)
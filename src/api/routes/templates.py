@@ -7,11 +7,14 @@
 from typing import Optional
 
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import Response
 from pydantic import BaseModel
 
+from src.api.responses import FastJSONResponse, SerializedCache
 from src.services.template_service import (
     get_template_service,
     TemplateInfo,
+    TemplateService,
     WorkflowTemplate,
     TemplateVariable,
 )
@@ -19,6 +22,14 @@ from src.services.template_service import (
 
 router = APIRouter(prefix="/api/v1/templates", tags=["templates"])
 
+# 模板只在 reload 时变化，列表和详情按模板版本缓存序列化结果
+_responses = SerializedCache()
+
+
+def _version(service: TemplateService) -> tuple[int, int]:
+    """缓存版本：服务实例被替换时同样失效（各实例的 version 都从 1 开始）"""
+    return id(service), service.version
+
 
 class TemplateListResponse(BaseModel):
     """模板列表响应"""
@@ -41,28 +52,35 @@ class ValidateInputResponse(BaseModel):
 @router.get("", response_model=TemplateListResponse)
 async def list_templates(
     category: Optional[str] = Query(None, description="按分类过滤")
-):
+) -> Response:
     """列出所有工作流模板"""
     service = get_template_service()
-    templates = service.list_templates(category)
-    categories = service.get_categories()
 
-    return TemplateListResponse(
-        templates=templates,
-        total=len(templates),
-        categories=categories,
-    )
+    def build() -> TemplateListResponse:
+        templates = service.list_templates(category)
+        return TemplateListResponse(
+            templates=templates,
+            total=len(templates),
+            categories=service.get_categories(),
+        )
+
+    # 只缓存已有分类，任意分类参数不会使缓存无限增长
+    if category is not None and category not in service.get_categories():
+        return FastJSONResponse(build())
+    return _responses.response(_version(service), ("list", category), build)
 
 
 @router.get("/categories")
-async def list_categories():
+async def list_categories() -> Response:
     """列出所有模板分类"""
     service = get_template_service()
-    return {"categories": service.get_categories()}
+    return _responses.response(
+        _version(service), "categories", lambda: {"categories": service.get_categories()}
+    )
 
 
 @router.get("/{template_id}", response_model=WorkflowTemplate)
-async def get_template(template_id: str):
+async def get_template(template_id: str) -> Response:
     """获取模板详情"""
     service = get_template_service()
     template = service.get_template(template_id)
@@ -70,7 +88,7 @@ async def get_template(template_id: str):
     if not template:
         raise HTTPException(status_code=404, detail=f"Template not found: {template_id}")
 
-    return template
+    return _responses.response(_version(service), ("detail", template_id), lambda: template)
 
 
 @router.get("/{template_id}/variables", response_model=list[TemplateVariable])
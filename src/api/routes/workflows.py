@@ -2,14 +2,27 @@
 工作流 API 路由
 """
 
+import json
 import uuid
-from typing import Any, Dict, List, Optional
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
 
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from temporalio.client import WorkflowExecutionStatus
 
-from src.api.main import get_temporal_client
 from src.core.config import get_config
+from src.core.exceptions import WorkflowValidationError
+from src.core.temporal_client import TemporalClientPool, get_temporal_pool
+from src.services.workflow_cache import get_workflow_cache
+from src.services.workflow_events import WorkflowProgress, get_workflow_event_hub
+from src.services.workflow_service import (
+    BatchOperationResult,
+    WorkflowStartRequest,
+    get_workflow_service,
+)
+from src.workflows.registry import workflow_registry
 from src.workflows.cleaning import CleaningWorkflowInput, RobotCleaningWorkflow
 from src.workflows.approval import ApprovalWorkflow, ApprovalWorkflowInput
 
@@ -56,11 +69,268 @@ class WorkflowStatusResponse(BaseModel):
     details: Dict[str, Any]
 
 
+class WorkflowSummary(BaseModel):
+    """工作流摘要"""
+
+    workflow_id: str
+    workflow_type: str
+    status: str
+    start_time: Optional[datetime] = None
+    close_time: Optional[datetime] = None
+
+
+class WorkflowListResponse(BaseModel):
+    """工作流列表响应"""
+
+    workflows: List[WorkflowSummary]
+    total: int
+    next_page_token: Optional[str] = None
+
+
+class BatchStartItem(BaseModel):
+    """批量启动单项"""
+
+    input: Dict[str, Any] = Field(default_factory=dict)
+    workflow_id: Optional[str] = None
+
+
+class BatchStartRequest(BaseModel):
+    """批量启动工作流请求"""
+
+    workflow_type: str
+    items: List[BatchStartItem] = Field(..., min_length=1, max_length=1000)
+    # 用于生成幂等的工作流 ID（{前缀}-{batch_id}-{序号}），重复提交不会重复启动
+    batch_id: Optional[str] = None
+    concurrency: Optional[int] = Field(None, ge=1, le=256)
+
+
+class BatchStartResultItem(BaseModel):
+    """批量启动单项结果"""
+
+    index: int
+    success: bool
+    workflow_id: str
+    error: Optional[Dict[str, Any]] = None
+
+
+class BatchStartResponse(BaseModel):
+    """批量启动响应"""
+
+    results: List[BatchStartResultItem]
+    succeeded: int
+    failed: int
+
+
+class BatchTargetRequest(BaseModel):
+    """批量操作目标：工作流 ID 列表或可见性查询（二选一）"""
+
+    workflow_ids: Optional[List[str]] = Field(None, min_length=1, max_length=10000)
+    query: Optional[str] = None
+    concurrency: Optional[int] = Field(None, ge=1, le=256)
+
+
+class BatchSignalRequest(BatchTargetRequest):
+    """批量信号请求"""
+
+    signal_name: str
+    args: List[Any] = Field(default_factory=list)
+
+
+class BatchOperationItem(BaseModel):
+    """批量操作单项结果"""
+
+    workflow_id: str
+    success: bool
+    error: Optional[Dict[str, Any]] = None
+
+
+class BatchOperationResponse(BaseModel):
+    """批量操作响应"""
+
+    matched: int
+    succeeded: int
+    failed: int
+    results: List[BatchOperationItem]
+
+
 # ============ 路由 ============
 
 
+@router.get("", response_model=WorkflowListResponse)
+async def list_workflows(
+    workflow_type: Optional[str] = None,
+    status: Optional[str] = None,
+    page_size: int = Query(50, ge=1, le=1000),
+    next_page_token: Optional[str] = None,
+):
+    """
+    列出工作流
+
+    按页返回，next_page_token 为空表示没有更多结果；
+    翻页时需带上与上一页相同的过滤条件
+    """
+    service = await get_workflow_service()
+
+    try:
+        result = await service.list_workflows(
+            workflow_type=workflow_type,
+            status=status,
+            page_size=page_size,
+            next_page_token=next_page_token,
+        )
+    except WorkflowValidationError as e:
+        raise HTTPException(status_code=400, detail=e.message)
+
+    return WorkflowListResponse(
+        workflows=[
+            WorkflowSummary(
+                workflow_id=w.workflow_id,
+                workflow_type=w.workflow_type,
+                status=w.status,
+                start_time=w.start_time,
+                close_time=w.close_time,
+            )
+            for w in result.workflows
+        ],
+        total=result.total,
+        next_page_token=result.next_page_token,
+    )
+
+
+@router.get("/export")
+async def export_workflows(
+    workflow_type: Optional[str] = None,
+    status: Optional[str] = None,
+    page_size: int = Query(1000, ge=1, le=1000),
+):
+    """
+    导出工作流（NDJSON 流）
+
+    每行一个工作流，边从 Temporal 读取边写出，内存占用与总条数无关；
+    客户端读得慢时服务端随之暂停读取
+    """
+    service = await get_workflow_service()
+
+    try:
+        workflows = service.iter_workflows(workflow_type, status, page_size)
+    except WorkflowValidationError as e:
+        raise HTTPException(status_code=400, detail=e.message)
+
+    async def rows() -> AsyncIterator[bytes]:
+        async for w in workflows:
+            row = {
+                "workflow_id": w.workflow_id,
+                "workflow_type": w.workflow_type,
+                "status": w.status,
+                "start_time": w.start_time.isoformat() if w.start_time else None,
+                "close_time": w.close_time.isoformat() if w.close_time else None,
+            }
+            yield (json.dumps(row, ensure_ascii=False) + "\n").encode()
+
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
+
+
+@router.post("/start/batch", response_model=BatchStartResponse)
+async def start_workflows(request: BatchStartRequest):
+    """
+    批量启动工作流
+
+    并发启动（并发数受限），逐项返回结果，单项失败不影响其他项
+    """
+    service = await get_workflow_service()
+
+    try:
+        results = await service.start_workflows(
+            request.workflow_type,
+            [
+                WorkflowStartRequest(input=item.input, workflow_id=item.workflow_id)
+                for item in request.items
+            ],
+            batch_id=request.batch_id,
+            concurrency=request.concurrency,
+        )
+    except WorkflowValidationError as e:
+        raise HTTPException(status_code=400, detail=e.message)
+
+    items = [
+        BatchStartResultItem(
+            index=result.index,
+            success=result.success,
+            workflow_id=result.workflow_id,
+            error=result.error,
+        )
+        for result in results
+    ]
+    succeeded = sum(1 for item in items if item.success)
+    return BatchStartResponse(
+        results=items,
+        succeeded=succeeded,
+        failed=len(items) - succeeded,
+    )
+
+
+def _batch_operation_response(result: BatchOperationResult) -> BatchOperationResponse:
+    return BatchOperationResponse(
+        matched=result.matched,
+        succeeded=result.succeeded,
+        failed=result.failed,
+        results=[
+            BatchOperationItem(workflow_id=r.workflow_id, success=r.success, error=r.error)
+            for r in result.results
+        ],
+    )
+
+
+@router.post("/signal/batch", response_model=BatchOperationResponse)
+async def signal_workflows(request: BatchSignalRequest):
+    """
+    批量发送信号
+
+    如批量审批：signal_name 为 approve，args 为 [审批人, 意见, 表单数据]
+    """
+    service = await get_workflow_service()
+
+    try:
+        result = await service.signal_workflows(
+            request.signal_name,
+            request.args,
+            workflow_ids=request.workflow_ids,
+            query=request.query,
+            concurrency=request.concurrency,
+        )
+    except WorkflowValidationError as e:
+        raise HTTPException(status_code=400, detail=e.message)
+
+    return _batch_operation_response(result)
+
+
+@router.post("/cancel/batch", response_model=BatchOperationResponse)
+async def cancel_workflows(request: BatchTargetRequest):
+    """
+    批量取消工作流
+
+    如紧急情况下取消全部运行中的配送：
+    query 为 'EcisWorkflowType = "delivery" AND ExecutionStatus = "Running"'
+    """
+    service = await get_workflow_service()
+
+    try:
+        result = await service.cancel_workflows(
+            workflow_ids=request.workflow_ids,
+            query=request.query,
+            concurrency=request.concurrency,
+        )
+    except WorkflowValidationError as e:
+        raise HTTPException(status_code=400, detail=e.message)
+
+    return _batch_operation_response(result)
+
+
 @router.post("/cleaning/start", response_model=WorkflowResponse)
-async def start_cleaning_workflow(request: StartCleaningRequest):
+async def start_cleaning_workflow(
+    request: StartCleaningRequest,
+    temporal: TemporalClientPool = Depends(get_temporal_pool),
+):
     """
     启动清洁工作流
 
@@ -70,7 +340,7 @@ async def start_cleaning_workflow(request: StartCleaningRequest):
     - 分配清洁任务
     - 等待完成
     """
-    client = get_temporal_client()
+    client = await temporal.acquire()
     config = get_config()
 
     workflow_id = f"cleaning-{uuid.uuid4().hex[:8]}"
@@ -82,6 +352,7 @@ async def start_cleaning_workflow(request: StartCleaningRequest):
             cleaning_mode=request.cleaning_mode,
             robot_id=request.robot_id,
             priority=request.priority,
+            event_driven_completion=config.worker.robot_completion_async,
         )
 
         handle = await client.start_workflow(
@@ -89,6 +360,7 @@ async def start_cleaning_workflow(request: StartCleaningRequest):
             input_data,
             id=workflow_id,
             task_queue=config.temporal.task_queue,
+            search_attributes=workflow_registry.search_attributes("cleaning"),
         )
 
         return WorkflowResponse(
@@ -102,13 +374,16 @@ async def start_cleaning_workflow(request: StartCleaningRequest):
 
 
 @router.post("/approval/start", response_model=WorkflowResponse)
-async def start_approval_workflow(request: StartApprovalRequest):
+async def start_approval_workflow(
+    request: StartApprovalRequest,
+    temporal: TemporalClientPool = Depends(get_temporal_pool),
+):
     """
     启动审批工作流
 
     创建一个需要人工审批的流程
     """
-    client = get_temporal_client()
+    client = await temporal.acquire()
     config = get_config()
 
     workflow_id = f"approval-{uuid.uuid4().hex[:8]}"
@@ -128,6 +403,7 @@ async def start_approval_workflow(request: StartApprovalRequest):
             input_data,
             id=workflow_id,
             task_queue=config.temporal.task_queue,
+            search_attributes=workflow_registry.search_attributes("approval"),
         )
 
         return WorkflowResponse(
@@ -141,27 +417,33 @@ async def start_approval_workflow(request: StartApprovalRequest):
 
 
 @router.get("/{workflow_id}", response_model=WorkflowStatusResponse)
-async def get_workflow_status(workflow_id: str):
+async def get_workflow_status(
+    workflow_id: str,
+    temporal: TemporalClientPool = Depends(get_temporal_pool),
+):
     """
     获取工作流状态
 
     通过 Temporal Query 获取工作流的当前状态
     """
-    client = get_temporal_client()
+    client = await temporal.acquire()
+    cache = get_workflow_cache()
 
     try:
         handle = client.get_workflow_handle(workflow_id)
-        desc = await handle.describe()
+        desc = await cache.get(workflow_id, "describe", handle.describe)
 
         # 尝试查询状态
         try:
-            status_details = await handle.query("get_status")
+            status_details = await cache.get(
+                workflow_id, "query:get_status", lambda: handle.query("get_status")
+            )
         except Exception:
             status_details = {}
 
         return WorkflowStatusResponse(
             workflow_id=workflow_id,
-            status=desc.status.name,
+            status=desc.status.name if desc.status else "UNKNOWN",
             details=status_details,
         )
 
@@ -169,14 +451,72 @@ async def get_workflow_status(workflow_id: str):
         raise HTTPException(status_code=404, detail=str(e))
 
 
+@router.get("/{workflow_id}/events")
+async def stream_workflow_events(
+    workflow_id: str,
+    temporal: TemporalClientPool = Depends(get_temporal_pool),
+):
+    """
+    工作流进度推送（Server-Sent Events）
+
+    只在状态变化时推送：
+    - progress: get_status 查询结果变化
+    - closed: 工作流已结束（推送后关闭连接）
+    - error: 读取失败（推送后关闭连接）
+
+    同一工作流的所有订阅者共用一个轮询
+    """
+    client = await temporal.acquire()
+    handle = client.get_workflow_handle(workflow_id)
+    cache = get_workflow_cache()
+    keepalive = get_config().temporal.events_keepalive_seconds
+
+    async def poll() -> WorkflowProgress:
+        desc = await cache.get(workflow_id, "describe", handle.describe)
+        # 未返回状态时按未知处理，继续轮询
+        if desc.status is None:
+            return WorkflowProgress(status="UNKNOWN")
+        if desc.status != WorkflowExecutionStatus.RUNNING:
+            return WorkflowProgress(status=desc.status.name, closed=True)
+        try:
+            details = await cache.get(
+                workflow_id, "query:get_status", lambda: handle.query("get_status")
+            )
+        except Exception:
+            details = {}
+        return WorkflowProgress(status=desc.status.name, details=details)
+
+    async def events() -> AsyncIterator[str]:
+        async with get_workflow_event_hub().subscribe(workflow_id, poll) as subscription:
+            while True:
+                try:
+                    event = await subscription.next_event(timeout=keepalive)
+                except StopAsyncIteration:
+                    return
+                if event is None:
+                    yield ": keepalive\n\n"
+                    continue
+                data = json.dumps(event.data, ensure_ascii=False, default=str)
+                yield f"event: {event.event}\ndata: {data}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/{workflow_id}/result")
-async def get_workflow_result(workflow_id: str):
+async def get_workflow_result(
+    workflow_id: str,
+    temporal: TemporalClientPool = Depends(get_temporal_pool),
+):
     """
     获取工作流结果
 
     等待工作流完成并返回结果
     """
-    client = get_temporal_client()
+    client = await temporal.acquire()
 
     try:
         handle = client.get_workflow_handle(workflow_id)
@@ -188,15 +528,19 @@ async def get_workflow_result(workflow_id: str):
 
 
 @router.post("/{workflow_id}/cancel")
-async def cancel_workflow(workflow_id: str):
+async def cancel_workflow(
+    workflow_id: str,
+    temporal: TemporalClientPool = Depends(get_temporal_pool),
+):
     """
     取消工作流
     """
-    client = get_temporal_client()
+    client = await temporal.acquire()
 
     try:
         handle = client.get_workflow_handle(workflow_id)
         await handle.cancel()
+        get_workflow_cache().invalidate(workflow_id)
         return {"workflow_id": workflow_id, "cancelled": True}
 
     except Exception as e:
@@ -208,17 +552,19 @@ async def signal_workflow(
     workflow_id: str,
     signal_name: str,
     args: Optional[List[Any]] = None,
+    temporal: TemporalClientPool = Depends(get_temporal_pool),
 ):
     """
     向工作流发送信号
 
     用于审批工作流的 approve/reject 等操作
     """
-    client = get_temporal_client()
+    client = await temporal.acquire()
 
     try:
         handle = client.get_workflow_handle(workflow_id)
         await handle.signal(signal_name, *(args or []))
+        get_workflow_cache().invalidate(workflow_id)
         return {"workflow_id": workflow_id, "signal_sent": signal_name}
 
     except Exception as e:
@@ -13,6 +13,7 @@ from .exceptions import (
     ApprovalError,
     ApprovalNotFoundError,
     ApprovalTimeoutError,
+    DispatchQueueFullError,
     FederationConnectionError,
     FederationError,
     NoAvailableAgentError,
@@ -27,6 +28,7 @@ from .exceptions import (
     WorkflowStartError,
     WorkflowValidationError,
 )
+from .temporal_client import TemporalClientPool, get_temporal_client, get_temporal_pool
 
 __all__ = [
     # Config
@@ -38,6 +40,10 @@ __all__ = [
     "Database",
     "get_database",
     "get_session",
+    # Temporal
+    "TemporalClientPool",
+    "get_temporal_client",
+    "get_temporal_pool",
     # Exceptions
     "OrchestratorError",
     "WorkflowError",
@@ -49,6 +55,7 @@ __all__ = [
     "TaskDispatchError",
     "TaskTimeoutError",
     "TaskCancelledError",
+    "DispatchQueueFullError",
     "AgentError",
     "NoAvailableAgentError",
     "AgentUnavailableError",
@@ -7,7 +7,8 @@
 - 配置单例管理
 """
 
-from typing import Optional
+import os
+from typing import Dict, List, Optional
 
 from pydantic import ConfigDict
 from pydantic_settings import BaseSettings
@@ -22,12 +23,102 @@ class TemporalConfig(BaseSettings):
     port: int = 7233
     namespace: str = "default"
     task_queue: str = "ecis-orchestrator-queue"
+    # 进程内共享的 gRPC 连接数（按轮询分摊请求）
+    client_pool_size: int = 1
+    # 工作流列表：翻页请求返回后在后台预取下一页（0 关闭；第一页不预取），预取结果的有效期
+    list_prefetch_pages: int = 1
+    list_prefetch_ttl_seconds: float = 30.0
+    # describe / query 结果缓存有效期（0 关闭），并发读取同一工作流时只调用一次 Temporal
+    read_cache_ttl_seconds: float = 0.5
+    # 批量启动工作流时同时进行的 start_workflow 调用数
+    bulk_start_concurrency: int = 32
+    # 批量信号 / 取消时同时进行的调用数
+    batch_operation_concurrency: int = 32
+    # 进度推送（SSE）：每个被订阅工作流的轮询间隔，与空闲时的保活间隔
+    events_poll_interval_seconds: float = 1.0
+    events_keepalive_seconds: float = 15.0
 
     @property
     def address(self) -> str:
         return f"{self.host}:{self.port}"
 
 
+class WorkerConfig(BaseSettings):
+    """Worker 配置"""
+
+    model_config = ConfigDict(env_prefix="WORKER_")
+
+    # 同一任务队列上的 Worker 进程数（0 为 CPU 核数），为 1 时不启用多进程监管
+    processes: int = 0
+    # 收到 SIGTERM 后等待进行中的 Activity 完成的时间（秒）
+    shutdown_grace_seconds: float = 30.0
+    # 子进程心跳间隔与超时（秒），超时视为卡死并重启（0 关闭心跳检查）
+    heartbeat_interval_seconds: float = 5.0
+    heartbeat_timeout_seconds: float = 60.0
+    # 子进程异常退出后的重启退避（秒），连续失败时翻倍直到上限
+    restart_backoff_seconds: float = 1.0
+    restart_backoff_max_seconds: float = 60.0
+
+    # Activity 按分组（robot / facility / notification / llm）使用独立任务队列 {task_queue}-{分组}，
+    # 关闭时全部 Activity 与工作流共用主队列。开启后新调度的 Activity 进入分组队列，
+    # 开启前已调度到主队列的 Activity 由工作流 Worker 继续执行
+    split_activity_queues: bool = False
+    # 本进程运行的队列，逗号分隔：workflows 与 Activity 分组名（空为全部），用于部署专用 Worker
+    queues: str = ""
+    # 各分组的 Activity 并发上限（自动调优时为调优上界），未列出的分组使用 max_concurrent_activities
+    group_max_concurrent_activities: Dict[str, int] = {
+        "robot": 500,
+        "facility": 100,
+        "notification": 100,
+        "llm": 20,
+    }
+
+    # 以本地 Activity 执行的 Activity 名称，逗号分隔（空为关闭）。仅适用于短小、幂等的调用，
+    # 如 open_door,close_door,get_doors_on_route,send_task_update,send_notification；
+    # 关闭前需等待开启期间启动的工作流结束，否则重放不一致
+    local_activities: str = ""
+
+    # 机器人任务完成改为事件驱动：此后启动的清洁工作流改用 await_robot_task_completion，
+    # 登记后立即以异步完成方式返回，由完成事件（POST /tasks/robot/events 或
+    # /tasks/robot/{task_id}/completion）完成，机器人执行期间不占用 Activity 槽位；
+    # 批量启动可在 input 中以 event_driven_completion 单独指定。须同时开启 REDIS_ROBOT_COMPLETIONS_ENABLED
+    robot_completion_async: bool = False
+    # 完成事件先于登记到达时暂存结果的时间（秒）
+    robot_completion_result_ttl_seconds: int = 3600
+
+    # 每个进程的并发上限（None 为 SDK 默认值 100）
+    max_concurrent_workflow_tasks: Optional[int] = None
+    max_concurrent_activities: Optional[int] = None
+    max_concurrent_local_activities: Optional[int] = None
+    # 粘性缓存的工作流数（0 关闭粘性执行）
+    max_cached_workflows: int = 1000
+    # 工作流 / Activity 任务的并发轮询数（自动调优时为初始值）
+    workflow_task_pollers: int = 5
+    activity_task_pollers: int = 5
+    # 自动调优：按 Activity 排队延迟与槽位饱和度在 [min, max] 内调整 Activity 并发上限，
+    # 轮询数按服务端反馈在 [1, autotune_max_pollers] 内伸缩
+    autotune: bool = False
+    autotune_min_activities: int = 10
+    autotune_max_activities: int = 1000
+    autotune_target_queue_latency_seconds: float = 0.5
+    autotune_interval_seconds: float = 5.0
+    autotune_max_pollers: int = 20
+
+    @property
+    def process_count(self) -> int:
+        return self.processes if self.processes > 0 else (os.cpu_count() or 1)
+
+    @property
+    def queue_names(self) -> Optional[List[str]]:
+        """本进程运行的队列（None 为全部）"""
+        names = [name.strip() for name in self.queues.split(",") if name.strip()]
+        return names or None
+
+    @property
+    def local_activity_names(self) -> List[str]:
+        return [name.strip() for name in self.local_activities.split(",") if name.strip()]
+
+
 class DatabaseConfig(BaseSettings):
     """数据库配置"""
 
@@ -44,6 +135,36 @@ class RedisConfig(BaseSettings):
     model_config = ConfigDict(env_prefix="REDIS_")
 
     url: str = "redis://localhost:6380"
+    # 多进程 / 多副本共享 Agent 注册表与负载
+    dispatch_enabled: bool = False
+    dispatch_prefix: str = "ecis:dispatch"
+    # Worker 与 API 进程共享机器人任务完成登记表（task token）
+    robot_completions_enabled: bool = False
+    robot_completions_prefix: str = "ecis:robot-completion"
+
+
+class DispatcherConfig(BaseSettings):
+    """任务分派配置"""
+
+    model_config = ConfigDict(env_prefix="DISPATCHER_")
+
+    # 已结束任务分配的保留策略
+    history_max_size: int = 10000
+    history_ttl_seconds: float = 3600.0
+    # 将已结束的分配批量写入 task_records 表
+    history_persist: bool = False
+    history_flush_batch: int = 100
+    # 每个 (能力, Agent 类型) 最多排队等待的任务数，超出时返回 429
+    queue_max_depth: int = 1000
+    # 使用共享存储时有排队任务则按此间隔（秒）刷新注册表，分派到其他进程释放负载的 Agent（0 关闭）
+    queue_sync_interval_seconds: float = 2.0
+    # 任务参数带楼层 / 坐标时按位置、电量、负载评分选择 Agent。开启后这类任务不再按最低负载选择，
+    # 且不分派给电量过低的 Agent
+    location_scoring: bool = False
+    # 通过 API 注册的 Agent 的默认心跳租约（秒），0 表示不设租约（注册时指定 lease_ttl 的除外）。
+    # 开启前须确认所有 Agent 都会定期调用心跳接口，否则租约到期后被置为 offline
+    lease_ttl_seconds: float = 0.0
+    lease_check_interval_seconds: float = 1.0
 
 
 class FederationConfig(BaseSettings):
@@ -83,8 +204,10 @@ class Config(BaseSettings):
 
     app: AppConfig = AppConfig()
     temporal: TemporalConfig = TemporalConfig()
+    worker: WorkerConfig = WorkerConfig()
     database: DatabaseConfig = DatabaseConfig()
     redis: RedisConfig = RedisConfig()
+    dispatcher: DispatcherConfig = DispatcherConfig()
     federation: FederationConfig = FederationConfig()
     llm: LLMConfig = LLMConfig()
 
@@ -127,6 +127,17 @@ class TaskCancelledError(TaskError):
         )
 
 
+class DispatchQueueFullError(TaskError):
+    """分派等待队列已满"""
+
+    def __init__(self, capability: str, limit: int):
+        super().__init__(
+            f"Dispatch queue full for capability: {capability}",
+            "DISPATCH_QUEUE_FULL",
+            {"capability": capability, "limit": limit},
+        )
+
+
 # ============ Agent 相关异常 ============
 
 
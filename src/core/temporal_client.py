@@ -0,0 +1,95 @@
+"""
+Temporal 客户端管理模块
+
+职责：
+- 进程内共享的 Temporal 客户端（API 路由、WorkflowService 共用）
+- 可选多个 gRPC 连接，按轮询分摊请求
+- 生命周期管理（应用启动时建立连接，之后所有请求复用）
+"""
+
+import asyncio
+import itertools
+from typing import List, Optional
+
+from temporalio.client import Client
+
+from .config import TemporalConfig, get_config
+
+
+class TemporalClientPool:
+    """Temporal 客户端池"""
+
+    def __init__(self, config: Optional[TemporalConfig] = None):
+        if config is None:
+            config = get_config().temporal
+
+        self._config = config
+        self._clients: List[Client] = []
+        self._round_robin = itertools.count()
+        self._lock = asyncio.Lock()
+
+    @property
+    def connected(self) -> bool:
+        return bool(self._clients)
+
+    @property
+    def size(self) -> int:
+        return len(self._clients)
+
+    async def connect(self) -> None:
+        """建立连接（已连接时直接返回）"""
+        if self._clients:
+            return
+
+        async with self._lock:
+            if self._clients:
+                return
+            self._clients = list(
+                await asyncio.gather(
+                    *[
+                        Client.connect(
+                            self._config.address,
+                            namespace=self._config.namespace,
+                        )
+                        for _ in range(max(self._config.client_pool_size, 1))
+                    ]
+                )
+            )
+
+    def get(self) -> Client:
+        """
+        获取客户端（轮询）
+
+        异常:
+            RuntimeError: 尚未建立连接
+        """
+        if not self._clients:
+            raise RuntimeError("Temporal client not initialized")
+        return self._clients[next(self._round_robin) % len(self._clients)]
+
+    async def acquire(self) -> Client:
+        """获取客户端，尚未连接时先建立连接"""
+        if not self._clients:
+            await self.connect()
+        return self.get()
+
+    async def close(self) -> None:
+        """释放连接（客户端无显式关闭接口，丢弃引用后由运行时回收）"""
+        self._clients = []
+
+
+# 单例
+_temporal_pool: Optional[TemporalClientPool] = None
+
+
+def get_temporal_pool() -> TemporalClientPool:
+    """获取 Temporal 客户端池单例（用于依赖注入）"""
+    global _temporal_pool
+    if _temporal_pool is None:
+        _temporal_pool = TemporalClientPool()
+    return _temporal_pool
+
+
+async def get_temporal_client() -> Client:
+    """获取共享的 Temporal 客户端"""
+    return await get_temporal_pool().acquire()
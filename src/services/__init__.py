@@ -16,6 +16,8 @@ from src.services.task_dispatcher import (
     TaskDispatcher,
     AgentInfo,
     TaskAssignment,
+    DispatchRequest,
+    DispatchResult,
     get_task_dispatcher,
 )
 
@@ -27,5 +29,7 @@ __all__ = [
     "TaskDispatcher",
     "AgentInfo",
     "TaskAssignment",
+    "DispatchRequest",
+    "DispatchResult",
     "get_task_dispatcher",
 ]
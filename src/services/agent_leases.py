@@ -0,0 +1,111 @@
+"""
+Agent 心跳租约
+
+职责：
+- 每个 Agent 一份租约，心跳时续约
+- 以截止时间最小堆找出过期租约，无需周期性全量扫描
+
+续约只压入新的堆元素并递增代数，旧元素在出堆时惰性丢弃；
+续约 O(log n)，检查过期 O(k log n)（k 为过期数）。
+"""
+
+import heapq
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+# 堆元素：(截止时间, 代数, Agent ID)
+_LeaseEntry = Tuple[float, int, str]
+
+
+class LeaseTable:
+    """Agent 租约表"""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        """
+        参数:
+            clock: 单调时钟（测试时可替换）
+        """
+        self._clock = clock
+        self._heap: List[_LeaseEntry] = []
+        # Agent ID → (当前代数, 截止时间)
+        self._leases: Dict[str, Tuple[int, float]] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def renew(self, agent_id: str, ttl: float) -> float:
+        """
+        创建或续约租约
+
+        参数:
+            agent_id: Agent ID
+            ttl: 租约时长（秒）
+
+        返回:
+            新的截止时间
+        """
+        deadline = self._clock() + ttl
+        with self._lock:
+            self._generation += 1
+            self._leases[agent_id] = (self._generation, deadline)
+            heapq.heappush(self._heap, (deadline, self._generation, agent_id))
+            self._maybe_compact()
+        return deadline
+
+    def remove(self, agent_id: str) -> None:
+        """
+        移除租约（堆元素惰性删除）
+
+        参数:
+            agent_id: Agent ID
+        """
+        with self._lock:
+            self._leases.pop(agent_id, None)
+
+    def expire(self, now: Optional[float] = None) -> List[str]:
+        """
+        取出已过期的租约
+
+        参数:
+            now: 当前时间，默认取时钟
+
+        返回:
+            租约已过期的 Agent ID（过期后租约即移除）
+        """
+        if now is None:
+            now = self._clock()
+        expired = []
+        with self._lock:
+            heap = self._heap
+            while heap and heap[0][0] <= now:
+                _, generation, agent_id = heapq.heappop(heap)
+                lease = self._leases.get(agent_id)
+                if lease is not None and lease[0] == generation:
+                    del self._leases[agent_id]
+                    expired.append(agent_id)
+        return expired
+
+    def next_deadline(self) -> Optional[float]:
+        """最早的截止时间（可能属于已续约的旧元素，只会偏早）"""
+        with self._lock:
+            return self._heap[0][0] if self._heap else None
+
+    def deadline(self, agent_id: str) -> Optional[float]:
+        lease = self._leases.get(agent_id)
+        return lease[1] if lease else None
+
+    def __contains__(self, agent_id: str) -> bool:
+        return agent_id in self._leases
+
+    def __len__(self) -> int:
+        return len(self._leases)
+
+    def _maybe_compact(self) -> None:
+        """过期元素过多时按有效租约重建堆（调用方持有锁）"""
+        if len(self._heap) <= 2 * len(self._leases) + 64:
+            return
+        self._heap = [
+            (deadline, generation, agent_id)
+            for agent_id, (generation, deadline) in self._leases.items()
+        ]
+        heapq.heapify(self._heap)
@@ -0,0 +1,308 @@
+"""
+Agent 评分
+
+职责：
+- 根据任务位置（楼层、坐标）与 Agent 状态（负载、电量、楼层、坐标）为候选 Agent 打分
+- 提供纯 Python 与 NumPy 向量化两种实现，接口一致、结果一致
+- 支持自定义评分函数
+
+分数越低越优先。Agent 位置信息取自 AgentInfo.metadata：
+- floor: 当前楼层（int），或 floor_id（如 "building-a-3"）
+- battery_level: 电量百分比（0-100）
+- position: 当前坐标 [x, y]（米）
+"""
+
+import math
+import re
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy 为可选依赖（perf）
+    np = None  # type: ignore[assignment]
+
+if TYPE_CHECKING:
+    from src.services.task_dispatcher import AgentInfo
+
+# 楼层 ID 的最后一段，地下楼层为负数（如 "building-a--1"）
+_FLOOR_SUFFIX = re.compile(r"(?:^|-)(-?\d+)$")
+
+
+def parse_floor(value: Any) -> Optional[int]:
+    """
+    解析楼层
+
+    支持整数与 "building-a-3" / "building-a--1" 形式的楼层 ID（取最后一段），
+    无法解析（含 NaN、无穷大）时返回 None
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value) if math.isfinite(value) else None
+    match = _FLOOR_SUFFIX.search(str(value).strip())
+    return int(match.group(1)) if match else None
+
+
+def parse_battery(value: Any) -> Optional[float]:
+    """
+    解析电量百分比
+
+    元数据来自 Agent 上报，非数值（如字符串 "high"）时返回 None，即不参与电量评分
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        battery = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(battery) else battery
+
+
+def _parse_position(value: Any) -> Optional[Tuple[float, float]]:
+    if isinstance(value, Mapping):
+        value = (value.get("x"), value.get("y"))
+    try:
+        x, y = value
+        return float(x), float(y)
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class ScoringContext:
+    """任务位置"""
+
+    floor: Optional[int] = None
+    position: Optional[Tuple[float, float]] = None
+
+    @property
+    def has_location(self) -> bool:
+        return self.floor is not None or self.position is not None
+
+    @classmethod
+    def from_parameters(cls, parameters: Mapping[str, Any]) -> "ScoringContext":
+        """
+        从任务参数提取位置
+
+        识别 floor / floor_id / target_floor 与 position 字段
+        """
+        floor = None
+        for name in ("floor", "target_floor", "floor_id"):
+            if name in parameters:
+                floor = parse_floor(parameters[name])
+                break
+        return cls(floor=floor, position=_parse_position(parameters.get("position")))
+
+
+@dataclass
+class ScoringWeights:
+    """评分权重"""
+
+    # 负载率（current_load / max_load）
+    load: float = 1.0
+    # 每跨一层（乘电梯往返的主要耗时）
+    floor: float = 2.0
+    # 电量不足（1 - battery / 100）
+    battery: float = 1.0
+    # 同层平面距离（每米）
+    distance: float = 0.01
+    # 电量低于该值的 Agent 不参与分派
+    min_battery: float = 15.0
+
+
+class AgentScorer:
+    """
+    评分器基类
+
+    有状态的评分器（如向量化评分器）通过 update / update_load / remove
+    跟随注册表变化；无状态评分器忽略这些回调。
+    """
+
+    def scores(self, agents: Sequence["AgentInfo"], context: ScoringContext) -> Sequence[float]:
+        """
+        为候选 Agent 打分
+
+        参数:
+            agents: 候选 Agent
+            context: 任务位置
+
+        返回:
+            与 agents 一一对应的分数，越低越优先；不可用的 Agent 为 inf
+        """
+        raise NotImplementedError
+
+    def select(
+        self, agents: Sequence["AgentInfo"], context: ScoringContext
+    ) -> Optional["AgentInfo"]:
+        """选择分数最低的 Agent（同分取靠前者），全部不可用时返回 None"""
+        if not agents:
+            return None
+        scores = self.scores(agents, context)
+        best = min(range(len(agents)), key=scores.__getitem__)
+        return agents[best] if scores[best] != math.inf else None
+
+    def update(self, agent: "AgentInfo") -> None:
+        """Agent 注册或元数据变化"""
+
+    def update_load(self, agent: "AgentInfo") -> None:
+        """Agent 负载变化"""
+
+    def remove(self, agent_id: str) -> None:
+        """Agent 注销"""
+
+
+class FunctionScorer(AgentScorer):
+    """逐个 Agent 调用自定义函数打分"""
+
+    def __init__(self, func: Callable[["AgentInfo", ScoringContext], float]):
+        self._func = func
+
+    def scores(self, agents: Sequence["AgentInfo"], context: ScoringContext) -> List[float]:
+        return [self._func(agent, context) for agent in agents]
+
+
+class LocationScorer(AgentScorer):
+    """位置感知评分（纯 Python）"""
+
+    def __init__(self, weights: Optional[ScoringWeights] = None):
+        self.weights = weights or ScoringWeights()
+
+    def scores(self, agents: Sequence["AgentInfo"], context: ScoringContext) -> List[float]:
+        return [self.score(agent, context) for agent in agents]
+
+    def score(self, agent: "AgentInfo", context: ScoringContext) -> float:
+        w = self.weights
+        metadata = agent.metadata
+        score = w.load * agent.current_load / max(agent.max_load, 1)
+
+        battery = parse_battery(metadata.get("battery_level"))
+        if battery is not None:
+            if battery < w.min_battery:
+                return math.inf
+            score += w.battery * (1 - battery / 100)
+
+        floor = parse_floor(metadata.get("floor", metadata.get("floor_id")))
+        if context.floor is not None and floor is not None:
+            score += w.floor * abs(floor - context.floor)
+
+        position = _parse_position(metadata.get("position"))
+        if context.position is not None and position is not None:
+            if context.floor is None or floor is None or floor == context.floor:
+                score += w.distance * math.hypot(
+                    position[0] - context.position[0], position[1] - context.position[1]
+                )
+
+        return score
+
+
+class VectorizedLocationScorer(AgentScorer):
+    """
+    位置感知评分（NumPy 向量化）
+
+    以列存数组维护全部已注册 Agent 的特征，打分时按行号取出候选 Agent
+    一次性计算，与 LocationScorer 结果一致。未知的楼层 / 坐标 / 电量以 NaN 表示。
+    """
+
+    _COLUMNS = ("load", "max_load", "battery", "floor", "x", "y")
+
+    def __init__(self, weights: Optional[ScoringWeights] = None, capacity: int = 1024):
+        if np is None:
+            raise ImportError("VectorizedLocationScorer requires numpy (pip install ecis-orchestrator[perf])")
+        self.weights = weights or ScoringWeights()
+        self._rows: Dict[str, int] = {}
+        self._ids: List[str] = []
+        self._data = np.full((len(self._COLUMNS), capacity), np.nan)
+
+    def update(self, agent: "AgentInfo") -> None:
+        row = self._rows.get(agent.agent_id)
+        if row is None:
+            row = len(self._ids)
+            if row == self._data.shape[1]:
+                grown = np.full((len(self._COLUMNS), row * 2), np.nan)
+                grown[:, :row] = self._data
+                self._data = grown
+            self._rows[agent.agent_id] = row
+            self._ids.append(agent.agent_id)
+
+        metadata = agent.metadata
+        battery = parse_battery(metadata.get("battery_level"))
+        floor = parse_floor(metadata.get("floor", metadata.get("floor_id")))
+        position = _parse_position(metadata.get("position")) or (math.nan, math.nan)
+        self._data[:, row] = (
+            agent.current_load,
+            max(agent.max_load, 1),
+            math.nan if battery is None else battery,
+            math.nan if floor is None else floor,
+            position[0],
+            position[1],
+        )
+
+    def update_load(self, agent: "AgentInfo") -> None:
+        row = self._rows.get(agent.agent_id)
+        if row is not None:
+            self._data[0, row] = agent.current_load
+
+    def remove(self, agent_id: str) -> None:
+        row = self._rows.pop(agent_id, None)
+        if row is None:
+            return
+        # 与最后一行交换后删除，保持数组紧凑
+        last = len(self._ids) - 1
+        if row != last:
+            moved = self._ids[last]
+            self._data[:, row] = self._data[:, last]
+            self._ids[row] = moved
+            self._rows[moved] = row
+        self._ids.pop()
+        self._data[:, last] = np.nan
+
+    def scores(self, agents: Sequence["AgentInfo"], context: ScoringContext) -> List[float]:
+        scores: List[float] = self.score_array(agents, context).tolist()
+        return scores
+
+    def score_array(self, agents: Sequence["AgentInfo"], context: ScoringContext) -> "np.ndarray":
+        """与 scores 相同，返回 NumPy 数组"""
+        rows = self._rows
+        for agent in agents:
+            if agent.agent_id not in rows:
+                self.update(agent)
+        index = np.fromiter((rows[a.agent_id] for a in agents), dtype=np.intp, count=len(agents))
+        return self.score_rows(index, context)
+
+    def score_rows(self, index: "np.ndarray", context: ScoringContext) -> "np.ndarray":
+        """按行号打分"""
+        w = self.weights
+        load, max_load, battery, floor, x, y = self._data[:, index]
+
+        score: "np.ndarray" = w.load * load / max_load
+        score += np.where(np.isnan(battery), 0.0, w.battery * (1 - battery / 100))
+
+        same_floor = np.ones(len(index), dtype=bool)
+        if context.floor is not None:
+            floor_gap = np.abs(floor - context.floor)
+            score += np.where(np.isnan(floor_gap), 0.0, w.floor * floor_gap)
+            same_floor = ~(floor_gap > 0)
+
+        if context.position is not None:
+            distance = np.hypot(x - context.position[0], y - context.position[1])
+            score += np.where(np.isnan(distance) | ~same_floor, 0.0, w.distance * distance)
+
+        score[battery < w.min_battery] = np.inf
+        return score
+
+    def select(
+        self, agents: Sequence["AgentInfo"], context: ScoringContext
+    ) -> Optional["AgentInfo"]:
+        if not agents:
+            return None
+        scores = self.score_array(agents, context)
+        best = int(np.argmin(scores))
+        return agents[best] if np.isfinite(scores[best]) else None
+
+
+def create_scorer(weights: Optional[ScoringWeights] = None) -> AgentScorer:
+    """创建默认位置评分器：安装了 NumPy 时使用向量化实现"""
+    if np is not None:
+        return VectorizedLocationScorer(weights)
+    return LocationScorer(weights)
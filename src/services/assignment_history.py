@@ -0,0 +1,121 @@
+"""
+任务分配历史
+
+职责：
+- 保存已结束（completed / failed）的任务分配，供查询与统计
+- 按容量与保留时长淘汰，长时间运行的进程内存有界
+- 记录尚未持久化的分配，供批量写入 TaskRecord
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import TYPE_CHECKING, Callable, Deque, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from src.services.task_dispatcher import TaskAssignment
+
+
+class AssignmentHistory:
+    """
+    有界的任务分配历史
+
+    按结束顺序保存，超过 max_size 时淘汰最早结束的分配，
+    超过 ttl 秒的分配在下次访问时淘汰。
+    """
+
+    def __init__(
+        self,
+        max_size: int = 10000,
+        ttl: float = 3600.0,
+        persist: bool = False,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        参数:
+            max_size: 最多保留的分配数量
+            ttl: 保留秒数
+            persist: 是否记录待持久化的分配
+            clock: 单调时钟（测试时可替换）
+        """
+        self._max_size = max_size
+        self._ttl = ttl
+        self._persist = persist
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, TaskAssignment]]" = OrderedDict()
+        # 数据库不可用时最多积压 max_size 条，超出丢弃最早的
+        self._unflushed: "Deque[TaskAssignment]" = deque(maxlen=max_size)
+        self._lock = threading.Lock()
+
+    @property
+    def persist(self) -> bool:
+        return self._persist
+
+    def add(self, assignment: "TaskAssignment") -> None:
+        """
+        记录已结束的分配
+
+        参数:
+            assignment: 任务分配
+        """
+        now = self._clock()
+        with self._lock:
+            self._entries[assignment.task_id] = (now, assignment)
+            self._entries.move_to_end(assignment.task_id)
+            if self._persist:
+                self._unflushed.append(assignment)
+            self._evict(now)
+
+    def get(self, task_id: str) -> Optional["TaskAssignment"]:
+        """
+        获取已结束的分配
+
+        参数:
+            task_id: 任务 ID
+
+        返回:
+            任务分配，不存在或已淘汰时返回 None
+        """
+        with self._lock:
+            self._evict(self._clock())
+            entry = self._entries.get(task_id)
+            return entry[1] if entry else None
+
+    def values(self) -> List["TaskAssignment"]:
+        """返回保留中的分配（按结束顺序）"""
+        with self._lock:
+            self._evict(self._clock())
+            return [assignment for _, assignment in self._entries.values()]
+
+    def take_unflushed(self) -> List["TaskAssignment"]:
+        """取出所有待持久化的分配"""
+        with self._lock:
+            pending = list(self._unflushed)
+            self._unflushed.clear()
+            return pending
+
+    def restore_unflushed(self, assignments: List["TaskAssignment"]) -> None:
+        """持久化失败时放回待持久化队列（排在新记录之前）"""
+        with self._lock:
+            self._unflushed.extendleft(reversed(assignments))
+
+    def unflushed_count(self) -> int:
+        return len(self._unflushed)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._evict(self._clock())
+            return len(self._entries)
+
+    def _evict(self, now: float) -> None:
+        """淘汰超出容量或过期的分配（调用方持有锁）"""
+        entries = self._entries
+        while len(entries) > self._max_size:
+            entries.popitem(last=False)
+
+        deadline = now - self._ttl
+        while entries:
+            finished_at, _ = next(iter(entries.values()))
+            if finished_at > deadline:
+                break
+            entries.popitem(last=False)
@@ -0,0 +1,150 @@
+"""
+能力索引
+
+职责：
+- 按能力段构建前缀树（trie），索引可用 Agent
+- 支持 `*` 通配段与前缀能力匹配
+- 查找时只访问匹配的节点，不再全量扫描 Agent
+"""
+
+from typing import Dict, Iterable, List, Set
+
+WILDCARD = "*"
+
+
+def capability_matches(pattern: str, capability: str) -> bool:
+    """
+    判断 Agent 能力是否满足所需能力
+
+    规则与 TaskDispatcher 原有逻辑一致：
+    - 完全相同则匹配
+    - 否则按 `.` 分段，Agent 能力段数不多于所需能力段数，
+      且每一段相同或为 `*`（即前缀 + 通配匹配）
+
+    参数:
+        pattern: Agent 声明的能力
+        capability: 所需能力
+
+    返回:
+        是否匹配
+    """
+    if pattern == capability:
+        return True
+
+    pattern_parts = pattern.split(".")
+    capability_parts = capability.split(".")
+    if len(pattern_parts) > len(capability_parts):
+        return False
+
+    return all(
+        part == WILDCARD or part == capability_parts[i]
+        for i, part in enumerate(pattern_parts)
+    )
+
+
+class _TrieNode:
+    """前缀树节点"""
+
+    __slots__ = ("children", "agent_ids")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        # 能力恰好在此节点结束的 Agent
+        self.agent_ids: Set[str] = set()
+
+
+class CapabilityIndex:
+    """
+    能力前缀树索引
+
+    每个 Agent 的每条能力按 `.` 分段插入前缀树，`*` 作为普通子节点保存。
+    查找所需能力时沿树下行，每一层同时跟随精确段与 `*` 段，
+    并收集沿途结束于该节点的 Agent（前缀匹配）。
+    查找成本为 O(段数 × 通配分支 + 匹配 Agent 数)，与总 Agent 数无关。
+    """
+
+    def __init__(self):
+        self._root = _TrieNode()
+        self._agent_capabilities: Dict[str, List[str]] = {}
+
+    def __contains__(self, agent_id: str) -> bool:
+        return agent_id in self._agent_capabilities
+
+    def __len__(self) -> int:
+        return len(self._agent_capabilities)
+
+    def add(self, agent_id: str, capabilities: Iterable[str]) -> None:
+        """
+        添加 Agent 到索引（已存在则先移除）
+
+        参数:
+            agent_id: Agent ID
+            capabilities: Agent 能力列表
+        """
+        if agent_id in self._agent_capabilities:
+            self.remove(agent_id)
+
+        capabilities = list(dict.fromkeys(capabilities))
+        for capability in capabilities:
+            node = self._root
+            for part in capability.split("."):
+                node = node.children.setdefault(part, _TrieNode())
+            node.agent_ids.add(agent_id)
+
+        self._agent_capabilities[agent_id] = capabilities
+
+    def remove(self, agent_id: str) -> None:
+        """
+        从索引移除 Agent，并回收空节点
+
+        参数:
+            agent_id: Agent ID
+        """
+        capabilities = self._agent_capabilities.pop(agent_id, None)
+        if capabilities is None:
+            return
+
+        for capability in capabilities:
+            path = [self._root]
+            parts = capability.split(".")
+            for part in parts:
+                path.append(path[-1].children[part])
+            path[-1].agent_ids.discard(agent_id)
+
+            # 自底向上回收空节点
+            for depth in range(len(parts), 0, -1):
+                node = path[depth]
+                if node.agent_ids or node.children:
+                    break
+                del path[depth - 1].children[parts[depth - 1]]
+
+    def lookup(self, capability: str) -> Set[str]:
+        """
+        查找满足所需能力的 Agent
+
+        参数:
+            capability: 所需能力
+
+        返回:
+            匹配的 Agent ID 集合
+        """
+        matched: Set[str] = set()
+        frontier = [self._root]
+
+        for part in capability.split("."):
+            next_frontier = []
+            for node in frontier:
+                child = node.children.get(part)
+                if child is not None:
+                    next_frontier.append(child)
+                if part != WILDCARD:
+                    wildcard = node.children.get(WILDCARD)
+                    if wildcard is not None:
+                        next_frontier.append(wildcard)
+            if not next_frontier:
+                return matched
+            frontier = next_frontier
+            for node in frontier:
+                matched.update(node.agent_ids)
+
+        return matched
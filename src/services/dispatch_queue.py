@@ -0,0 +1,176 @@
+"""
+分派等待队列
+
+职责：
+- 暂无可用 Agent 时按 (能力, Agent 类型) 排队等待
+- 组内按优先级（1 最高）、再按入队顺序出队
+- 队列深度限制，超出时拒绝入队（背压）
+"""
+
+import heapq
+import itertools
+import threading
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from src.core.exceptions import DispatchQueueFullError
+from src.services.capability_index import capability_matches
+
+if TYPE_CHECKING:
+    from src.services.task_dispatcher import AgentInfo, TaskAssignment
+
+# 队列键：(所需能力, Agent 类型过滤)
+QueueKey = Tuple[str, Optional[str]]
+# 队列元素：(优先级, 入队序号, 任务 ID)
+_QueueEntry = Tuple[int, int, str]
+
+
+class DispatchQueue:
+    """
+    分派等待队列
+
+    每个队列键一个最小堆，出队、移除均为惰性删除：
+    _queued 中不存在的任务 ID 在堆顶被丢弃。
+    """
+
+    def __init__(self, max_depth: int = 1000):
+        """
+        参数:
+            max_depth: 每个队列键最多等待的任务数
+        """
+        self._max_depth = max_depth
+        self._heaps: Dict[QueueKey, List[_QueueEntry]] = {}
+        self._depths: Dict[QueueKey, int] = {}
+        # 任务 ID → (队列键, 入队序号, 任务分配)
+        self._queued: Dict[str, Tuple[QueueKey, int, "TaskAssignment"]] = {}
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def push(self, key: QueueKey, assignment: "TaskAssignment") -> None:
+        """
+        入队
+
+        参数:
+            key: 队列键
+            assignment: 等待中的任务分配
+
+        异常:
+            DispatchQueueFullError: 队列已满
+        """
+        with self._lock:
+            if self._depths.get(key, 0) >= self._max_depth:
+                raise DispatchQueueFullError(key[0], self._max_depth)
+            self._push(key, next(self._seq), assignment)
+
+    def restore(self, key: QueueKey, assignment: "TaskAssignment", seq: int) -> None:
+        """
+        出队后未能分派时按原序号放回（不受深度限制）
+
+        参数:
+            key: 队列键
+            assignment: 任务分配
+            seq: 原入队序号
+        """
+        with self._lock:
+            self._push(key, seq, assignment)
+
+    def pop(self, key: QueueKey) -> Optional[Tuple["TaskAssignment", int]]:
+        """
+        取出队列键中优先级最高的任务
+
+        返回:
+            (任务分配, 入队序号)，队列为空时返回 None
+        """
+        with self._lock:
+            if self._head(key) is None:
+                return None
+            return self._pop(key)
+
+    def pop_for(self, agent: "AgentInfo") -> Optional[Tuple[QueueKey, "TaskAssignment", int]]:
+        """
+        为 Agent 取出它能承接的优先级最高的任务
+
+        参数:
+            agent: 空闲的 Agent
+
+        返回:
+            (队列键, 任务分配, 入队序号)，没有可承接的任务时返回 None
+        """
+        with self._lock:
+            best_key: Optional[QueueKey] = None
+            best_head: Optional[_QueueEntry] = None
+            for key in list(self._heaps):
+                if not self._matches(agent, key):
+                    continue
+                head = self._head(key)
+                if head is not None and (best_head is None or head < best_head):
+                    best_key, best_head = key, head
+
+            if best_key is None:
+                return None
+            assignment, seq = self._pop(best_key)
+            return best_key, assignment, seq
+
+    def remove(self, task_id: str) -> Optional["TaskAssignment"]:
+        """
+        移除等待中的任务
+
+        返回:
+            被移除的任务分配，不在队列中时返回 None
+        """
+        with self._lock:
+            entry = self._queued.pop(task_id, None)
+            if entry is None:
+                return None
+            key, _, assignment = entry
+            self._decrement(key)
+            return assignment
+
+    def get(self, task_id: str) -> Optional["TaskAssignment"]:
+        entry = self._queued.get(task_id)
+        return entry[2] if entry else None
+
+    def depth(self, key: QueueKey) -> int:
+        return self._depths.get(key, 0)
+
+    def __len__(self) -> int:
+        return len(self._queued)
+
+    # ============ 内部方法（调用方持有锁） ============
+
+    def _push(self, key: QueueKey, seq: int, assignment: "TaskAssignment") -> None:
+        heapq.heappush(
+            self._heaps.setdefault(key, []), (assignment.priority, seq, assignment.task_id)
+        )
+        self._depths[key] = self._depths.get(key, 0) + 1
+        self._queued[assignment.task_id] = (key, seq, assignment)
+
+    def _head(self, key: QueueKey) -> Optional[_QueueEntry]:
+        """丢弃已移除的元素，返回堆顶"""
+        heap = self._heaps.get(key)
+        while heap:
+            _, seq, task_id = heap[0]
+            entry = self._queued.get(task_id)
+            if entry is not None and entry[1] == seq:
+                return heap[0]
+            heapq.heappop(heap)
+        return None
+
+    def _pop(self, key: QueueKey) -> Tuple["TaskAssignment", int]:
+        _, seq, task_id = heapq.heappop(self._heaps[key])
+        _, _, assignment = self._queued.pop(task_id)
+        self._decrement(key)
+        return assignment, seq
+
+    def _decrement(self, key: QueueKey) -> None:
+        self._depths[key] -= 1
+        if self._depths[key] == 0:
+            # 队列清空时连同残留的惰性删除元素一起丢弃
+            del self._depths[key]
+            self._heaps.pop(key, None)
+
+    @staticmethod
+    def _matches(agent: "AgentInfo", key: QueueKey) -> bool:
+        capability, agent_type = key
+        if agent_type and agent.agent_type != agent_type:
+            return False
+        return any(capability_matches(cap, capability) for cap in agent.capabilities)
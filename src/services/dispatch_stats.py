@@ -0,0 +1,120 @@
+"""
+分派统计
+
+职责：
+- 在 Agent 注册 / 注销 / 状态变化、任务分派 / 结束时增量更新计数器
+- 读取统计为计数器快照，不扫描注册表与任务
+- 按 Agent 类型、按能力的分项统计
+"""
+
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict
+
+AGENT_STATUSES = ("ready", "busy", "offline")
+# 任务计数：total 为累计分派数，pending / accepted 为执行中，completed / failed 为累计结束数
+TASK_COUNTERS = ("total", "pending", "accepted", "completed", "failed")
+
+# 任务状态 → 计数器名
+_TASK_STATE_COUNTER = {
+    "assigned": "pending",
+    "accepted": "accepted",
+    "completed": "completed",
+    "failed": "failed",
+}
+
+
+class DispatchStats:
+    """分派统计计数器"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._agents: Counter = Counter()
+        self._tasks: Counter = Counter()
+        self._agents_by_type: Dict[str, Counter] = defaultdict(Counter)
+        self._tasks_by_type: Dict[str, Counter] = defaultdict(Counter)
+        self._tasks_by_capability: Dict[str, Counter] = defaultdict(Counter)
+
+    # ============ Agent ============
+
+    def agent_added(self, agent_type: str, status: str) -> None:
+        with self._lock:
+            self._count_agent(agent_type, status, 1)
+
+    def agent_removed(self, agent_type: str, status: str) -> None:
+        with self._lock:
+            self._count_agent(agent_type, status, -1)
+
+    def agent_status_changed(self, agent_type: str, old: str, new: str) -> None:
+        with self._lock:
+            for counter in (self._agents, self._agents_by_type[agent_type]):
+                counter[old] -= 1
+                counter[new] += 1
+
+    def _count_agent(self, agent_type: str, status: str, delta: int) -> None:
+        for counter in (self._agents, self._agents_by_type[agent_type]):
+            counter["total"] += delta
+            counter[status] += delta
+
+    # ============ 任务 ============
+
+    def task_assigned(self, agent_type: str, capability: str) -> None:
+        with self._lock:
+            for counter in self._task_counters(agent_type, capability):
+                counter["total"] += 1
+                counter["pending"] += 1
+
+    def task_transitioned(self, agent_type: str, capability: str, old: str, new: str) -> None:
+        with self._lock:
+            for counter in self._task_counters(agent_type, capability):
+                counter[_TASK_STATE_COUNTER[old]] -= 1
+                counter[_TASK_STATE_COUNTER[new]] += 1
+
+    def _task_counters(self, agent_type: str, capability: str):
+        return (
+            self._tasks,
+            self._tasks_by_type[agent_type],
+            self._tasks_by_capability[capability],
+        )
+
+    # ============ 快照 ============
+
+    def snapshot(self, breakdown: bool = False) -> Dict[str, Any]:
+        """
+        获取统计快照
+
+        参数:
+            breakdown: 是否包含按 Agent 类型、按能力的分项统计
+
+        返回:
+            统计数据
+        """
+        with self._lock:
+            stats: Dict[str, Any] = {
+                "agents": _agent_view(self._agents),
+                "tasks": _task_view(self._tasks),
+            }
+            if breakdown:
+                agent_types = set(self._agents_by_type) | set(self._tasks_by_type)
+                stats["by_agent_type"] = {
+                    agent_type: {
+                        "agents": _agent_view(self._agents_by_type.get(agent_type, Counter())),
+                        "tasks": _task_view(self._tasks_by_type.get(agent_type, Counter())),
+                    }
+                    for agent_type in sorted(agent_types)
+                }
+                stats["by_capability"] = {
+                    capability: {"tasks": _task_view(counter)}
+                    for capability, counter in sorted(self._tasks_by_capability.items())
+                }
+            return stats
+
+
+def _agent_view(counter: Counter) -> Dict[str, int]:
+    view = {"total": counter["total"]}
+    view.update((status, counter[status]) for status in AGENT_STATUSES)
+    return view
+
+
+def _task_view(counter: Counter) -> Dict[str, int]:
+    return {name: counter[name] for name in TASK_COUNTERS}
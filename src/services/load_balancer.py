@@ -0,0 +1,234 @@
+"""
+负载均衡选择器
+
+职责：
+- 按 (能力, Agent 类型) 维护最小负载堆
+- 负载或状态变化时原地更新堆，选择最低负载 Agent 为 O(log n)
+
+并发：
+- 每个堆有独立的锁，不同能力的选择互不阻塞
+- 堆的创建、成员变化由选择器锁保护；加锁顺序固定为 选择器锁 → 堆锁
+- 所有锁只保护内存操作，不会跨 await 持有
+"""
+
+import heapq
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from src.services.capability_index import capability_matches
+
+if TYPE_CHECKING:
+    from src.services.task_dispatcher import AgentInfo
+
+# 堆键：(所需能力, Agent 类型过滤)
+HeapKey = Tuple[str, Optional[str]]
+# 堆元素：(负载, 注册顺序, Agent ID, 版本)
+_HeapEntry = Tuple[int, int, str, int]
+
+
+class _LoadHeap:
+    """单个能力键的最小负载堆（惰性删除）"""
+
+    __slots__ = ("entries", "members", "lock")
+
+    def __init__(self):
+        self.entries: List[_HeapEntry] = []
+        self.members: Set[str] = set()
+        self.lock = threading.Lock()
+
+
+class LeastLoadedSelector:
+    """
+    最低负载 Agent 选择器
+
+    每个被查询过的 (能力, Agent 类型) 键维护一个最小堆，成员为匹配该能力的
+    全部 ready Agent。Agent 负载变化时只向其所属的堆压入新元素并递增版本号，
+    旧元素在选择时惰性丢弃；满载 Agent 在选择时出堆，负载下降后重新入堆。
+    """
+
+    def __init__(
+        self,
+        agents: Dict[str, "AgentInfo"],
+        order: Dict[str, int],
+        lookup: Callable[[str], Iterable[str]],
+        max_keys: int = 1024,
+    ):
+        """
+        参数:
+            agents: Agent 注册表（与 TaskDispatcher 共享）
+            order: Agent 注册顺序，负载相同时按注册顺序选择
+            lookup: 能力索引查找函数，返回匹配的 ready Agent ID
+            max_keys: 最多维护的堆数量，超出后淘汰最久未使用的键
+        """
+        self._agents = agents
+        self._order = order
+        self._lookup = lookup
+        self._max_keys = max_keys
+        self._heaps: "OrderedDict[HeapKey, _LoadHeap]" = OrderedDict()
+        self._memberships: Dict[str, Set[HeapKey]] = {}
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.RLock()
+
+    def select(self, capability: str, agent_type: Optional[str] = None) -> Optional[str]:
+        """
+        选择负载最低的可用 Agent
+
+        参数:
+            capability: 所需能力
+            agent_type: Agent 类型过滤
+
+        返回:
+            Agent ID，没有可用 Agent 时返回 None
+        """
+        heap = self._get_heap((capability, agent_type))
+
+        with heap.lock:
+            entries = heap.entries
+            while entries:
+                load, _, agent_id, version = entries[0]
+                agent = self._agents.get(agent_id)
+
+                if agent is None or agent_id not in heap.members:
+                    heapq.heappop(entries)
+                    continue
+                if version != self._versions.get(agent_id):
+                    heapq.heappop(entries)
+                    continue
+                if load != agent.current_load:
+                    # 负载被外部直接修改，按实际负载重新入堆
+                    heapq.heapreplace(entries, self._entry(agent))
+                    continue
+                if agent.current_load >= agent.max_load:
+                    # 满载出堆，负载下降时由 update_load 重新入堆
+                    heapq.heappop(entries)
+                    continue
+
+                return agent_id
+
+        return None
+
+    def add_agent(self, agent: "AgentInfo") -> None:
+        """
+        Agent 变为可用时加入所有匹配的堆
+
+        参数:
+            agent: Agent 信息
+        """
+        with self._lock:
+            self.remove_agent(agent.agent_id)
+            self._versions[agent.agent_id] = self._versions.get(agent.agent_id, 0) + 1
+
+            for key, heap in self._heaps.items():
+                if self._matches(agent, key):
+                    self._join(agent, key, heap)
+
+    def remove_agent(self, agent_id: str) -> None:
+        """
+        Agent 注销或不可用时移出所有堆（堆元素惰性删除）
+
+        参数:
+            agent_id: Agent ID
+        """
+        with self._lock:
+            for key in self._memberships.pop(agent_id, ()):
+                heap = self._heaps.get(key)
+                if heap is not None:
+                    with heap.lock:
+                        heap.members.discard(agent_id)
+            if agent_id in self._versions:
+                self._versions[agent_id] += 1
+
+    def update_load(self, agent: "AgentInfo") -> None:
+        """
+        Agent 负载变化后更新其所属的堆
+
+        参数:
+            agent: Agent 信息
+        """
+        keys = tuple(self._memberships.get(agent.agent_id, ()))
+        if not keys:
+            return
+
+        self._versions[agent.agent_id] += 1
+        if agent.current_load >= agent.max_load:
+            return
+
+        entry = self._entry(agent)
+        for key in keys:
+            heap = self._heaps.get(key)
+            if heap is None:
+                continue
+            with heap.lock:
+                heapq.heappush(heap.entries, entry)
+                self._maybe_compact(heap)
+
+    def _get_heap(self, key: HeapKey) -> _LoadHeap:
+        """获取或构建能力键对应的堆"""
+        with self._lock:
+            heap = self._heaps.get(key)
+            if heap is not None:
+                self._heaps.move_to_end(key)
+                return heap
+
+            heap = _LoadHeap()
+            capability, agent_type = key
+            for agent_id in self._lookup(capability):
+                agent = self._agents.get(agent_id)
+                if agent is not None and (not agent_type or agent.agent_type == agent_type):
+                    self._versions.setdefault(agent_id, 0)
+                    self._join(agent, key, heap, push=False)
+            heapq.heapify(heap.entries)
+            self._heaps[key] = heap
+
+            if len(self._heaps) > self._max_keys:
+                self._evict(next(iter(self._heaps)))
+
+            return heap
+
+    def _join(self, agent: "AgentInfo", key: HeapKey, heap: _LoadHeap, push: bool = True) -> None:
+        """Agent 加入堆"""
+        self._memberships.setdefault(agent.agent_id, set()).add(key)
+        with heap.lock:
+            heap.members.add(agent.agent_id)
+            if agent.current_load < agent.max_load:
+                if push:
+                    heapq.heappush(heap.entries, self._entry(agent))
+                else:
+                    heap.entries.append(self._entry(agent))
+
+    def _evict(self, key: HeapKey) -> None:
+        """淘汰能力键对应的堆"""
+        heap = self._heaps.pop(key)
+        for agent_id in heap.members:
+            keys = self._memberships.get(agent_id)
+            if keys is not None:
+                keys.discard(key)
+
+    def _maybe_compact(self, heap: _LoadHeap) -> None:
+        """过期元素过多时按成员重建堆"""
+        if len(heap.entries) <= 2 * len(heap.members) + 16:
+            return
+
+        agents = [self._agents.get(agent_id) for agent_id in heap.members]
+        heap.entries = [
+            self._entry(agent)
+            for agent in agents
+            if agent is not None and agent.current_load < agent.max_load
+        ]
+        heapq.heapify(heap.entries)
+
+    def _entry(self, agent: "AgentInfo") -> _HeapEntry:
+        return (
+            agent.current_load,
+            self._order.get(agent.agent_id, 0),
+            agent.agent_id,
+            self._versions[agent.agent_id],
+        )
+
+    @staticmethod
+    def _matches(agent: "AgentInfo", key: HeapKey) -> bool:
+        capability, agent_type = key
+        if agent_type and agent.agent_type != agent_type:
+            return False
+        return any(capability_matches(cap, capability) for cap in agent.capabilities)
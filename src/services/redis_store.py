@@ -0,0 +1,445 @@
+"""
+Redis 分派存储
+
+职责：
+- 多进程 / 多副本共享的 Agent 注册表
+- Lua 脚本实现原子的负载预留与释放
+- 共享的任务分配记录
+
+键结构（prefix 默认为 ecis:dispatch）：
+- {prefix}:agents              所有 Agent ID 集合
+- {prefix}:agent:{agent_id}    Agent 哈希（含 load 字段；设租约时含 lease_ttl_ms、lease_expired）
+- {prefix}:lease:{agent_id}    Agent 心跳租约，带 TTL，心跳时刷新
+- {prefix}:task:{task_id}      任务分配哈希
+- {prefix}:version             注册表版本号，注册表变化时递增
+"""
+
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from redis.asyncio import Redis
+
+from src.services.task_dispatcher import AgentInfo, TaskAssignment
+
+# 预留：Agent 为 ready、未满载且租约（如有）未过期时负载加一
+# 返回 {是否成功, 当前负载, 注册表版本}，Agent 不存在时负载为 -1
+_RESERVE_SCRIPT = """
+local status = redis.call('HGET', KEYS[1], 'status')
+local version = tonumber(redis.call('GET', KEYS[2]) or '0')
+if not status then
+    return {0, -1, version}
+end
+local load = tonumber(redis.call('HGET', KEYS[1], 'load') or '0')
+local max_load = tonumber(redis.call('HGET', KEYS[1], 'max_load') or '0')
+if status ~= 'ready' or load >= max_load then
+    return {0, load, version}
+end
+if redis.call('HEXISTS', KEYS[1], 'lease_ttl_ms') == 1 and redis.call('EXISTS', KEYS[3]) == 0 then
+    return {0, load, version}
+end
+load = redis.call('HINCRBY', KEYS[1], 'load', 1)
+return {1, load, version}
+"""
+
+# 释放：负载减一，不低于零，返回当前负载
+_RELEASE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+local load = redis.call('HINCRBY', KEYS[1], 'load', -1)
+if load < 0 then
+    redis.call('HSET', KEYS[1], 'load', 0)
+    load = 0
+end
+return load
+"""
+
+# 完成任务：仅当任务仍在执行中时更新状态并释放负载（保证只释放一次）
+# 返回 {是否释放, Agent 当前负载}
+_FINISH_SCRIPT = """
+local status = redis.call('HGET', KEYS[1], 'status')
+if status ~= 'assigned' and status ~= 'accepted' then
+    return {0, -1}
+end
+redis.call('HSET', KEYS[1], 'status', ARGV[1])
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[2]))
+if redis.call('EXISTS', KEYS[2]) == 0 then
+    return {1, -1}
+end
+local load = redis.call('HINCRBY', KEYS[2], 'load', -1)
+if load < 0 then
+    redis.call('HSET', KEYS[2], 'load', 0)
+    load = 0
+end
+return {1, load}
+"""
+
+# 续约：ARGV[1] 为租约时长（毫秒），0 表示沿用已登记的时长；租约过期而离线的 Agent 恢复 ready
+# 返回 {租约时长（毫秒，0 为未设租约或 Agent 不存在）, 是否恢复}
+_RENEW_LEASE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return {0, 0}
+end
+local ttl = tonumber(ARGV[1])
+if ttl <= 0 then
+    ttl = tonumber(redis.call('HGET', KEYS[1], 'lease_ttl_ms') or '0')
+end
+if ttl <= 0 then
+    return {0, 0}
+end
+redis.call('HSET', KEYS[1], 'lease_ttl_ms', ttl)
+redis.call('SET', KEYS[2], '1', 'PX', ttl)
+if redis.call('HGET', KEYS[1], 'lease_expired') ~= '1' then
+    return {ttl, 0}
+end
+redis.call('HDEL', KEYS[1], 'lease_expired')
+redis.call('HSET', KEYS[1], 'status', 'ready')
+redis.call('INCR', KEYS[3])
+return {ttl, 1}
+"""
+
+# 过期检查：租约仍有效（由其他副本续约）时返回剩余毫秒数；
+# 已过期时 Agent 置为 offline 并返回 -1；Agent 不存在或未设租约时返回 0
+_EXPIRE_LEASE_SCRIPT = """
+local remaining = redis.call('PTTL', KEYS[2])
+if remaining > 0 then
+    return remaining
+end
+if redis.call('HEXISTS', KEYS[1], 'lease_ttl_ms') == 0 then
+    return 0
+end
+if redis.call('HGET', KEYS[1], 'lease_expired') ~= '1' then
+    redis.call('HSET', KEYS[1], 'status', 'offline', 'lease_expired', '1')
+    redis.call('INCR', KEYS[3])
+end
+return -1
+"""
+
+# 合并心跳元数据：ARGV[1] 为 JSON 对象，按键覆盖已保存的元数据；Agent 不存在时返回 0
+_MERGE_METADATA_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+local metadata = cjson.decode(redis.call('HGET', KEYS[1], 'metadata') or '{}')
+for k, v in pairs(cjson.decode(ARGV[1])) do
+    metadata[k] = v
+end
+redis.call('HSET', KEYS[1], 'metadata', cjson.encode(metadata))
+return 1
+"""
+
+
+def _decode(value: Any) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+def _decode_row(row: Dict[Any, Any]) -> Dict[str, str]:
+    """哈希字段解码为字符串（客户端未开启 decode_responses 时为 bytes）"""
+    return {_decode(k): _decode(v) for k, v in row.items()}
+
+
+class RedisDispatchStore:
+    """Redis 分派存储"""
+
+    def __init__(
+        self,
+        redis: Redis,
+        prefix: str = "ecis:dispatch",
+        finished_task_ttl: int = 86400,
+        active_task_ttl: int = 7 * 86400,
+    ):
+        """
+        参数:
+            redis: Redis 异步客户端
+            prefix: 键前缀
+            finished_task_ttl: 已结束任务记录的保留秒数
+            active_task_ttl: 执行中任务记录的保留秒数（进程崩溃等原因未能结束的记录到期清理）
+        """
+        self._redis = redis
+        self._prefix = prefix
+        self._finished_task_ttl = finished_task_ttl
+        self._active_task_ttl = active_task_ttl
+        self._reserve = redis.register_script(_RESERVE_SCRIPT)
+        self._release = redis.register_script(_RELEASE_SCRIPT)
+        self._finish = redis.register_script(_FINISH_SCRIPT)
+        self._renew_lease = redis.register_script(_RENEW_LEASE_SCRIPT)
+        self._expire_lease = redis.register_script(_EXPIRE_LEASE_SCRIPT)
+        self._merge_metadata = redis.register_script(_MERGE_METADATA_SCRIPT)
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisDispatchStore":
+        """根据 Redis URL 创建存储"""
+        return cls(Redis.from_url(url, decode_responses=True), **kwargs)
+
+    # ============ 键 ============
+
+    @property
+    def _agents_key(self) -> str:
+        return f"{self._prefix}:agents"
+
+    @property
+    def _version_key(self) -> str:
+        return f"{self._prefix}:version"
+
+    def _agent_key(self, agent_id: str) -> str:
+        return f"{self._prefix}:agent:{agent_id}"
+
+    def _lease_key(self, agent_id: str) -> str:
+        return f"{self._prefix}:lease:{agent_id}"
+
+    def _task_key(self, task_id: str) -> str:
+        return f"{self._prefix}:task:{task_id}"
+
+    # ============ Agent 注册表 ============
+
+    async def save_agent(self, agent: AgentInfo) -> None:
+        """
+        保存 Agent（已存在时保留共享负载）
+
+        参数:
+            agent: Agent 信息
+        """
+        key = self._agent_key(agent.agent_id)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.hset(
+                key,
+                mapping={
+                    "agent_id": agent.agent_id,
+                    "agent_type": agent.agent_type,
+                    "capabilities": json.dumps(agent.capabilities),
+                    "status": agent.status,
+                    "max_load": agent.max_load,
+                    "metadata": json.dumps(agent.metadata),
+                },
+            )
+            pipe.hsetnx(key, "load", agent.current_load)
+            pipe.sadd(self._agents_key, agent.agent_id)
+            pipe.incr(self._version_key)
+            await pipe.execute()
+
+    async def delete_agent(self, agent_id: str) -> None:
+        """
+        删除 Agent
+
+        参数:
+            agent_id: Agent ID
+        """
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.delete(self._agent_key(agent_id), self._lease_key(agent_id))
+            pipe.srem(self._agents_key, agent_id)
+            pipe.incr(self._version_key)
+            await pipe.execute()
+
+    async def set_agent_status(self, agent_id: str, status: str) -> None:
+        """
+        更新 Agent 状态
+
+        参数:
+            agent_id: Agent ID
+            status: 新状态
+        """
+        key = self._agent_key(agent_id)
+        if not await self._redis.exists(key):
+            return
+
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, "status", status)
+            pipe.incr(self._version_key)
+            await pipe.execute()
+
+    async def merge_agent_metadata(self, agent_id: str, metadata: Dict[str, Any]) -> bool:
+        """
+        合并 Agent 上报的元数据（不递增注册表版本，其他进程在下次刷新时读到）
+
+        参数:
+            agent_id: Agent ID
+            metadata: 上报的元数据
+
+        返回:
+            Agent 是否存在
+        """
+        merged = await self._merge_metadata(
+            keys=[self._agent_key(agent_id)], args=[json.dumps(metadata)]
+        )
+        return int(merged) == 1
+
+    async def load_agents(self) -> Tuple[List[AgentInfo], int]:
+        """
+        读取全部 Agent
+
+        返回:
+            (Agent 列表, 注册表版本)
+        """
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.smembers(self._agents_key)
+            pipe.get(self._version_key)
+            agent_ids, version = await pipe.execute()
+
+        agent_ids = sorted(agent_ids)
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for agent_id in agent_ids:
+                pipe.hgetall(self._agent_key(agent_id))
+            rows = await pipe.execute()
+
+        agents = [
+            AgentInfo(
+                agent_id=row["agent_id"],
+                agent_type=row["agent_type"],
+                capabilities=json.loads(row["capabilities"]),
+                status=row["status"],
+                current_load=int(row.get("load", 0)),
+                max_load=int(row["max_load"]),
+                metadata=json.loads(row.get("metadata") or "{}"),
+            )
+            for row in map(_decode_row, rows)
+            if row and "agent_id" in row
+        ]
+        return agents, int(version or 0)
+
+    # ============ 负载 ============
+
+    async def reserve(self, agent_id: str) -> Tuple[bool, int, int]:
+        """
+        原子预留 Agent 负载
+
+        参数:
+            agent_id: Agent ID
+
+        返回:
+            (是否成功, 当前共享负载（Agent 不存在时为 -1）, 注册表版本)
+        """
+        ok, load, version = await self._reserve(
+            keys=[self._agent_key(agent_id), self._version_key, self._lease_key(agent_id)]
+        )
+        return ok == 1, int(load), int(version)
+
+    async def release(self, agent_id: str) -> int:
+        """
+        释放 Agent 负载
+
+        参数:
+            agent_id: Agent ID
+
+        返回:
+            当前共享负载
+        """
+        return int(await self._release(keys=[self._agent_key(agent_id)]))
+
+    # ============ 心跳租约 ============
+
+    async def renew_lease(self, agent_id: str, ttl: float = 0) -> Tuple[float, bool]:
+        """
+        创建或续约 Agent 租约
+
+        参数:
+            agent_id: Agent ID
+            ttl: 租约时长（秒），0 表示沿用已登记的时长
+
+        返回:
+            (租约时长（秒，0 为未设租约或 Agent 不存在）, 是否从租约过期的 offline 恢复为 ready)
+        """
+        ttl_ms, restored = await self._renew_lease(
+            keys=[self._agent_key(agent_id), self._lease_key(agent_id), self._version_key],
+            args=[int(ttl * 1000)],
+        )
+        return int(ttl_ms) / 1000, restored == 1
+
+    async def clear_lease(self, agent_id: str) -> None:
+        """
+        移除 Agent 租约
+
+        参数:
+            agent_id: Agent ID
+        """
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.delete(self._lease_key(agent_id))
+            pipe.hdel(self._agent_key(agent_id), "lease_ttl_ms", "lease_expired")
+            await pipe.execute()
+
+    async def expire_lease(self, agent_id: str) -> float:
+        """
+        检查本地到期的租约在共享存储中是否也已过期，过期时将 Agent 置为 offline
+
+        参数:
+            agent_id: Agent ID
+
+        返回:
+            剩余时长（秒，其他副本已续约）；-1 表示已过期；0 表示 Agent 不存在或未设租约
+        """
+        remaining = int(
+            await self._expire_lease(
+                keys=[self._agent_key(agent_id), self._lease_key(agent_id), self._version_key]
+            )
+        )
+        return remaining / 1000 if remaining > 0 else float(remaining)
+
+    # ============ 任务分配 ============
+
+    async def save_assignment(self, assignment: TaskAssignment) -> None:
+        """
+        保存任务分配
+
+        参数:
+            assignment: 任务分配
+        """
+        key = self._task_key(assignment.task_id)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.hset(
+                key,
+                mapping={
+                    "task_id": assignment.task_id,
+                    "agent_id": assignment.agent_id,
+                    "agent_type": assignment.agent_type,
+                    "capability": assignment.capability,
+                    "assigned_at": assignment.assigned_at.isoformat(),
+                    "status": assignment.status,
+                },
+            )
+            pipe.expire(key, self._active_task_ttl)
+            await pipe.execute()
+
+    async def get_assignment(self, task_id: str) -> Optional[TaskAssignment]:
+        """
+        读取任务分配
+
+        参数:
+            task_id: 任务 ID
+
+        返回:
+            任务分配，不存在时返回 None
+        """
+        row = _decode_row(await self._redis.hgetall(self._task_key(task_id)))
+        if not row:
+            return None
+
+        return TaskAssignment(
+            task_id=row["task_id"],
+            agent_id=row["agent_id"],
+            agent_type=row["agent_type"],
+            capability=row["capability"],
+            assigned_at=datetime.fromisoformat(row["assigned_at"]),
+            status=row["status"],
+        )
+
+    async def finish_assignment(self, task_id: str, agent_id: str, status: str) -> Tuple[bool, int]:
+        """
+        结束任务并释放负载（只释放一次）
+
+        参数:
+            task_id: 任务 ID
+            agent_id: Agent ID
+            status: 结束状态（completed / failed）
+
+        返回:
+            (是否释放, Agent 当前共享负载，Agent 不存在或未释放时为 -1)
+        """
+        released, load = await self._finish(
+            keys=[self._task_key(task_id), self._agent_key(agent_id)],
+            args=[status, self._finished_task_ttl],
+        )
+        return released == 1, int(load)
+
+    async def close(self) -> None:
+        """关闭连接"""
+        await self._redis.aclose()
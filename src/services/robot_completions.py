@@ -0,0 +1,189 @@
+"""
+机器人任务完成回调
+
+职责：
+- 等待机器人任务的 Activity 登记任务 ID 与 task token 后以异步完成方式立即返回，
+  机器人执行期间不占用 Worker 的 Activity 槽位
+- 完成事件（Federation 推送或本地 HTTP 回调）到达时按任务 ID 取出 task token，完成该 Activity
+- 完成事件先于登记到达时暂存结果，登记时直接返回
+
+Worker 与 API 分属不同进程，登记表须放在 Redis（REDIS_ROBOT_COMPLETIONS_ENABLED），
+否则 Worker 启动时报错；进程内登记表仅用于测试。
+task token 与暂存结果都只能被取走一次，保证同一任务只完成一次。
+"""
+
+import base64
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Protocol, Tuple
+
+from temporalio.client import Client
+
+from src.core.config import get_config
+
+# 登记与暂存结果在超时之外额外保留的时间（秒）
+_TTL_MARGIN_SECONDS = 300
+
+
+class CompletionRegistry(Protocol):
+    """登记表：键值带过期时间，取走即删除"""
+
+    async def put(self, key: str, value: Any, ttl_seconds: int) -> None: ...
+
+    async def peek(self, key: str) -> Optional[Any]: ...
+
+    async def take(self, key: str) -> Optional[Any]: ...
+
+
+class InMemoryCompletionRegistry:
+    """进程内登记表（测试用）"""
+
+    def __init__(self) -> None:
+        # 键 → (过期时间, 值)
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    async def put(self, key: str, value: Any, ttl_seconds: int) -> None:
+        now = time.monotonic()
+        # 顺带清理最早写入且已过期的条目
+        while self._entries:
+            oldest = next(iter(self._entries.values()))
+            if oldest[0] > now:
+                break
+            self._entries.popitem(last=False)
+        self._entries[key] = (now + ttl_seconds, value)
+        self._entries.move_to_end(key)
+
+    async def peek(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+    async def take(self, key: str) -> Optional[Any]:
+        entry = self._entries.pop(key, None)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+
+class RedisCompletionRegistry:
+    """
+    Redis 登记表
+
+    键结构：{prefix}:{键}，值为 JSON；取走使用 GETDEL（Redis 6.2+）保证只有一方取到
+    """
+
+    def __init__(self, redis: Any, prefix: str = "ecis:robot-completion"):
+        self._redis = redis
+        self._prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisCompletionRegistry":
+        from redis.asyncio import Redis
+
+        return cls(Redis.from_url(url, decode_responses=True), **kwargs)
+
+    async def put(self, key: str, value: Any, ttl_seconds: int) -> None:
+        await self._redis.set(f"{self._prefix}:{key}", json.dumps(value), ex=ttl_seconds)
+
+    async def peek(self, key: str) -> Optional[Any]:
+        raw = await self._redis.get(f"{self._prefix}:{key}")
+        return json.loads(raw) if raw is not None else None
+
+    async def take(self, key: str) -> Optional[Any]:
+        raw = await self._redis.getdel(f"{self._prefix}:{key}")
+        return json.loads(raw) if raw is not None else None
+
+
+def _encode_token(task_token: bytes) -> str:
+    return base64.b64encode(task_token).decode()
+
+
+class RobotTaskCompletions:
+    """机器人任务完成：登记等待方、投递完成事件"""
+
+    def __init__(self, registry: CompletionRegistry):
+        """
+        参数:
+            registry: 登记表（InMemoryCompletionRegistry 或 RedisCompletionRegistry）
+        """
+        self._registry = registry
+
+    async def register(
+        self, task_id: str, task_token: bytes, timeout_seconds: int
+    ) -> Optional[Dict[str, Any]]:
+        """
+        登记等待任务完成的 Activity
+
+        参数:
+            task_id: 机器人任务 ID
+            task_token: Activity 的 task token
+            timeout_seconds: 等待超时
+
+        返回:
+            完成事件已先到达时为其结果（Activity 应直接返回），否则为 None（Activity 应异步完成）
+        """
+        ttl = timeout_seconds + _TTL_MARGIN_SECONDS
+        await self._registry.put(f"token:{task_id}", _encode_token(task_token), ttl)
+        if await self._registry.peek(f"result:{task_id}") is None:
+            return None
+        # 结果已先到达：与投递方竞争取走 token，取到的一方负责完成
+        if await self._registry.take(f"token:{task_id}") is None:
+            return None
+        result: Optional[Dict[str, Any]] = await self._registry.take(f"result:{task_id}")
+        return result
+
+    async def complete(
+        self,
+        client: Client,
+        task_id: str,
+        status: str,
+        result: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        """
+        投递任务完成事件
+
+        参数:
+            client: Temporal 客户端
+            task_id: 机器人任务 ID
+            status: completed / failed
+            result: 任务结果
+
+        返回:
+            是否已完成等待中的 Activity；尚无等待方时暂存结果并返回 False
+        """
+        payload = {"task_id": task_id, "status": status, "result": result or {}}
+        token = await self._registry.take(f"token:{task_id}")
+        if token is None:
+            ttl = get_config().worker.robot_completion_result_ttl_seconds
+            await self._registry.put(f"result:{task_id}", payload, ttl)
+            # 暂存期间等待方可能刚完成登记：再取一次 token
+            token = await self._registry.take(f"token:{task_id}")
+            if token is None:
+                return False
+            payload = await self._registry.take(f"result:{task_id}") or payload
+
+        handle = client.get_async_activity_handle(task_token=base64.b64decode(token))
+        await handle.complete(payload)
+        return True
+
+
+# 单例
+_robot_task_completions: Optional[RobotTaskCompletions] = None
+
+
+def get_robot_task_completions() -> RobotTaskCompletions:
+    """获取机器人任务完成单例"""
+    global _robot_task_completions
+    if _robot_task_completions is None:
+        config = get_config()
+        registry: CompletionRegistry
+        if config.redis.robot_completions_enabled:
+            registry = RedisCompletionRegistry.from_url(
+                config.redis.url, prefix=config.redis.robot_completions_prefix
+            )
+        else:
+            registry = InMemoryCompletionRegistry()
+        _robot_task_completions = RobotTaskCompletions(registry)
+    return _robot_task_completions
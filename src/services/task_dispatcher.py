@@ -5,14 +5,52 @@
 - 任务分派给合适的 Agent
 - Agent 能力匹配
 - 负载均衡
+- 位置感知选择：任务参数带楼层 / 坐标时按评分器（负载、电量、楼层、距离）选择
+
+并发：
+- 分派采用“预留 → 下发 → 提交”：先以比较并交换（CAS）方式预留 Agent 负载，
+  下发失败时释放预留，Agent 负载任何时刻都不会超过 max_load
+- CAS 由按 Agent 分片的锁保护，不存在串行化所有分派的全局锁
+- 所有锁只保护内存操作，不会跨 await 持有
+
+任务分配：
+- _assignments 只保存执行中的分配；结束的分配移入有界的 AssignmentHistory，
+  可选批量写入 task_records 表
+- 按 Agent 索引执行中的任务，Agent 注销或心跳租约过期时其任务重新分派给其他 Agent
+- 暂无可用 Agent 时可排队等待（queue=True），Agent 空闲或恢复 ready 时
+  按优先级、入队顺序从队列分派；队列满时拒绝（DispatchQueueFullError）
+
+多进程：
+- 配置共享存储（RedisDispatchStore）时，本地注册表作为读穿透缓存，
+  负载以共享存储为准：本地预留后还需在共享存储中原子确认
+- 注册表变更异步写入共享存储，其他进程通过版本号发现变化后刷新
 """
 
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Callable, Coroutine, Dict, List, Optional, Set, Tuple
+import asyncio
+import functools
+import heapq
+import logging
+import threading
+import time
 import uuid
 
-from src.core.exceptions import NoAvailableAgentError, TaskDispatchError
+from src.core.config import DispatcherConfig, get_config
+from src.core.exceptions import NoAvailableAgentError, OrchestratorError, TaskDispatchError
+from src.services.agent_leases import LeaseTable
+from src.services.agent_scoring import AgentScorer, ScoringContext, create_scorer
+from src.services.assignment_history import AssignmentHistory
+from src.services.capability_index import CapabilityIndex, capability_matches
+from src.services.dispatch_queue import DispatchQueue, QueueKey
+from src.services.dispatch_stats import DispatchStats
+from src.services.load_balancer import LeastLoadedSelector
+
+if TYPE_CHECKING:
+    from src.services.redis_store import RedisDispatchStore
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass
@@ -37,35 +75,188 @@ class TaskAssignment:
     agent_type: str
     capability: str
     assigned_at: datetime
-    status: str  # assigned, accepted, rejected, completed, failed
+    status: str  # queued, assigned, accepted, rejected, completed, failed
+    finished_at: Optional[datetime] = None
+    priority: int = 3
+    parameters: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class DispatchRequest:
+    """批量分派中的单个任务请求"""
+
+    capability: str
+    parameters: Dict[str, Any] = field(default_factory=dict)
+    agent_type: Optional[str] = None
+    prefer_agent_id: Optional[str] = None
+    priority: int = 3
+    # 暂无可用 Agent 时排队等待
+    queue: bool = False
+
+
+@dataclass
+class DispatchResult:
+    """批量分派中的单个任务结果"""
+
+    index: int
+    assignment: Optional[TaskAssignment] = None
+    error: Optional[Dict[str, Any]] = None
+
+    @property
+    def success(self) -> bool:
+        return self.assignment is not None
+
+
+# 仍占用 Agent 负载的任务状态
+ACTIVE_TASK_STATUSES = ("assigned", "accepted")
+
+
+class _LockStripes:
+    """分片锁：按键哈希映射到固定数量的锁"""
+
+    def __init__(self, size: int = 64):
+        self._locks = [threading.Lock() for _ in range(size)]
+
+    def __call__(self, key: str) -> threading.Lock:
+        return self._locks[hash(key) % len(self._locks)]
 
 
 class TaskDispatcher:
     """任务分派服务"""
 
-    def __init__(self):
+    def __init__(
+        self,
+        store: Optional["RedisDispatchStore"] = None,
+        config: Optional[DispatcherConfig] = None,
+        scorer: Optional[AgentScorer] = None,
+    ):
+        """
+        参数:
+            store: 共享分派存储，为空时仅使用进程内状态
+            config: 分派配置，为空时使用全局配置
+            scorer: 位置感知评分器，为空时按配置创建默认评分器
+        """
+        if config is None:
+            config = get_config().dispatcher
+        self._config = config
+
         # 内存中的 Agent 注册表（实际应该从 Federation 获取）
         self._agents: Dict[str, AgentInfo] = {}
+        # 执行中的任务分配
         self._assignments: Dict[str, TaskAssignment] = {}
+        # Agent ID → 执行中的任务 ID
+        self._agent_tasks: Dict[str, Set[str]] = {}
+        # 等待可用 Agent 的任务
+        self._queue = DispatchQueue(config.queue_max_depth)
+        # 已结束的任务分配
+        self._history = AssignmentHistory(
+            max_size=config.history_max_size,
+            ttl=config.history_ttl_seconds,
+            persist=config.history_persist,
+        )
+        # 增量维护的统计计数器
+        self._stats = DispatchStats()
+
+        # 能力索引，仅包含 ready 状态的 Agent
+        self._capability_index = CapabilityIndex()
+        # 全部已注册 Agent 的能力索引，用于判断任务能否排队等待
+        self._registered_index = CapabilityIndex()
+        # 注册顺序，保证查找结果顺序稳定
+        self._agent_order: Dict[str, int] = {}
+        self._next_order = 0
+        # 按能力维护的最小负载堆
+        self._load_balancer = LeastLoadedSelector(
+            self._agents, self._agent_order, self._capability_index.lookup
+        )
+        # 心跳租约：过期的 Agent 置为 offline，心跳恢复后重新 ready
+        self._leases = LeaseTable()
+        self._lease_ttls: Dict[str, float] = {}
+        self._lease_expired: Set[str] = set()
+        self._lease_task: Optional[asyncio.Task] = None
+
+        # 带位置的任务使用的评分器
+        if scorer is None and config.location_scoring:
+            scorer = create_scorer()
+        self._scorer = scorer
+
+        # 注册表变更锁（注册、注销、状态变化）
+        self._registry_lock = threading.RLock()
+        # 按 Agent 分片的负载锁，用于预留 / 释放
+        self._load_locks = _LockStripes()
+        # 按任务分片的状态锁，避免重复完成导致重复释放
+        self._task_locks = _LockStripes()
+        # 单次分派最多重新选择的次数
+        self._max_reserve_attempts = 8
 
-    def register_agent(self, agent: AgentInfo) -> None:
+        # 共享存储
+        self._store = store
+        self._store_version = -1
+        self._store_synced_at = 0.0
+        # 未命中时两次读穿透刷新的最小间隔（秒）
+        self._store_sync_interval = 1.0
+        self._store_sync_task: Optional[asyncio.Task] = None
+        # 有排队任务时定期刷新，分派到其他进程释放负载的 Agent
+        self._queue_task: Optional[asyncio.Task] = None
+        # 已在本地注册、尚未写入共享存储的 Agent
+        self._unsaved_agents: Set[str] = set()
+        # 无事件循环时暂存的后台操作，在下次异步操作时执行
+        self._pending_ops: List[Callable[[], Coroutine[Any, Any, Any]]] = []
+        self._background: Set[asyncio.Task] = set()
+
+    def register_agent(self, agent: AgentInfo, lease_ttl: Optional[float] = None) -> None:
         """
         注册 Agent
 
         参数:
             agent: Agent 信息
+            lease_ttl: 心跳租约时长（秒），为空或 0 时不设租约
         """
-        self._agents[agent.agent_id] = agent
+        self._register_local(agent)
+        if self._store is not None:
+            self._unsaved_agents.add(agent.agent_id)
+            self._schedule(lambda: self._save_agent(agent, lease_ttl))
+
+        self._lease_expired.discard(agent.agent_id)
+        if lease_ttl:
+            self._lease_ttls[agent.agent_id] = lease_ttl
+            self._leases.renew(agent.agent_id, lease_ttl)
+        else:
+            self._lease_ttls.pop(agent.agent_id, None)
+            self._leases.remove(agent.agent_id)
 
-    def unregister_agent(self, agent_id: str) -> None:
+        self._drain_queue(agent.agent_id)
+
+    def unregister_agent(self, agent_id: str, requeue: bool = True) -> List[TaskAssignment]:
         """
         注销 Agent
 
         参数:
             agent_id: Agent ID
+            requeue: 是否将 Agent 执行中的任务重新分派给其他 Agent（后台进行），
+                为 False 时这些任务标记为失败
+
+        返回:
+            Agent 注销时执行中的任务
         """
-        if agent_id in self._agents:
-            del self._agents[agent_id]
+        self._unregister_local(agent_id)
+        store = self._store
+        if store is not None:
+            self._schedule(lambda: store.delete_agent(agent_id))
+
+        self._leases.remove(agent_id)
+        self._lease_ttls.pop(agent_id, None)
+        self._lease_expired.discard(agent_id)
+
+        orphaned = self._detach_agent_tasks(agent_id)
+        if requeue:
+            for assignment in orphaned:
+                self._schedule(functools.partial(self._requeue, assignment))
+        else:
+            for assignment in orphaned:
+                self.complete_task(assignment.task_id, success=False)
+                # 共享记录同样标记为失败，否则一直停留在 assigned
+                self._schedule(functools.partial(self._store_release, assignment))
+        return orphaned
 
     def update_agent_status(self, agent_id: str, status: str) -> None:
         """
@@ -75,8 +266,449 @@ class TaskDispatcher:
             agent_id: Agent ID
             status: 新状态
         """
-        if agent_id in self._agents:
-            self._agents[agent_id].status = status
+        if not self._set_status_local(agent_id, status):
+            return
+        store = self._store
+        if store is not None:
+            self._schedule(lambda: store.set_agent_status(agent_id, status))
+        self._drain_queue(agent_id)
+
+    # ============ 心跳租约 ============
+
+    def heartbeat(self, agent_id: str, metadata: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Agent 心跳：续约，并合并上报的元数据（楼层、电量等）
+
+        租约过期被置为 offline 的 Agent 恢复为 ready。
+        未设租约的 Agent 按配置的默认时长开始租约。
+        使用共享存储时租约在存储中续约、元数据合并到存储中的 Agent（后台进行），
+        各进程以存储中的租约为准，刷新注册表时读到合并后的元数据。
+
+        参数:
+            agent_id: Agent ID
+            metadata: 上报的元数据
+
+        返回:
+            Agent 是否存在
+        """
+        agent = self._agents.get(agent_id)
+        if agent is None:
+            return False
+
+        ttl = self._lease_ttls.get(agent_id) or self._config.lease_ttl_seconds
+        if ttl > 0:
+            self._lease_ttls[agent_id] = ttl
+            self._leases.renew(agent_id, ttl)
+
+        if metadata:
+            with self._registry_lock:
+                agent.metadata.update(metadata)
+                if self._scorer is not None:
+                    self._scorer.update(agent)
+
+        if self._store is not None:
+            self._schedule(lambda: self._renew_shared_lease(agent_id, ttl, metadata))
+        elif agent_id in self._lease_expired:
+            self._lease_expired.discard(agent_id)
+            self.update_agent_status(agent_id, "ready")
+        return True
+
+    def expire_leases(self, now: Optional[float] = None) -> List[str]:
+        """
+        处理过期租约：Agent 置为 offline，其执行中的任务后台重新分派
+
+        使用共享存储时先在存储中确认（后台进行）：心跳可能发往了其他进程，
+        存储中的租约仍有效时只延长本地租约。
+
+        参数:
+            now: 当前单调时间，默认取时钟
+
+        返回:
+            本次本地租约到期的 Agent ID
+        """
+        expired = []
+        for agent_id in self._leases.expire(now):
+            if agent_id not in self._agents:
+                continue
+            if self._store is not None:
+                self._schedule(functools.partial(self._expire_shared_lease, agent_id))
+            else:
+                self._lease_expired.add(agent_id)
+                self.update_agent_status(agent_id, "offline")
+                self._requeue_agent_tasks(agent_id)
+            expired.append(agent_id)
+
+        if expired:
+            logger.warning(f"Agent leases expired: {expired}")
+        return expired
+
+    async def run_lease_monitor(self) -> None:
+        """按最早的租约截止时间检查过期，直到被取消"""
+        interval = self._config.lease_check_interval_seconds
+        while True:
+            self.expire_leases()
+            deadline = self._leases.next_deadline()
+            delay = interval
+            if deadline is not None:
+                delay = min(interval, max(deadline - time.monotonic(), 0.0))
+            await asyncio.sleep(max(delay, 0.01))
+
+    def start_lease_monitor(self) -> None:
+        """在当前事件循环启动租约检查"""
+        if self._lease_task is None or self._lease_task.done():
+            self._lease_task = asyncio.get_running_loop().create_task(self.run_lease_monitor())
+
+    async def run_queue_monitor(self) -> None:
+        """
+        有排队任务时定期从共享存储刷新，直到被取消
+
+        其他进程结束任务释放的负载不会触发本进程的分派，刷新后按共享负载分派排队任务。
+        """
+        interval = self._config.queue_sync_interval_seconds
+        while True:
+            await asyncio.sleep(interval)
+            if not len(self._queue):
+                continue
+            try:
+                await self.sync_from_store()
+            except Exception as e:
+                logger.warning(f"Failed to sync dispatch store for queued tasks: {e}")
+
+    def start_queue_monitor(self) -> None:
+        """使用共享存储时在当前事件循环启动排队任务的定期刷新"""
+        if self._store is None or self._config.queue_sync_interval_seconds <= 0:
+            return
+        if self._queue_task is None or self._queue_task.done():
+            self._queue_task = asyncio.get_running_loop().create_task(self.run_queue_monitor())
+
+    def _requeue_agent_tasks(self, agent_id: str) -> None:
+        for assignment in self._detach_agent_tasks(agent_id):
+            self._schedule(functools.partial(self._requeue, assignment))
+
+    async def _save_agent(self, agent: AgentInfo, lease_ttl: Optional[float]) -> None:
+        """写入共享存储，并登记或移除共享租约"""
+        assert self._store is not None
+        try:
+            await self._store.save_agent(agent)
+        finally:
+            self._unsaved_agents.discard(agent.agent_id)
+        if lease_ttl:
+            await self._store.renew_lease(agent.agent_id, lease_ttl)
+        else:
+            await self._store.clear_lease(agent.agent_id)
+
+    async def _renew_shared_lease(
+        self, agent_id: str, ttl: float, metadata: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """在共享存储中续约并合并元数据；租约在其他进程登记时同步到本地"""
+        assert self._store is not None
+        if metadata:
+            await self._store.merge_agent_metadata(agent_id, metadata)
+        shared_ttl, restored = await self._store.renew_lease(agent_id, ttl)
+        if shared_ttl > 0 and agent_id not in self._leases:
+            self._lease_ttls[agent_id] = shared_ttl
+            self._leases.renew(agent_id, shared_ttl)
+        if restored and self._set_status_local(agent_id, "ready"):
+            self._drain_queue(agent_id)
+
+    async def _expire_shared_lease(self, agent_id: str) -> None:
+        """本地租约到期后以共享存储中的租约为准"""
+        assert self._store is not None
+        remaining = await self._store.expire_lease(agent_id)
+        if remaining > 0:
+            self._leases.renew(agent_id, remaining)
+        elif remaining < 0 and self._set_status_local(agent_id, "offline"):
+            logger.warning(f"Agent lease expired in dispatch store: {agent_id}")
+            self._requeue_agent_tasks(agent_id)
+
+    def _register_local(self, agent: AgentInfo) -> None:
+        """注册 Agent 到本地注册表"""
+        with self._registry_lock:
+            previous = self._agents.get(agent.agent_id)
+            if previous is not None:
+                self._stats.agent_removed(previous.agent_type, previous.status)
+            self._stats.agent_added(agent.agent_type, agent.status)
+
+            self._agents[agent.agent_id] = agent
+            self._registered_index.remove(agent.agent_id)
+            self._registered_index.add(agent.agent_id, agent.capabilities)
+            if self._scorer is not None:
+                self._scorer.update(agent)
+            if agent.agent_id not in self._agent_order:
+                self._agent_order[agent.agent_id] = self._next_order
+                self._next_order += 1
+            self._reindex_agent(agent)
+
+    def _unregister_local(self, agent_id: str) -> None:
+        """从本地注册表注销 Agent"""
+        with self._registry_lock:
+            agent = self._agents.pop(agent_id, None)
+            if agent is not None:
+                self._stats.agent_removed(agent.agent_type, agent.status)
+                self._agent_order.pop(agent_id, None)
+                self._registered_index.remove(agent_id)
+                self._capability_index.remove(agent_id)
+                if self._scorer is not None:
+                    self._scorer.remove(agent_id)
+                self._load_balancer.remove_agent(agent_id)
+
+    def _set_status_local(self, agent_id: str, status: str) -> bool:
+        """更新本地 Agent 状态，返回 Agent 是否存在"""
+        with self._registry_lock:
+            agent = self._agents.get(agent_id)
+            if agent is None:
+                return False
+            if agent.status != status:
+                self._stats.agent_status_changed(agent.agent_type, agent.status, status)
+                agent.status = status
+                self._reindex_agent(agent)
+            return True
+
+    def _reindex_agent(self, agent: AgentInfo) -> None:
+        """根据状态维护能力索引"""
+        if agent.status == "ready":
+            self._capability_index.add(agent.agent_id, agent.capabilities)
+            self._load_balancer.add_agent(agent)
+        else:
+            self._capability_index.remove(agent.agent_id)
+            self._load_balancer.remove_agent(agent.agent_id)
+
+    def _is_available(
+        self,
+        agent: AgentInfo,
+        capability: str,
+        agent_type: Optional[str] = None,
+    ) -> bool:
+        """检查单个 Agent 是否可承接任务"""
+        return (
+            agent.status == "ready"
+            and agent.current_load < agent.max_load
+            and (not agent_type or agent.agent_type == agent_type)
+            and any(capability_matches(cap, capability) for cap in agent.capabilities)
+        )
+
+    def _change_load(self, agent: AgentInfo, delta: int) -> None:
+        """调整 Agent 负载并同步负载堆"""
+        with self._load_locks(agent.agent_id):
+            agent.current_load += delta
+        self._on_load_changed(agent)
+
+    def _on_load_changed(self, agent: AgentInfo) -> None:
+        """负载变化后同步负载堆与评分器"""
+        self._load_balancer.update_load(agent)
+        if self._scorer is not None:
+            self._scorer.update_load(agent)
+
+    def _try_reserve(self, agent: AgentInfo) -> bool:
+        """
+        预留 Agent 负载（比较并交换）
+
+        仅当 Agent 仍为 ready 且未满载时负载加一。
+
+        返回:
+            是否预留成功
+        """
+        with self._load_locks(agent.agent_id):
+            if agent.status != "ready" or agent.current_load >= agent.max_load:
+                return False
+            agent.current_load += 1
+        self._on_load_changed(agent)
+        return True
+
+    def _release(self, agent_id: str) -> None:
+        """释放 Agent 负载预留"""
+        agent = self._agents.get(agent_id)
+        if agent is not None:
+            self._change_load(agent, -1)
+
+    def _set_cached_load(self, agent: AgentInfo, load: int) -> None:
+        """以共享存储中的负载覆盖本地缓存"""
+        with self._load_locks(agent.agent_id):
+            if agent.current_load == load:
+                return
+            agent.current_load = load
+        self._on_load_changed(agent)
+
+    async def _reserve_agent(
+        self,
+        capability: str,
+        agent_type: Optional[str] = None,
+        prefer_agent_id: Optional[str] = None,
+        context: Optional[ScoringContext] = None,
+    ) -> AgentInfo:
+        """
+        选择并预留 Agent
+
+        选择与预留之间 Agent 可能被其他协程 / 线程 / 进程占满，预留失败时重新选择。
+
+        异常:
+            NoAvailableAgentError: 没有可用 Agent
+        """
+        for _ in range(self._max_reserve_attempts):
+            agent = self.select_best_agent(capability, agent_type, prefer_agent_id, context)
+            if self._try_reserve(agent) and await self._confirm_reservation(agent):
+                return agent
+        raise NoAvailableAgentError(capability, agent_type)
+
+    async def _confirm_reservation(self, agent: AgentInfo) -> bool:
+        """
+        在共享存储中确认本地预留
+
+        确认失败说明本地缓存的负载已过期，用共享负载覆盖本地缓存（同时撤销本地预留）。
+        共享存储中已没有该 Agent（被其他进程注销）时从本地注册表移除。
+
+        返回:
+            是否确认成功
+        """
+        if self._store is None:
+            return True
+
+        try:
+            ok, load, version = await self._store.reserve(agent.agent_id)
+            if load < 0 and agent.agent_id in self._unsaved_agents:
+                # 本进程的注册写入尚未完成，以包含本次预留的本地负载写入即完成预留
+                await self._store.save_agent(agent)
+                return True
+        except Exception as e:
+            self._change_load(agent, -1)
+            raise TaskDispatchError(f"Dispatch store unavailable: {e}")
+
+        if load < 0:
+            logger.info(f"Agent {agent.agent_id} no longer in dispatch store, dropping")
+            self._unregister_local(agent.agent_id)
+            return False
+
+        self._set_cached_load(agent, load)
+        if version != self._store_version:
+            self._schedule_store_sync()
+        return ok
+
+    async def _store_release(self, assignment: TaskAssignment) -> None:
+        """在共享存储中将任务标记为失败并释放负载"""
+        if self._store is None:
+            return
+        try:
+            _, load = await self._store.finish_assignment(
+                assignment.task_id, assignment.agent_id, "failed"
+            )
+        except Exception as e:
+            logger.warning(f"Failed to release {assignment.task_id} in dispatch store: {e}")
+            return
+        agent = self._agents.get(assignment.agent_id)
+        if agent is not None and load >= 0:
+            self._set_cached_load(agent, load)
+
+    # ============ 共享存储同步 ============
+
+    async def sync_from_store(self) -> None:
+        """
+        从共享存储刷新本地注册表与负载缓存
+
+        本地有而共享存储没有的 Agent 会被移除；刷新后按最新负载分派排队任务。
+        """
+        if self._store is None:
+            return
+
+        await self.flush_background()
+        agents, version = await self._store.load_agents()
+
+        with self._registry_lock:
+            shared_ids = set()
+            for shared in agents:
+                shared_ids.add(shared.agent_id)
+                local = self._agents.get(shared.agent_id)
+                if local is None or (
+                    local.agent_type != shared.agent_type
+                    or local.capabilities != shared.capabilities
+                    or local.max_load != shared.max_load
+                ):
+                    self._register_local(shared)
+                    continue
+                local.metadata = shared.metadata
+                self._set_status_local(local.agent_id, shared.status)
+                self._set_cached_load(local, shared.current_load)
+                if self._scorer is not None:
+                    self._scorer.update(local)
+
+            for agent_id in [a for a in self._agents if a not in shared_ids]:
+                self._unregister_local(agent_id)
+
+        self._store_version = version
+        self._store_synced_at = time.monotonic()
+
+        # 其他进程释放的负载或恢复 ready 的 Agent 只在刷新后可见
+        for agent_id in list(self._agents):
+            self._drain_queue(agent_id)
+
+    async def flush_background(self) -> None:
+        """等待所有尚未完成的后台操作（共享存储写入、任务重新分派等）"""
+        pending, self._pending_ops = self._pending_ops, []
+        for op in pending:
+            await op()
+        background = [t for t in self._background if t is not asyncio.current_task()]
+        if background:
+            await asyncio.gather(*background, return_exceptions=True)
+
+    async def close(self) -> None:
+        """停止租约检查与排队刷新，写完待写数据并关闭共享存储"""
+        for task in (self._lease_task, self._queue_task):
+            if task is not None:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        self._lease_task = self._queue_task = None
+        await self.flush_background()
+        if self._history.persist:
+            await self.flush_history()
+        if self._store is not None:
+            await self._store.close()
+
+    def _schedule(self, op: Callable[[], Coroutine[Any, Any, Any]]) -> None:
+        """在后台执行异步操作；没有运行中的事件循环时暂存到下次异步操作"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self._pending_ops.append(op)
+            return
+        self._spawn(op())
+
+    def _spawn(self, coro: Coroutine[Any, Any, Any]) -> asyncio.Task:
+        """启动后台任务并持有引用"""
+        task = asyncio.get_running_loop().create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._on_background_done)
+        return task
+
+    def _on_background_done(self, task: asyncio.Task) -> None:
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Dispatcher background operation failed: {task.exception()}")
+
+    def _schedule_store_sync(self) -> None:
+        """注册表版本变化时在后台刷新（同一时间只有一个刷新任务）"""
+        if self._store_sync_task is None or self._store_sync_task.done():
+            self._store_sync_task = self._spawn(self.sync_from_store())
+
+    async def _refresh_on_miss(self) -> bool:
+        """本地未找到可用 Agent 时读穿透刷新，返回是否进行了刷新"""
+        if self._store is None:
+            return False
+        if time.monotonic() - self._store_synced_at < self._store_sync_interval:
+            return False
+        await self.sync_from_store()
+        return True
+
+    async def _deliver_task(self, assignment: TaskAssignment, parameters: Dict[str, Any]) -> None:
+        """
+        下发任务给 Agent
+
+        参数:
+            assignment: 任务分配
+            parameters: 任务参数
+        """
+        # TODO: 通过 Federation 发送任务给 Agent
+        # await self._federation_client.send_task(
+        #     assignment.agent_id, assignment.task_id, parameters
+        # )
 
     def find_available_agents(
         self,
@@ -95,7 +727,13 @@ class TaskDispatcher:
         """
         available = []
 
-        for agent in self._agents.values():
+        # 通过能力索引只访问匹配的 ready Agent
+        for agent_id in sorted(
+            self._capability_index.lookup(capability),
+            key=self._agent_order.__getitem__,
+        ):
+            agent = self._agents[agent_id]
+
             # 检查状态
             if agent.status != "ready":
                 continue
@@ -108,23 +746,6 @@ class TaskDispatcher:
             if agent_type and agent.agent_type != agent_type:
                 continue
 
-            # 检查能力
-            if capability not in agent.capabilities:
-                # 支持通配符匹配
-                capability_parts = capability.split(".")
-                matched = False
-                for cap in agent.capabilities:
-                    cap_parts = cap.split(".")
-                    if len(cap_parts) <= len(capability_parts):
-                        if all(
-                            cp == "*" or cp == capability_parts[i]
-                            for i, cp in enumerate(cap_parts)
-                        ):
-                            matched = True
-                            break
-                if not matched:
-                    continue
-
             available.append(agent)
 
         return available
@@ -134,6 +755,7 @@ class TaskDispatcher:
         capability: str,
         agent_type: Optional[str] = None,
         prefer_agent_id: Optional[str] = None,
+        context: Optional[ScoringContext] = None,
     ) -> AgentInfo:
         """
         选择最佳 Agent
@@ -142,6 +764,7 @@ class TaskDispatcher:
             capability: 所需能力
             agent_type: Agent 类型过滤
             prefer_agent_id: 优先选择的 Agent ID
+            context: 任务位置，带位置时按评分器选择，否则选择负载最低的 Agent
 
         返回:
             最佳 Agent
@@ -149,20 +772,26 @@ class TaskDispatcher:
         异常:
             NoAvailableAgentError: 没有可用 Agent
         """
-        available = self.find_available_agents(capability, agent_type)
-
-        if not available:
-            raise NoAvailableAgentError(capability, agent_type)
-
         # 如果有优先选择的 Agent
         if prefer_agent_id:
-            for agent in available:
-                if agent.agent_id == prefer_agent_id:
-                    return agent
+            agent = self._agents.get(prefer_agent_id)
+            if agent and self._is_available(agent, capability, agent_type):
+                return agent
 
-        # 按负载排序，选择负载最低的
-        available.sort(key=lambda a: a.current_load)
-        return available[0]
+        # 带位置的任务按评分选择
+        if context is not None and context.has_location and self._scorer is not None:
+            agent = self._scorer.select(
+                self.find_available_agents(capability, agent_type), context
+            )
+            if agent is None:
+                raise NoAvailableAgentError(capability, agent_type)
+            return agent
+
+        # 从负载堆取负载最低的 Agent
+        agent_id = self._load_balancer.select(capability, agent_type)
+        if agent_id is None:
+            raise NoAvailableAgentError(capability, agent_type)
+        return self._agents[agent_id]
 
     async def dispatch_task(
         self,
@@ -171,6 +800,7 @@ class TaskDispatcher:
         agent_type: Optional[str] = None,
         prefer_agent_id: Optional[str] = None,
         priority: int = 3,
+        queue: bool = False,
     ) -> TaskAssignment:
         """
         分派任务
@@ -180,35 +810,409 @@ class TaskDispatcher:
             parameters: 任务参数
             agent_type: Agent 类型
             prefer_agent_id: 优先 Agent ID
-            priority: 优先级
+            priority: 优先级（1 最高）
+            queue: 暂无可用 Agent 时是否排队等待
 
         返回:
-            任务分配信息
+            任务分配信息；排队时状态为 queued，agent_id 为空
+
+        异常:
+            NoAvailableAgentError: 没有可用 Agent（排队时为没有任何匹配的 Agent）
+            DispatchQueueFullError: 等待队列已满
         """
-        # 选择 Agent
-        agent = self.select_best_agent(capability, agent_type, prefer_agent_id)
+        context = ScoringContext.from_parameters(parameters)
+
+        # 选择并预留 Agent，本地未命中时从共享存储刷新后重试
+        agent: Optional[AgentInfo] = None
+        try:
+            agent = await self._reserve_agent(capability, agent_type, prefer_agent_id, context)
+        except NoAvailableAgentError:
+            if await self._refresh_on_miss():
+                try:
+                    agent = await self._reserve_agent(
+                        capability, agent_type, prefer_agent_id, context
+                    )
+                except NoAvailableAgentError:
+                    pass
+            if agent is None:
+                if not queue or not self._has_capable_agent(capability, agent_type):
+                    raise NoAvailableAgentError(capability, agent_type)
+                return self._enqueue(capability, parameters, agent_type, priority)
+
+        # 下发并提交
+        assignment = self._new_assignment(agent, capability, parameters, priority)
+        await self._commit(assignment)
+        return assignment
+
+    # ============ 等待队列 ============
 
-        # 创建任务分配
-        task_id = f"task-{uuid.uuid4().hex[:8]}"
+    def _has_capable_agent(self, capability: str, agent_type: Optional[str]) -> bool:
+        """是否存在（不论状态）能承接该能力的已注册 Agent"""
+        for agent_id in self._registered_index.lookup(capability):
+            agent = self._agents.get(agent_id)
+            if agent is not None and (not agent_type or agent.agent_type == agent_type):
+                return True
+        return False
+
+    def _enqueue(
+        self,
+        capability: str,
+        parameters: Dict[str, Any],
+        agent_type: Optional[str],
+        priority: int,
+    ) -> TaskAssignment:
+        """任务入队等待，入队后立即尝试一次分派以免错过并发释放的 Agent"""
         assignment = TaskAssignment(
-            task_id=task_id,
+            task_id=f"task-{uuid.uuid4().hex[:8]}",
+            agent_id="",
+            agent_type=agent_type or "",
+            capability=capability,
+            assigned_at=datetime.now(timezone.utc),
+            status="queued",
+            priority=priority,
+            parameters=parameters,
+        )
+        key = (capability, agent_type)
+        self._queue.push(key, assignment)
+        self._drain_key(key)
+        return assignment
+
+    def _drain_queue(self, agent_id: str) -> None:
+        """Agent 空闲或恢复可用时，从队列取出它能承接的任务分派给它"""
+        if not len(self._queue):
+            return
+        agent = self._agents.get(agent_id)
+        if agent is None:
+            return
+
+        while agent.status == "ready" and agent.current_load < agent.max_load:
+            popped = self._queue.pop_for(agent)
+            if popped is None:
+                return
+            key, assignment, seq = popped
+            if not self._try_reserve(agent):
+                self._queue.restore(key, assignment, seq)
+                return
+            self._assign_queued(key, assignment, seq, agent)
+
+    def _drain_key(self, key: QueueKey) -> None:
+        """为队列键中的任务选择可用 Agent"""
+        capability, agent_type = key
+        attempts = 0
+        while self._queue.depth(key) and attempts < self._max_reserve_attempts:
+            try:
+                agent = self.select_best_agent(capability, agent_type)
+            except NoAvailableAgentError:
+                return
+            if not self._try_reserve(agent):
+                attempts += 1
+                continue
+            popped = self._queue.pop(key)
+            if popped is None:
+                self._release(agent.agent_id)
+                return
+            assignment, seq = popped
+            self._assign_queued(key, assignment, seq, agent)
+
+    def _assign_queued(
+        self, key: QueueKey, assignment: TaskAssignment, seq: int, agent: AgentInfo
+    ) -> None:
+        """将出队的任务分配给已预留的 Agent，后台下发"""
+        assignment.agent_id = agent.agent_id
+        assignment.agent_type = agent.agent_type
+        assignment.assigned_at = datetime.now(timezone.utc)
+        assignment.status = "assigned"
+        self._schedule(lambda: self._commit_queued(key, assignment, seq))
+
+    async def _commit_queued(self, key: QueueKey, assignment: TaskAssignment, seq: int) -> None:
+        """确认共享存储预留并下发出队的任务，预留失败时放回队列"""
+        agent = self._agents.get(assignment.agent_id)
+        try:
+            confirmed = agent is not None and await self._confirm_reservation(agent)
+        except TaskDispatchError:
+            confirmed = False
+        if not confirmed:
+            assignment.agent_id = ""
+            assignment.status = "queued"
+            self._queue.restore(key, assignment, seq)
+            return
+
+        try:
+            await self._commit(assignment)
+        except TaskDispatchError as e:
+            logger.warning(f"Failed to deliver queued {assignment.task_id}: {e.message}")
+            assignment.status = "failed"
+            assignment.finished_at = datetime.now(timezone.utc)
+            self._history.add(assignment)
+
+    async def dispatch_tasks(self, requests: List[DispatchRequest]) -> List[DispatchResult]:
+        """
+        批量分派任务
+
+        按 (能力, Agent 类型) 分组，每组只查找一次候选 Agent，
+        在组内用局部最小堆依次预留负载最低的 Agent，最后并发下发。
+        单个任务失败不影响其他任务；请求排队的任务暂无可用 Agent 时入队（状态为 queued）。
+
+        参数:
+            requests: 任务请求列表
+
+        返回:
+            与请求顺序一致的结果列表
+        """
+        results = [DispatchResult(index=i) for i in range(len(requests))]
+
+        groups: Dict[Tuple[str, Optional[str]], List[int]] = {}
+        for i, request in enumerate(requests):
+            groups.setdefault((request.capability, request.agent_type), []).append(i)
+
+        # 预留阶段：纯内存操作，不让出事件循环
+        reserved: List[Tuple[int, TaskAssignment]] = []
+        for (capability, agent_type), indexes in groups.items():
+            candidates = [
+                (agent.current_load, self._agent_order.get(agent.agent_id, 0), agent.agent_id)
+                for agent in self.find_available_agents(capability, agent_type)
+            ]
+            heapq.heapify(candidates)
+
+            for i in indexes:
+                request = requests[i]
+                try:
+                    agent = self._reserve_from_candidates(
+                        candidates, capability, agent_type, request.prefer_agent_id
+                    )
+                except OrchestratorError as e:
+                    self._enqueue_or_fail(request, results[i], e)
+                    continue
+                reserved.append((
+                    i,
+                    self._new_assignment(agent, capability, request.parameters, request.priority),
+                ))
+
+        # 共享存储确认：并发确认，失败项单独重新选择
+        if self._store is not None and reserved:
+            reserved = await self._confirm_batch(requests, reserved, results)
+
+        # 下发阶段：并发下发，失败的单独释放
+        outcomes = await asyncio.gather(
+            *[self._commit(assignment) for _, assignment in reserved],
+            return_exceptions=True,
+        )
+        for (i, assignment), outcome in zip(reserved, outcomes):
+            if isinstance(outcome, OrchestratorError):
+                results[i].error = outcome.to_dict()
+            elif isinstance(outcome, BaseException):
+                results[i].error = TaskDispatchError(str(outcome), assignment.task_id).to_dict()
+            else:
+                results[i].assignment = assignment
+
+        return results
+
+    async def _confirm_batch(
+        self,
+        requests: List[DispatchRequest],
+        reserved: List[Tuple[int, TaskAssignment]],
+        results: List[DispatchResult],
+    ) -> List[Tuple[int, TaskAssignment]]:
+        """在共享存储中确认批量预留，返回最终预留成功的项"""
+        outcomes = await asyncio.gather(
+            *[
+                self._confirm_reservation(self._agents[assignment.agent_id])
+                for _, assignment in reserved
+            ],
+            return_exceptions=True,
+        )
+
+        confirmed = []
+        for (i, assignment), outcome in zip(reserved, outcomes):
+            if outcome is True:
+                confirmed.append((i, assignment))
+                continue
+            if isinstance(outcome, OrchestratorError):
+                results[i].error = outcome.to_dict()
+                continue
+
+            request = requests[i]
+            try:
+                agent = await self._reserve_agent(
+                    request.capability, request.agent_type, request.prefer_agent_id
+                )
+            except OrchestratorError as e:
+                self._enqueue_or_fail(request, results[i], e)
+                continue
+            confirmed.append((
+                i,
+                self._new_assignment(agent, request.capability, request.parameters, request.priority),
+            ))
+
+        return confirmed
+
+    def _enqueue_or_fail(
+        self, request: DispatchRequest, result: DispatchResult, error: OrchestratorError
+    ) -> None:
+        """批量分派中未能预留 Agent 的任务：请求排队且有匹配的 Agent 时入队，否则记录错误"""
+        if (
+            isinstance(error, NoAvailableAgentError)
+            and request.queue
+            and self._has_capable_agent(request.capability, request.agent_type)
+        ):
+            try:
+                result.assignment = self._enqueue(
+                    request.capability, request.parameters, request.agent_type, request.priority
+                )
+                return
+            except OrchestratorError as e:
+                error = e
+        result.error = error.to_dict()
+
+    def _reserve_from_candidates(
+        self,
+        candidates: List[Tuple[int, int, str]],
+        capability: str,
+        agent_type: Optional[str] = None,
+        prefer_agent_id: Optional[str] = None,
+    ) -> AgentInfo:
+        """
+        从批量分派的局部候选堆中预留 Agent
+
+        堆元素的负载可能因并发分派或优先 Agent 而过期，出堆时按实际负载校正。
+
+        异常:
+            NoAvailableAgentError: 候选 Agent 均已满载
+        """
+        if prefer_agent_id:
+            agent = self._agents.get(prefer_agent_id)
+            if (
+                agent is not None
+                and self._is_available(agent, capability, agent_type)
+                and self._try_reserve(agent)
+            ):
+                return agent
+
+        while candidates:
+            load, order, agent_id = candidates[0]
+            agent = self._agents.get(agent_id)
+            if agent is None:
+                heapq.heappop(candidates)
+                continue
+            if load != agent.current_load:
+                heapq.heapreplace(candidates, (agent.current_load, order, agent_id))
+                continue
+            if not self._try_reserve(agent):
+                heapq.heappop(candidates)
+                continue
+
+            heapq.heapreplace(candidates, (agent.current_load, order, agent_id))
+            return agent
+
+        raise NoAvailableAgentError(capability, agent_type)
+
+    def _new_assignment(
+        self,
+        agent: AgentInfo,
+        capability: str,
+        parameters: Dict[str, Any],
+        priority: int = 3,
+    ) -> TaskAssignment:
+        """为已预留的 Agent 创建任务分配"""
+        return TaskAssignment(
+            task_id=f"task-{uuid.uuid4().hex[:8]}",
             agent_id=agent.agent_id,
             agent_type=agent.agent_type,
             capability=capability,
             assigned_at=datetime.now(timezone.utc),
             status="assigned",
+            priority=priority,
+            parameters=parameters,
         )
 
-        # 更新 Agent 负载
-        agent.current_load += 1
+    async def _commit(self, assignment: TaskAssignment) -> None:
+        """
+        下发任务并提交分配，下发失败时释放预留
 
-        # 记录分配
-        self._assignments[task_id] = assignment
+        异常:
+            TaskDispatchError: 下发失败
+        """
+        try:
+            if self._store is not None:
+                await self._store.save_assignment(assignment)
+            await self._deliver_task(assignment, assignment.parameters)
+        except Exception as e:
+            self._release(assignment.agent_id)
+            await self._store_release(assignment)
+            raise TaskDispatchError(f"Failed to deliver task: {e}", assignment.task_id)
 
-        # TODO: 通过 Federation 发送任务给 Agent
-        # await self._federation_client.send_task(agent.agent_id, task_id, parameters)
+        self._assignments[assignment.task_id] = assignment
+        self._index_task(assignment)
+        self._stats.task_assigned(assignment.agent_type, assignment.capability)
 
-        return assignment
+    def _index_task(self, assignment: TaskAssignment) -> None:
+        """将执行中的任务加入 Agent 索引"""
+        with self._registry_lock:
+            self._agent_tasks.setdefault(assignment.agent_id, set()).add(assignment.task_id)
+
+    def _unindex_task(self, assignment: TaskAssignment) -> None:
+        """将任务移出 Agent 索引"""
+        with self._registry_lock:
+            task_ids = self._agent_tasks.get(assignment.agent_id)
+            if task_ids is not None:
+                task_ids.discard(assignment.task_id)
+                if not task_ids:
+                    del self._agent_tasks[assignment.agent_id]
+
+    def _detach_agent_tasks(self, agent_id: str) -> List[TaskAssignment]:
+        """取出 Agent 执行中的任务并清空其索引"""
+        with self._registry_lock:
+            task_ids = self._agent_tasks.pop(agent_id, set())
+        return [
+            self._assignments[task_id]
+            for task_id in task_ids
+            if task_id in self._assignments
+        ]
+
+    async def _requeue(self, assignment: TaskAssignment) -> None:
+        """
+        将已注销 / 离线 Agent 的任务重新分派给同类型的其他 Agent（task_id 不变）
+
+        没有可用 Agent 或下发失败时任务标记为失败。
+        """
+        previous_agent_id = assignment.agent_id
+        try:
+            agent = await self._reserve_agent(
+                assignment.capability,
+                assignment.agent_type,
+                context=ScoringContext.from_parameters(assignment.parameters),
+            )
+        except OrchestratorError as e:
+            logger.warning(f"Cannot requeue {assignment.task_id}: {e.message}")
+            await self.finish_task(assignment.task_id, success=False)
+            return
+
+        with self._task_locks(assignment.task_id):
+            finished = assignment.status not in ACTIVE_TASK_STATUSES
+            if not finished:
+                self._stats.task_transitioned(
+                    assignment.agent_type, assignment.capability, assignment.status, "assigned"
+                )
+                assignment.agent_id = agent.agent_id
+                assignment.assigned_at = datetime.now(timezone.utc)
+                assignment.status = "assigned"
+                self._index_task(assignment)
+
+        # 等待期间任务已结束时撤销新预留，否则释放原 Agent 的负载
+        released_agent_id = agent.agent_id if finished else previous_agent_id
+        self._release(released_agent_id)
+        if self._store is not None:
+            await self._store.release(released_agent_id)
+        if finished:
+            return
+
+        try:
+            if self._store is not None:
+                await self._store.save_assignment(assignment)
+            await self._deliver_task(assignment, assignment.parameters)
+        except Exception as e:
+            logger.warning(f"Failed to deliver requeued {assignment.task_id}: {e}")
+            await self.finish_task(assignment.task_id, success=False)
 
     def complete_task(self, task_id: str, success: bool = True) -> None:
         """
@@ -218,15 +1222,144 @@ class TaskDispatcher:
             task_id: 任务 ID
             success: 是否成功
         """
-        if task_id not in self._assignments:
+        queued = self._queue.remove(task_id)
+        if queued is not None:
+            # 仍在排队的任务直接结束，不占用 Agent 负载
+            queued.status = "completed" if success else "failed"
+            queued.finished_at = datetime.now(timezone.utc)
+            self._history.add(queued)
             return
 
-        assignment = self._assignments[task_id]
-        assignment.status = "completed" if success else "failed"
+        with self._task_locks(task_id):
+            assignment = self._assignments.get(task_id)
+            if assignment is None or assignment.status not in ACTIVE_TASK_STATUSES:
+                return
+            status = "completed" if success else "failed"
+            self._stats.task_transitioned(
+                assignment.agent_type, assignment.capability, assignment.status, status
+            )
+            assignment.status = status
+            assignment.finished_at = datetime.now(timezone.utc)
+            del self._assignments[task_id]
+            self._unindex_task(assignment)
+
+        self._history.add(assignment)
 
-        # 更新 Agent 负载
-        if assignment.agent_id in self._agents:
-            self._agents[assignment.agent_id].current_load -= 1
+        # 释放 Agent 负载，并从队列补充任务
+        self._release(assignment.agent_id)
+        self._drain_queue(assignment.agent_id)
+
+        if (
+            self._history.persist
+            and self._history.unflushed_count() >= self._config.history_flush_batch
+        ):
+            self._schedule(self.flush_history)
+
+    async def flush_history(self) -> int:
+        """
+        将已结束的分配批量写入 task_records 表
+
+        写入失败时分配放回待写队列，下次重试。
+
+        返回:
+            写入的记录数
+        """
+        from src.core.database import get_database
+        from src.models.workflow import TaskRecord
+
+        pending = self._history.take_unflushed()
+        if not pending:
+            return 0
+
+        try:
+            async with get_database().session() as session:
+                session.add_all([
+                    TaskRecord(
+                        task_id=a.task_id,
+                        task_type=a.capability,
+                        status=a.status,
+                        agent_id=a.agent_id,
+                        agent_type=a.agent_type,
+                        capability=a.capability,
+                        priority=a.priority,
+                        input_data=a.parameters,
+                        assigned_at=a.assigned_at,
+                        completed_at=a.finished_at,
+                    )
+                    for a in pending
+                ])
+        except Exception as e:
+            self._history.restore_unflushed(pending)
+            logger.warning(f"Failed to flush {len(pending)} task records: {e}")
+            return 0
+
+        return len(pending)
+
+    async def finish_task(self, task_id: str, success: bool = True) -> bool:
+        """
+        完成任务（同步更新共享存储）
+
+        任务可能由其他进程分派或结束，有共享存储时以共享记录为准：
+        已由其他进程结束的任务按共享记录的状态结束本地记录。
+
+        参数:
+            task_id: 任务 ID
+            success: 是否成功
+
+        返回:
+            任务是否存在
+        """
+        assignment = self.get_assignment(task_id)
+        if self._store is None:
+            self.complete_task(task_id, success)
+            return assignment is not None
+
+        shared = await self._store.get_assignment(task_id)
+        if shared is None:
+            # 共享存储中没有记录（如仍在本地排队的任务）
+            self.complete_task(task_id, success)
+            return assignment is not None
+
+        status = "completed" if success else "failed"
+        released, load = await self._store.finish_assignment(task_id, shared.agent_id, status)
+        if not released:
+            # 已由其他进程结束
+            latest = await self._store.get_assignment(task_id)
+            status = latest.status if latest is not None else shared.status
+        self.complete_task(task_id, status == "completed")
+
+        agent = self._agents.get(shared.agent_id)
+        if agent is not None and load >= 0:
+            self._set_cached_load(agent, load)
+        return True
+
+    async def lookup_assignment(self, task_id: str) -> Optional[TaskAssignment]:
+        """
+        获取任务分配（有共享存储时以共享记录为准）
+
+        本地记录仍为进行中、共享记录已结束（由其他进程结束）时，先按共享记录结束本地记录。
+
+        参数:
+            task_id: 任务 ID
+
+        返回:
+            任务分配信息
+        """
+        assignment = self.get_assignment(task_id)
+        if self._store is None:
+            return assignment
+        if assignment is not None and assignment.status not in ACTIVE_TASK_STATUSES:
+            return assignment
+
+        shared = await self._store.get_assignment(task_id)
+        if shared is None:
+            return assignment
+        if assignment is None:
+            return shared
+        if shared.status not in ACTIVE_TASK_STATUSES:
+            self.complete_task(task_id, shared.status == "completed")
+            return self.get_assignment(task_id) or shared
+        return assignment
 
     def get_assignment(self, task_id: str) -> Optional[TaskAssignment]:
         """
@@ -236,9 +1369,14 @@ class TaskDispatcher:
             task_id: 任务 ID
 
         返回:
-            任务分配信息
+            任务分配信息，已结束且超出保留策略的分配返回 None
         """
-        return self._assignments.get(task_id)
+        assignment = self._assignments.get(task_id)
+        if assignment is None:
+            assignment = self._queue.get(task_id)
+        if assignment is None:
+            assignment = self._history.get(task_id)
+        return assignment
 
     def get_agent_tasks(self, agent_id: str) -> List[TaskAssignment]:
         """
@@ -250,42 +1388,29 @@ class TaskDispatcher:
         返回:
             任务列表
         """
+        with self._registry_lock:
+            task_ids = tuple(self._agent_tasks.get(agent_id, ()))
         return [
-            a for a in self._assignments.values()
-            if a.agent_id == agent_id and a.status in ["assigned", "accepted"]
+            self._assignments[task_id]
+            for task_id in task_ids
+            if task_id in self._assignments
         ]
 
-    def get_stats(self) -> Dict[str, Any]:
+    def get_stats(self, breakdown: bool = False) -> Dict[str, Any]:
         """
         获取统计信息
 
+        计数器在状态变化时增量维护，读取不扫描注册表与任务。
+
+        参数:
+            breakdown: 是否包含按 Agent 类型、按能力的分项统计
+
         返回:
             统计数据
         """
-        total_agents = len(self._agents)
-        ready_agents = sum(1 for a in self._agents.values() if a.status == "ready")
-        busy_agents = sum(1 for a in self._agents.values() if a.status == "busy")
-        offline_agents = sum(1 for a in self._agents.values() if a.status == "offline")
-
-        total_tasks = len(self._assignments)
-        pending_tasks = sum(1 for a in self._assignments.values() if a.status == "assigned")
-        completed_tasks = sum(1 for a in self._assignments.values() if a.status == "completed")
-        failed_tasks = sum(1 for a in self._assignments.values() if a.status == "failed")
-
-        return {
-            "agents": {
-                "total": total_agents,
-                "ready": ready_agents,
-                "busy": busy_agents,
-                "offline": offline_agents,
-            },
-            "tasks": {
-                "total": total_tasks,
-                "pending": pending_tasks,
-                "completed": completed_tasks,
-                "failed": failed_tasks,
-            },
-        }
+        stats = self._stats.snapshot(breakdown)
+        stats["tasks"]["queued"] = len(self._queue)
+        return stats
 
 
 # 服务单例
@@ -296,7 +1421,15 @@ def get_task_dispatcher() -> TaskDispatcher:
     """获取任务分派服务单例"""
     global _task_dispatcher
     if _task_dispatcher is None:
-        _task_dispatcher = TaskDispatcher()
+        config = get_config()
+        store = None
+        if config.redis.dispatch_enabled:
+            from src.services.redis_store import RedisDispatchStore
+
+            store = RedisDispatchStore.from_url(
+                config.redis.url, prefix=config.redis.dispatch_prefix
+            )
+        _task_dispatcher = TaskDispatcher(store)
 
         # 注册一些模拟的 Agent（实际应该从 Federation 获取）
         _task_dispatcher.register_agent(
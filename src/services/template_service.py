@@ -79,10 +79,13 @@ class TemplateService:
             self.templates_dir = Path(templates_dir)
 
         self._templates: dict[str, WorkflowTemplate] = {}
+        # 每次加载递增，供 API 层判断预序列化的响应是否过期
+        self.version = 0
         self._load_templates()
 
     def _load_templates(self) -> None:
         """加载所有模板"""
+        self.version += 1
         if not self.templates_dir.exists():
             return
 
@@ -0,0 +1,129 @@
+"""
+工作流读缓存
+
+职责：
+- 短 TTL 缓存 describe / query 结果，减轻看板轮询对 Temporal 与 Worker 的压力
+- 请求合并（singleflight）：同一工作流的并发读取只发起一次 Temporal 调用
+- 本服务向工作流发送信号或取消时失效对应条目
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+from src.core.config import get_config
+
+T = TypeVar("T")
+
+
+class WorkflowReadCache:
+    """
+    工作流读缓存
+
+    条目按 (工作流 ID, 读取类型) 存放，读取类型如 "describe"、"query:get_status"。
+    读取失败不缓存，等待同一次读取的调用方都会收到该异常。
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        max_workflows: int = 10000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        参数:
+            ttl_seconds: 缓存有效期（秒），<= 0 时不缓存也不合并
+            max_workflows: 最多缓存的工作流数，超出时淘汰最久未写入的
+            clock: 单调时钟（测试时可替换）
+        """
+        self._ttl = ttl_seconds
+        self._max_workflows = max_workflows
+        self._clock = clock
+        # 工作流 ID → 读取类型 → (过期时间, 结果)
+        self._entries: "OrderedDict[str, Dict[str, Tuple[float, Any]]]" = OrderedDict()
+        # 工作流 ID → 读取类型 → 进行中的读取
+        self._inflight: Dict[str, Dict[str, asyncio.Task]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self._ttl > 0
+
+    async def get(self, workflow_id: str, kind: str, loader: Callable[[], Awaitable[T]]) -> T:
+        """
+        读取（命中缓存直接返回，否则合并到进行中的读取或发起新读取）
+
+        参数:
+            workflow_id: 工作流 ID
+            kind: 读取类型
+            loader: 实际读取 Temporal 的协程函数
+
+        返回:
+            读取结果
+        """
+        if not self.enabled:
+            return await loader()
+
+        entry = self._entries.get(workflow_id, {}).get(kind)
+        if entry is not None and entry[0] > self._clock():
+            cached: T = entry[1]
+            return cached
+
+        pending = self._inflight.setdefault(workflow_id, {})
+        task = pending.get(kind)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._load(workflow_id, kind, loader))
+            # 所有调用方都被取消时，仍需取回异常以免告警
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            pending[kind] = task
+        # 单个调用方被取消不影响其他等待者
+        return await asyncio.shield(task)
+
+    def invalidate(self, workflow_id: str) -> None:
+        """
+        失效工作流的全部条目
+
+        进行中的读取照常返回给已在等待的调用方，但结果不再写入缓存
+        """
+        self._entries.pop(workflow_id, None)
+        self._inflight.pop(workflow_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._inflight.clear()
+
+    async def _load(self, workflow_id: str, kind: str, loader: Callable[[], Awaitable[T]]) -> T:
+        task = asyncio.current_task()
+        try:
+            value = await loader()
+        finally:
+            pending = self._inflight.get(workflow_id)
+            current = False
+            if pending is not None and pending.get(kind) is task:
+                current = True
+                del pending[kind]
+                if not pending:
+                    del self._inflight[workflow_id]
+
+        if current:
+            entries = self._entries.setdefault(workflow_id, {})
+            entries[kind] = (self._clock() + self._ttl, value)
+            self._entries.move_to_end(workflow_id)
+            while len(self._entries) > self._max_workflows:
+                self._entries.popitem(last=False)
+        return value
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+
+# 单例
+_workflow_cache: Optional[WorkflowReadCache] = None
+
+
+def get_workflow_cache() -> WorkflowReadCache:
+    """获取工作流读缓存单例"""
+    global _workflow_cache
+    if _workflow_cache is None:
+        _workflow_cache = WorkflowReadCache(get_config().temporal.read_cache_ttl_seconds)
+    return _workflow_cache
@@ -0,0 +1,207 @@
+"""
+工作流进度推送
+
+职责：
+- 每个被订阅的工作流只有一个轮询任务，结果分发给全部订阅者
+- 只推送变化；工作流结束后推送最终状态并关闭订阅
+- 最后一个订阅者离开时停止轮询
+"""
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from src.core.config import get_config
+
+# 订阅者队列长度：消费慢的订阅者丢弃最旧的事件（进度只关心最新状态）
+_SUBSCRIBER_QUEUE_SIZE = 16
+
+
+@dataclass
+class WorkflowProgress:
+    """一次轮询得到的工作流进度"""
+
+    status: str
+    details: Dict[str, Any] = field(default_factory=dict)
+    closed: bool = False
+
+
+@dataclass
+class WorkflowEvent:
+    """推送给订阅者的事件"""
+
+    # progress: 进度变化；closed: 工作流已结束；error: 轮询失败（订阅随之关闭）
+    event: str
+    data: Dict[str, Any]
+
+
+PollFunc = Callable[[], Awaitable[WorkflowProgress]]
+
+
+class _Feed:
+    """单个工作流的轮询与订阅者"""
+
+    def __init__(self, workflow_id: str, poll: PollFunc):
+        self.workflow_id = workflow_id
+        self.poll = poll
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.last_event: Optional[WorkflowEvent] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def publish(self, event: Optional[WorkflowEvent]) -> None:
+        """分发事件，None 表示结束"""
+        if event is not None:
+            self.last_event = event
+        for queue in self.subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+
+class WorkflowSubscription:
+    """工作流进度订阅（async with 使用，退出时取消订阅）"""
+
+    def __init__(self, hub: "WorkflowEventHub", feed: _Feed, queue: asyncio.Queue):
+        self._hub = hub
+        self._feed = feed
+        self._queue = queue
+        self._ended = False
+
+    async def next_event(self, timeout: Optional[float] = None) -> Optional[WorkflowEvent]:
+        """
+        等待下一个事件
+
+        参数:
+            timeout: 最长等待秒数
+
+        返回:
+            事件；超时无变化时为 None
+
+        异常:
+            StopAsyncIteration: 订阅已结束
+        """
+        if self._ended:
+            raise StopAsyncIteration
+        try:
+            event: Optional[WorkflowEvent] = await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if event is None:
+            self._ended = True
+            raise StopAsyncIteration
+        return event
+
+    def close(self) -> None:
+        self._hub._unsubscribe(self._feed, self._queue)
+
+    def __aiter__(self) -> "WorkflowSubscription":
+        return self
+
+    async def __anext__(self) -> WorkflowEvent:
+        event = await self.next_event()
+        assert event is not None
+        return event
+
+    async def __aenter__(self) -> "WorkflowSubscription":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+class WorkflowEventHub:
+    """工作流进度推送中心"""
+
+    def __init__(self, poll_interval: float = 1.0):
+        """
+        参数:
+            poll_interval: 轮询间隔（秒）
+        """
+        self._poll_interval = poll_interval
+        self._feeds: Dict[str, _Feed] = {}
+
+    def subscribe(self, workflow_id: str, poll: PollFunc) -> WorkflowSubscription:
+        """
+        订阅工作流进度
+
+        已有订阅者时共用其轮询（poll 被忽略），并立即收到当前状态
+
+        参数:
+            workflow_id: 工作流 ID
+            poll: 读取一次进度的协程函数
+
+        返回:
+            订阅
+        """
+        feed = self._feeds.get(workflow_id)
+        if feed is None:
+            feed = _Feed(workflow_id, poll)
+            self._feeds[workflow_id] = feed
+            feed.task = asyncio.get_running_loop().create_task(self._run(feed))
+
+        queue: asyncio.Queue = asyncio.Queue(_SUBSCRIBER_QUEUE_SIZE)
+        if feed.last_event is not None:
+            queue.put_nowait(feed.last_event)
+        feed.subscribers.add(queue)
+        return WorkflowSubscription(self, feed, queue)
+
+    def subscriber_count(self, workflow_id: str) -> int:
+        feed = self._feeds.get(workflow_id)
+        return len(feed.subscribers) if feed else 0
+
+    async def close(self) -> None:
+        """停止全部轮询并关闭订阅"""
+        feeds = list(self._feeds.values())
+        self._feeds.clear()
+        tasks = [feed.task for feed in feeds if feed.task is not None]
+        for task in tasks:
+            task.cancel()
+        for feed in feeds:
+            feed.publish(None)
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _unsubscribe(self, feed: _Feed, queue: asyncio.Queue) -> None:
+        feed.subscribers.discard(queue)
+        if not feed.subscribers and self._feeds.get(feed.workflow_id) is feed:
+            del self._feeds[feed.workflow_id]
+            if feed.task is not None:
+                feed.task.cancel()
+
+    async def _run(self, feed: _Feed) -> None:
+        """轮询直到工作流结束、轮询失败或无人订阅"""
+        last: Optional[WorkflowProgress] = None
+        try:
+            while True:
+                try:
+                    progress = await feed.poll()
+                except Exception as e:
+                    feed.publish(WorkflowEvent("error", {"message": str(e)}))
+                    return
+
+                if progress != last:
+                    last = progress
+                    feed.publish(
+                        WorkflowEvent(
+                            "closed" if progress.closed else "progress",
+                            {"status": progress.status, "details": progress.details},
+                        )
+                    )
+                if progress.closed:
+                    return
+                await asyncio.sleep(self._poll_interval)
+        finally:
+            if self._feeds.get(feed.workflow_id) is feed:
+                del self._feeds[feed.workflow_id]
+            feed.publish(None)
+
+
+# 单例
+_workflow_event_hub: Optional[WorkflowEventHub] = None
+
+
+def get_workflow_event_hub() -> WorkflowEventHub:
+    """获取工作流进度推送中心单例"""
+    global _workflow_event_hub
+    if _workflow_event_hub is None:
+        _workflow_event_hub = WorkflowEventHub(get_config().temporal.events_poll_interval_seconds)
+    return _workflow_event_hub
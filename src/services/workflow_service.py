@@ -7,17 +7,33 @@
 - 与 Temporal 交互
 """
 
+import asyncio
+import base64
+import binascii
+import hashlib
+import time
 import uuid
-from dataclasses import dataclass
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
 
-from temporalio.client import Client, WorkflowExecutionStatus
+from temporalio.client import Client, WorkflowExecution, WorkflowExecutionStatus
+from temporalio.common import WorkflowIDConflictPolicy, WorkflowIDReusePolicy
+from temporalio.exceptions import WorkflowAlreadyStartedError
 
 from src.core.config import get_config
-from src.core.exceptions import WorkflowNotFoundError, WorkflowStartError
+from src.core.exceptions import (
+    OrchestratorError,
+    WorkflowNotFoundError,
+    WorkflowStartError,
+    WorkflowValidationError,
+)
+from src.core.temporal_client import TemporalClientPool, get_temporal_pool
+from src.services.workflow_cache import get_workflow_cache
 from src.workflows.approval import ApprovalWorkflow, ApprovalWorkflowInput
 from src.workflows.cleaning import CleaningWorkflowInput, RobotCleaningWorkflow
+from src.workflows.registry import workflow_registry
 
 
 @dataclass
@@ -41,19 +57,134 @@ class WorkflowListResult:
     next_page_token: Optional[str]
 
 
+@dataclass
+class WorkflowStartRequest:
+    """批量启动中的单个工作流"""
+
+    input: Dict[str, Any] = field(default_factory=dict)
+    # 指定 ID 时重复提交不会重复启动
+    workflow_id: Optional[str] = None
+
+
+@dataclass
+class WorkflowStartResult:
+    """批量启动中的单个结果"""
+
+    index: int
+    workflow_id: str
+    error: Optional[Dict[str, Any]] = None
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class WorkflowOperationResult:
+    """批量操作中单个工作流的结果"""
+
+    workflow_id: str
+    error: Optional[Dict[str, Any]] = None
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class BatchOperationResult:
+    """批量操作汇总结果"""
+
+    results: List[WorkflowOperationResult]
+
+    @property
+    def matched(self) -> int:
+        return len(self.results)
+
+    @property
+    def succeeded(self) -> int:
+        return sum(1 for r in self.results if r.success)
+
+    @property
+    def failed(self) -> int:
+        return self.matched - self.succeeded
+
+
+# 一页工作流及 Temporal 的下一页令牌
+_Page = Tuple[List[WorkflowInfo], Optional[bytes]]
+
+# 预取页缓存上限
+_PREFETCH_MAX_ENTRIES = 256
+
+
+def _query_digest(query: Optional[str]) -> bytes:
+    return hashlib.sha256((query or "").encode()).digest()[:8]
+
+
+def encode_page_token(query: Optional[str], token: bytes) -> str:
+    """
+    将 Temporal 分页令牌编码为对外的游标
+
+    游标绑定查询条件：同一令牌与查询总是得到同一游标，换了过滤条件的游标会被拒绝
+    """
+    return base64.urlsafe_b64encode(_query_digest(query) + token).rstrip(b"=").decode()
+
+
+def decode_page_token(query: Optional[str], cursor: str) -> bytes:
+    """
+    解码游标
+
+    异常:
+        WorkflowValidationError: 游标无效或与查询条件不符
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    except (binascii.Error, ValueError):
+        raise WorkflowValidationError("Invalid page token", ["next_page_token"])
+    if len(raw) <= 8 or raw[:8] != _query_digest(query):
+        raise WorkflowValidationError(
+            "Page token does not match the list filters", ["next_page_token"]
+        )
+    return raw[8:]
+
+
 class WorkflowService:
     """工作流管理服务"""
 
-    def __init__(self, client: Client):
-        self._client = client
+    def __init__(
+        self, client: Optional[Client] = None, pool: Optional[TemporalClientPool] = None
+    ):
+        """
+        参数:
+            client: 固定使用的 Temporal 客户端
+            pool: 客户端池，未指定 client 时每次调用从池中轮询取客户端
+        """
+        if client is None and pool is None:
+            raise ValueError("WorkflowService requires a client or a client pool")
+        self._fixed_client = client
+        self._pool = pool
         self._config = get_config()
         self._task_queue = self._config.temporal.task_queue
 
-        # 工作流类型映射
-        self._workflow_types = {
-            "cleaning": RobotCleaningWorkflow,
-            "approval": ApprovalWorkflow,
-        }
+        # 工作流类型注册表
+        self._registry = workflow_registry
+        # describe / query 读缓存（信号、取消后失效）
+        self._cache = get_workflow_cache()
+
+        # 列表预取：(游标, 页大小) → (创建时间, 预取任务)
+        self._prefetch_pages = self._config.temporal.list_prefetch_pages
+        self._prefetch_ttl = self._config.temporal.list_prefetch_ttl_seconds
+        self._prefetched: "OrderedDict[Tuple[str, int], Tuple[float, asyncio.Task[_Page]]]" = (
+            OrderedDict()
+        )
+
+    @property
+    def _client(self) -> Client:
+        """本次调用使用的客户端"""
+        if self._fixed_client is not None:
+            return self._fixed_client
+        assert self._pool is not None
+        return self._pool.get()
 
     async def start_cleaning_workflow(
         self,
@@ -87,6 +218,7 @@ class WorkflowService:
             cleaning_mode=cleaning_mode,
             robot_id=robot_id,
             priority=priority,
+            event_driven_completion=self._config.worker.robot_completion_async,
         )
 
         try:
@@ -95,6 +227,7 @@ class WorkflowService:
                 input_data,
                 id=workflow_id,
                 task_queue=self._task_queue,
+                search_attributes=self._registry.search_attributes("cleaning"),
             )
             return handle.id
         except Exception as e:
@@ -143,11 +276,89 @@ class WorkflowService:
                 input_data,
                 id=workflow_id,
                 task_queue=self._task_queue,
+                search_attributes=self._registry.search_attributes("approval"),
             )
             return handle.id
         except Exception as e:
             raise WorkflowStartError(str(e), workflow_id)
 
+    async def start_workflows(
+        self,
+        workflow_type: str,
+        requests: List[WorkflowStartRequest],
+        batch_id: Optional[str] = None,
+        concurrency: Optional[int] = None,
+    ) -> List[WorkflowStartResult]:
+        """
+        批量启动工作流
+
+        并发调用 start_workflow（并发数受限），逐项返回结果，单项失败不影响其他项。
+        工作流 ID 取自请求项，或由 batch_id 与序号生成；两者都没有时随机生成。
+        确定的 ID 可安全重试：运行中的沿用已有工作流，已结束的不再重复启动。
+
+        参数:
+            workflow_type: 工作流类型（见 src/workflows/registry.py）
+            requests: 启动请求
+            batch_id: 批次 ID，用于生成幂等的工作流 ID
+            concurrency: 并发数，默认取 TEMPORAL_BULK_START_CONCURRENCY
+
+        返回:
+            与 requests 一一对应的结果
+
+        异常:
+            WorkflowValidationError: 工作流类型未知或不支持批量启动
+        """
+        spec = self._registry.get(workflow_type)
+        if spec is None or spec.input_type is None:
+            raise WorkflowValidationError(
+                f"Workflow type does not support bulk start: {workflow_type}", ["workflow_type"]
+            )
+
+        semaphore = asyncio.Semaphore(concurrency or self._config.temporal.bulk_start_concurrency)
+        search_attributes = self._registry.search_attributes(workflow_type)
+        # 与单个启动一致的输入默认值，请求项中显式指定的优先
+        defaults: Dict[str, Any] = {}
+        if spec.input_type is CleaningWorkflowInput:
+            defaults["event_driven_completion"] = self._config.worker.robot_completion_async
+
+        async def start(index: int, request: WorkflowStartRequest) -> WorkflowStartResult:
+            workflow_id = request.workflow_id
+            if workflow_id is None and batch_id:
+                workflow_id = f"{spec.id_prefix}-{batch_id}-{index}"
+            idempotent = workflow_id is not None
+            if workflow_id is None:
+                workflow_id = f"{spec.id_prefix}-{uuid.uuid4().hex[:8]}"
+
+            try:
+                input_data = spec.new_input(**{**defaults, **request.input})
+            except TypeError as e:
+                error = WorkflowValidationError(str(e), ["input"])
+                return WorkflowStartResult(index, workflow_id, error.to_dict())
+
+            async with semaphore:
+                try:
+                    await self._client.start_workflow(
+                        spec.workflow.run,
+                        input_data,
+                        id=workflow_id,
+                        task_queue=self._task_queue,
+                        search_attributes=search_attributes,
+                        id_reuse_policy=(
+                            WorkflowIDReusePolicy.REJECT_DUPLICATE
+                            if idempotent
+                            else WorkflowIDReusePolicy.ALLOW_DUPLICATE
+                        ),
+                        id_conflict_policy=WorkflowIDConflictPolicy.USE_EXISTING,
+                    )
+                except Exception as e:
+                    # 幂等 ID 的工作流已结束：视为此前已启动过
+                    if not (idempotent and isinstance(e, WorkflowAlreadyStartedError)):
+                        start_error = WorkflowStartError(str(e), workflow_id)
+                        return WorkflowStartResult(index, workflow_id, start_error.to_dict())
+            return WorkflowStartResult(index, workflow_id)
+
+        return list(await asyncio.gather(*(start(i, r) for i, r in enumerate(requests))))
+
     async def get_workflow_status(self, workflow_id: str) -> WorkflowInfo:
         """
         获取工作流状态
@@ -160,18 +371,13 @@ class WorkflowService:
         """
         try:
             handle = self._client.get_workflow_handle(workflow_id)
-            desc = await handle.describe()
-
-            # 确定工作流类型
-            workflow_type = "unknown"
-            if workflow_id.startswith("cleaning-"):
-                workflow_type = "cleaning"
-            elif workflow_id.startswith("approval-"):
-                workflow_type = "approval"
+            desc = await self._cache.get(workflow_id, "describe", handle.describe)
 
             return WorkflowInfo(
                 workflow_id=workflow_id,
-                workflow_type=workflow_type,
+                workflow_type=self._registry.classify(
+                    workflow_id, desc.workflow_type, desc.typed_search_attributes
+                ),
                 status=desc.status.name,
                 start_time=desc.start_time,
                 close_time=desc.close_time,
@@ -193,7 +399,9 @@ class WorkflowService:
         """
         try:
             handle = self._client.get_workflow_handle(workflow_id)
-            result = await handle.query(query_name)
+            result = await self._cache.get(
+                workflow_id, f"query:{query_name}", lambda: handle.query(query_name)
+            )
             return result
         except Exception as e:
             raise WorkflowNotFoundError(workflow_id)
@@ -227,6 +435,7 @@ class WorkflowService:
         try:
             handle = self._client.get_workflow_handle(workflow_id)
             await handle.cancel()
+            self._cache.invalidate(workflow_id)
             return True
         except Exception as e:
             raise WorkflowNotFoundError(workflow_id)
@@ -262,10 +471,104 @@ class WorkflowService:
                 # 通用信号发送
                 await handle.signal(signal_name, *args)
 
+            self._cache.invalidate(workflow_id)
             return True
         except Exception as e:
             raise WorkflowNotFoundError(workflow_id)
 
+    async def signal_workflows(
+        self,
+        signal_name: str,
+        args: List[Any],
+        workflow_ids: Optional[List[str]] = None,
+        query: Optional[str] = None,
+        concurrency: Optional[int] = None,
+        max_workflows: int = 10000,
+    ) -> BatchOperationResult:
+        """
+        批量发送信号
+
+        目标工作流由 ID 列表或可见性查询指定（二选一），受限并发逐个发送
+
+        参数:
+            signal_name: 信号名称（同 signal_workflow）
+            args: 信号参数
+            workflow_ids: 工作流 ID 列表
+            query: 可见性查询，如 'EcisWorkflowType = "delivery" AND ExecutionStatus = "Running"'
+            concurrency: 并发数，默认取 TEMPORAL_BATCH_OPERATION_CONCURRENCY
+            max_workflows: 查询最多匹配的工作流数
+
+        返回:
+            汇总结果
+
+        异常:
+            WorkflowValidationError: 目标指定不正确
+        """
+        targets = await self._resolve_targets(workflow_ids, query, max_workflows)
+        return await self._run_batch(
+            targets,
+            lambda workflow_id: self.signal_workflow(workflow_id, signal_name, *args),
+            concurrency,
+        )
+
+    async def cancel_workflows(
+        self,
+        workflow_ids: Optional[List[str]] = None,
+        query: Optional[str] = None,
+        concurrency: Optional[int] = None,
+        max_workflows: int = 10000,
+    ) -> BatchOperationResult:
+        """
+        批量取消工作流
+
+        参数与 signal_workflows 相同
+
+        返回:
+            汇总结果
+
+        异常:
+            WorkflowValidationError: 目标指定不正确
+        """
+        targets = await self._resolve_targets(workflow_ids, query, max_workflows)
+        return await self._run_batch(targets, self.cancel_workflow, concurrency)
+
+    async def _resolve_targets(
+        self, workflow_ids: Optional[List[str]], query: Optional[str], max_workflows: int
+    ) -> List[str]:
+        """确定批量操作的目标工作流"""
+        if (workflow_ids is None) == (query is None):
+            raise WorkflowValidationError(
+                "Specify exactly one of workflow_ids or query", ["workflow_ids", "query"]
+            )
+        if workflow_ids is not None:
+            return list(dict.fromkeys(workflow_ids))
+
+        targets = []
+        async for workflow in self._client.list_workflows(query=query, limit=max_workflows):
+            targets.append(workflow.id)
+        return targets
+
+    async def _run_batch(
+        self,
+        workflow_ids: List[str],
+        operation: Callable[[str], Awaitable[Any]],
+        concurrency: Optional[int],
+    ) -> BatchOperationResult:
+        """受限并发执行，逐个记录结果"""
+        semaphore = asyncio.Semaphore(
+            concurrency or self._config.temporal.batch_operation_concurrency
+        )
+
+        async def run(workflow_id: str) -> WorkflowOperationResult:
+            async with semaphore:
+                try:
+                    await operation(workflow_id)
+                except OrchestratorError as e:
+                    return WorkflowOperationResult(workflow_id, e.to_dict())
+            return WorkflowOperationResult(workflow_id)
+
+        return BatchOperationResult(list(await asyncio.gather(*map(run, workflow_ids))))
+
     async def list_workflows(
         self,
         workflow_type: Optional[str] = None,
@@ -276,56 +579,146 @@ class WorkflowService:
         """
         列出工作流
 
+        按 Temporal 原生分页令牌逐页读取，翻到第 N 页只需读取这一页。
+        翻页请求（带 next_page_token）返回后在后台预取后续页（TEMPORAL_LIST_PREFETCH_PAGES）。
+
         参数:
             workflow_type: 工作流类型过滤
             status: 状态过滤
             page_size: 页大小
-            next_page_token: 分页令牌
+            next_page_token: 分页令牌（上一页返回的游标）
 
         返回:
             工作流列表结果
+
+        异常:
+            WorkflowValidationError: 分页令牌或过滤条件无效
+        """
+        query = self._build_list_query(workflow_type, status)
+        token = decode_page_token(query, next_page_token) if next_page_token else None
+
+        workflows, token = await self._get_page(query, page_size, token)
+        cursor = encode_page_token(query, token) if token else None
+        # 只在调用方已在翻页时预取：只看第一页的轮询（如看板）不额外读取
+        if token and next_page_token:
+            self._prefetch(query, page_size, token, self._prefetch_pages)
+
+        return WorkflowListResult(
+            workflows=workflows,
+            total=len(workflows),
+            next_page_token=cursor,
+        )
+
+    def iter_workflows(
+        self,
+        workflow_type: Optional[str] = None,
+        status: Optional[str] = None,
+        page_size: int = 1000,
+    ) -> AsyncIterator[WorkflowInfo]:
         """
-        # 构建查询
+        逐条遍历全部匹配的工作流
+
+        直接消费 Temporal 可见性迭代器，内存中最多保留一页；
+        调用方不取下一条时不会读取下一页。
+
+        参数:
+            workflow_type: 工作流类型过滤
+            status: 状态过滤
+            page_size: 每次向 Temporal 读取的条数
+
+        异常:
+            WorkflowValidationError: 过滤条件无效（调用时即检查，而非迭代时）
+        """
+        query = self._build_list_query(workflow_type, status)
+        return self._iter_query(query, page_size)
+
+    async def _iter_query(
+        self, query: Optional[str], page_size: int
+    ) -> AsyncIterator[WorkflowInfo]:
+        async for workflow in self._client.list_workflows(query=query, page_size=page_size):
+            yield self._to_workflow_info(workflow)
+
+    def _build_list_query(
+        self, workflow_type: Optional[str], status: Optional[str]
+    ) -> Optional[str]:
+        """构建可见性查询"""
         query_parts = []
 
         if workflow_type:
-            query_parts.append(f'WorkflowId STARTS_WITH "{workflow_type}-"')
+            if workflow_type not in self._registry:
+                raise WorkflowValidationError(
+                    f"Unknown workflow type: {workflow_type}", ["workflow_type"]
+                )
+            query_parts.append(self._registry.query(workflow_type))
 
         if status:
             query_parts.append(f'ExecutionStatus = "{status}"')
 
-        query = " AND ".join(query_parts) if query_parts else None
-
-        workflows = []
-        async for workflow in self._client.list_workflows(query=query):
-            workflow_id = workflow.id
-
-            # 确定工作流类型
-            wf_type = "unknown"
-            if workflow_id.startswith("cleaning-"):
-                wf_type = "cleaning"
-            elif workflow_id.startswith("approval-"):
-                wf_type = "approval"
-
-            workflows.append(
-                WorkflowInfo(
-                    workflow_id=workflow_id,
-                    workflow_type=wf_type,
-                    status=workflow.status.name if workflow.status else "UNKNOWN",
-                    start_time=workflow.start_time,
-                    close_time=workflow.close_time,
-                    execution_time=None,
-                )
-            )
-
-            if len(workflows) >= page_size:
-                break
+        return " AND ".join(query_parts) if query_parts else None
+
+    def _to_workflow_info(self, workflow: WorkflowExecution) -> WorkflowInfo:
+        return WorkflowInfo(
+            workflow_id=workflow.id,
+            workflow_type=self._registry.classify(
+                workflow.id, workflow.workflow_type, workflow.typed_search_attributes
+            ),
+            status=workflow.status.name if workflow.status else "UNKNOWN",
+            start_time=workflow.start_time,
+            close_time=workflow.close_time,
+            execution_time=None,
+        )
 
-        return WorkflowListResult(
-            workflows=workflows,
-            total=len(workflows),
-            next_page_token=None,  # Temporal SDK 处理分页方式不同
+    async def _fetch_page(
+        self, query: Optional[str], page_size: int, token: Optional[bytes]
+    ) -> _Page:
+        """向 Temporal 读取一页"""
+        iterator = self._client.list_workflows(
+            query=query, page_size=page_size, next_page_token=token
         )
+        await iterator.fetch_next_page()
+        workflows = [self._to_workflow_info(w) for w in iterator.current_page or []]
+        return workflows, iterator.next_page_token
+
+    async def _get_page(
+        self, query: Optional[str], page_size: int, token: Optional[bytes]
+    ) -> _Page:
+        """优先使用未过期的预取结果，否则直接读取"""
+        if token:
+            entry = self._prefetched.pop((encode_page_token(query, token), page_size), None)
+            if entry is not None:
+                created_at, task = entry
+                if time.monotonic() - created_at <= self._prefetch_ttl:
+                    try:
+                        return await task
+                    except Exception:
+                        pass  # 预取失败时直接读取
+                else:
+                    task.cancel()
+        return await self._fetch_page(query, page_size, token)
+
+    def _prefetch(
+        self, query: Optional[str], page_size: int, token: bytes, pages: int
+    ) -> None:
+        """在后台预取 token 起的 pages 页"""
+        if pages <= 0:
+            return
+        key = (encode_page_token(query, token), page_size)
+        if key in self._prefetched:
+            return
+
+        async def run() -> _Page:
+            page = await self._fetch_page(query, page_size, token)
+            if page[1]:
+                self._prefetch(query, page_size, page[1], pages - 1)
+            return page
+
+        task = asyncio.get_running_loop().create_task(run())
+        # 预取失败不应产生未取回的异常告警，调用方取结果时会重新读取
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._prefetched[key] = (time.monotonic(), task)
+        while len(self._prefetched) > _PREFETCH_MAX_ENTRIES:
+            _, (_, evicted) = self._prefetched.popitem(last=False)
+            evicted.cancel()
 
 
 # 服务单例
@@ -333,10 +726,11 @@ _workflow_service: Optional[WorkflowService] = None
 
 
 async def get_workflow_service() -> WorkflowService:
-    """获取工作流服务单例"""
+    """获取工作流服务单例（请求按轮询分摊到客户端池的各连接）"""
     global _workflow_service
+    pool = get_temporal_pool()
+    # 连接池关闭后再次使用时重新建立连接
+    await pool.connect()
     if _workflow_service is None:
-        config = get_config()
-        client = await Client.connect(config.temporal.address)
-        _workflow_service = WorkflowService(client)
+        _workflow_service = WorkflowService(pool=pool)
     return _workflow_service
@@ -4,11 +4,26 @@ Workers 模块
 Temporal Worker 配置和启动
 """
 
-from .main_worker import ACTIVITIES, WORKFLOWS, main, run_worker
+from .main_worker import (
+    ACTIVITIES,
+    ACTIVITY_GROUPS,
+    WORKFLOWS,
+    create_workers,
+    main,
+    run_supervisor,
+    run_worker,
+)
+from .routing import ActivityRouter
+from .supervisor import WorkerSupervisor
 
 __all__ = [
     "main",
     "run_worker",
+    "run_supervisor",
+    "create_workers",
+    "ActivityRouter",
+    "WorkerSupervisor",
     "WORKFLOWS",
     "ACTIVITIES",
+    "ACTIVITY_GROUPS",
 ]
@@ -6,25 +6,30 @@
 
 import asyncio
 import logging
+import os
 import signal
 import sys
+import time
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from temporalio.client import Client
 from temporalio.worker import Worker
 
-from src.core.config import get_config
+from src.core.config import Config, get_config
+from src.workers.routing import ActivityRouter, ActivityRoutingInterceptor, activity_name
+from src.workers.supervisor import EXIT_CONFIG_ERROR, WorkerSupervisor
+from src.workers.tuning import ActivityAutotuner, worker_options
 
-# 导入所有工作流
-from src.workflows.cleaning import RobotCleaningWorkflow
-from src.workflows.approval import ApprovalWorkflow, MultiStageApprovalWorkflow
-from src.workflows.delivery import DeliveryWorkflow
-from src.workflows.scheduled import ScheduledCleaningWorkflow, ScheduledPatrolWorkflow
+# 工作流类型注册表（包含所有工作流）
+from src.workflows.registry import workflow_registry
 
 # 导入所有 Activity
 from src.activities.robot import (
     get_robot_status,
     assign_task_to_robot,
     wait_for_robot_task_completion,
+    await_robot_task_completion,
     get_robot_location,
     find_available_robot,
     release_robot,
@@ -61,62 +66,173 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-# 所有工作流类
-WORKFLOWS = [
-    RobotCleaningWorkflow,
-    ApprovalWorkflow,
-    MultiStageApprovalWorkflow,
-    DeliveryWorkflow,
-    ScheduledCleaningWorkflow,
-    ScheduledPatrolWorkflow,
-]
+# 所有工作流类（新增工作流在 src/workflows/registry.py 中注册）
+WORKFLOWS = workflow_registry.workflow_classes()
+
+# Activity 分组（拆分任务队列时每组一个队列：{task_queue}-{分组}）
+ACTIVITY_GROUPS: Dict[str, List[Callable[..., Any]]] = {
+    "robot": [
+        get_robot_status,
+        assign_task_to_robot,
+        wait_for_robot_task_completion,
+        await_robot_task_completion,
+        get_robot_location,
+        find_available_robot,
+        release_robot,
+    ],
+    "facility": [
+        call_elevator,
+        open_door,
+        close_door,
+        get_doors_on_route,
+        grant_zone_access,
+        revoke_zone_access,
+        get_floor_status,
+    ],
+    "notification": [
+        send_notification,
+        send_task_update,
+        create_approval_request,
+        get_approval_status,
+        send_approval_reminder,
+        cancel_approval_request,
+    ],
+    "llm": [
+        analyze_task_request,
+        analyze_exception,
+        generate_task_summary,
+        extract_workflow_parameters,
+    ],
+}
 
 # 所有 Activity 函数
-ACTIVITIES = [
-    # Robot
-    get_robot_status,
-    assign_task_to_robot,
-    wait_for_robot_task_completion,
-    get_robot_location,
-    find_available_robot,
-    release_robot,
-    # Facility
-    call_elevator,
-    open_door,
-    close_door,
-    get_doors_on_route,
-    grant_zone_access,
-    revoke_zone_access,
-    get_floor_status,
-    # Notification
-    send_notification,
-    send_task_update,
-    create_approval_request,
-    get_approval_status,
-    send_approval_reminder,
-    cancel_approval_request,
-    # LLM
-    analyze_task_request,
-    analyze_exception,
-    generate_task_summary,
-    extract_workflow_parameters,
-]
+ACTIVITIES: List[Callable[..., Any]] = [fn for group in ACTIVITY_GROUPS.values() for fn in group]
+
+# WORKER_QUEUES 中表示工作流 Worker 的名称
+WORKFLOWS_QUEUE = "workflows"
+
 
+class WorkerConfigError(ValueError):
+    """Worker 配置无效（重启无法恢复）"""
 
-async def run_worker():
-    """启动 Worker"""
+
+def create_workers(
+    client: Client, config: Config
+) -> Tuple[List[Worker], List[ActivityAutotuner]]:
+    """
+    按配置创建本进程运行的 Worker
+
+    拆分队列时工作流在主队列上一个 Worker，每个 Activity 分组在自己的队列上一个 Worker
+    （独立并发上限与自动调优）；否则全部在主队列上一个 Worker。
+    拆分队列时工作流 Worker 仍注册全部 Activity：执行本地 Activity，
+    并执行开启拆分前已调度到主队列的 Activity（否则进行中的工作流会停住）
+
+    返回:
+        (Worker 列表, 自动调优器列表)
+
+    异常:
+        WorkerConfigError: 配置无效
+    """
+    worker_config = config.worker
+    task_queue = config.temporal.task_queue
+    autotune = worker_config.autotune
+    common: Dict[str, Any] = {
+        # SIGTERM 后给进行中的 Activity 留出完成时间，超时再取消
+        "graceful_shutdown_timeout": timedelta(seconds=worker_config.shutdown_grace_seconds),
+    }
+
+    # 事件驱动完成时 task token 由 Worker 登记、由 API 进程取用，须经 Redis 共享
+    if worker_config.robot_completion_async and not config.redis.robot_completions_enabled:
+        raise WorkerConfigError(
+            "WORKER_ROBOT_COMPLETION_ASYNC requires REDIS_ROBOT_COMPLETIONS_ENABLED: "
+            "the worker and the API run in separate processes"
+        )
+
+    # 本地 Activity 在工作流 Worker 内执行
+    local_names = set(worker_config.local_activity_names)
+    unknown = local_names - {activity_name(fn) for fn in ACTIVITIES}
+    if unknown:
+        raise WorkerConfigError(f"Unknown local activities: {sorted(unknown)}")
+
+    if not worker_config.split_activity_queues:
+        autotuner = ActivityAutotuner.from_config(worker_config) if autotune else None
+        options = worker_options(worker_config, autotuner)
+        options["interceptors"] = [
+            *options.get("interceptors", []),
+            ActivityRoutingInterceptor({}, local_names),
+        ]
+        worker = Worker(
+            client,
+            task_queue=task_queue,
+            workflows=WORKFLOWS,
+            activities=ACTIVITIES,
+            **common,
+            **options,
+        )
+        return [worker], [autotuner] if autotuner else []
+
+    router = ActivityRouter(task_queue, ACTIVITY_GROUPS)
+    selected = worker_config.queue_names
+    if selected is not None:
+        unknown = set(selected) - set(router.groups) - {WORKFLOWS_QUEUE}
+        if unknown:
+            raise WorkerConfigError(f"Unknown worker queues: {sorted(unknown)}")
+
+    workers: List[Worker] = []
+    autotuners: List[ActivityAutotuner] = []
+    if selected is None or WORKFLOWS_QUEUE in selected:
+        options = worker_options(worker_config)
+        options["interceptors"] = [router.interceptor(local_names)]
+        workers.append(
+            Worker(
+                client,
+                task_queue=task_queue,
+                workflows=WORKFLOWS,
+                activities=ACTIVITIES,
+                **common,
+                **options,
+            )
+        )
+
+    for group in router.groups:
+        if selected is not None and group not in selected:
+            continue
+        limit = worker_config.group_max_concurrent_activities.get(group)
+        # 分组上限同时是自动调优的上界，分组之间的槽位隔离不因调优失效
+        autotuner = (
+            ActivityAutotuner.from_config(worker_config, limit, maximum=limit)
+            if autotune
+            else None
+        )
+        if autotuner is not None:
+            autotuners.append(autotuner)
+        workers.append(
+            Worker(
+                client,
+                task_queue=router.task_queue(group),
+                activities=router.activities(group),
+                **common,
+                **worker_options(worker_config, autotuner, limit),
+            )
+        )
+    return workers, autotuners
+
+
+async def run_worker(heartbeat: Optional[Any] = None):
+    """
+    启动 Worker
+
+    参数:
+        heartbeat: 监管进程提供的心跳（共享 double），运行期间定期写入当前时间
+    """
     config = get_config()
 
     logger.info(f"Connecting to Temporal: {config.temporal.address}")
     client = await Client.connect(config.temporal.address)
 
-    logger.info(f"Starting worker on queue: {config.temporal.task_queue}")
-    worker = Worker(
-        client,
-        task_queue=config.temporal.task_queue,
-        workflows=WORKFLOWS,
-        activities=ACTIVITIES,
-    )
+    workers, autotuners = create_workers(client, config)
+    for worker in workers:
+        logger.info(f"Starting worker on queue: {worker.task_queue}")
 
     # 设置优雅关闭
     shutdown_event = asyncio.Event()
@@ -131,15 +247,75 @@ async def run_worker():
     logger.info("Worker started, waiting for tasks...")
     logger.info(f"Registered {len(WORKFLOWS)} workflows and {len(ACTIVITIES)} activities")
 
-    # 运行 worker 直到收到关闭信号
-    async with worker:
-        await shutdown_event.wait()
+    async def beat():
+        while True:
+            heartbeat.value = time.time()
+            await asyncio.sleep(config.worker.heartbeat_interval_seconds)
+
+    # 运行 worker 直到收到关闭信号（或任一 Worker 异常退出）
+    running = [asyncio.create_task(worker.run()) for worker in workers]
+    background = []
+    # 间隔为 0 时关闭心跳（监管进程同时关闭心跳检查）
+    if heartbeat is not None and config.worker.heartbeat_interval_seconds > 0:
+        background.append(asyncio.create_task(beat()))
+    if autotuners:
+        logger.info("Activity slot and poller autotuning enabled")
+        background.extend(asyncio.create_task(tuner.run()) for tuner in autotuners)
+
+    stop = asyncio.create_task(shutdown_event.wait())
+    await asyncio.wait([stop, *running], return_when=asyncio.FIRST_COMPLETED)
+    stop.cancel()
+    for task in background:
+        task.cancel()
+    # 各 Worker 并行排空
+    await asyncio.gather(*(worker.shutdown() for worker in workers), return_exceptions=True)
+    await asyncio.gather(*running)
 
     logger.info("Worker shutdown complete")
 
 
+def run_worker_process(index: int, heartbeat: Any) -> None:
+    """Worker 子进程入口（由 WorkerSupervisor 启动）"""
+    logger.info(f"Worker process {index} started (pid {os.getpid()})")
+    try:
+        asyncio.run(run_worker(heartbeat))
+    except WorkerConfigError as e:
+        # 配置错误重启无法恢复，通知监管进程停止
+        logger.error(f"Worker process {index} configuration error: {e}")
+        sys.exit(EXIT_CONFIG_ERROR)
+    except Exception as e:
+        logger.error(f"Worker process {index} failed: {e}")
+        sys.exit(1)
+
+
+def run_supervisor(processes: int) -> int:
+    """
+    多进程模式：在同一任务队列上启动并监管 processes 个 Worker 进程
+
+    返回:
+        退出码
+    """
+    config = get_config().worker
+    supervisor = WorkerSupervisor(
+        run_worker_process,
+        processes,
+        shutdown_grace_seconds=config.shutdown_grace_seconds,
+        # 子进程不写心跳时不做心跳检查
+        heartbeat_timeout_seconds=(
+            config.heartbeat_timeout_seconds if config.heartbeat_interval_seconds > 0 else 0
+        ),
+        restart_backoff_seconds=config.restart_backoff_seconds,
+        restart_backoff_max_seconds=config.restart_backoff_max_seconds,
+    )
+    return supervisor.run()
+
+
 def main():
-    """入口函数"""
+    """入口函数（WORKER_PROCESSES 大于 1 时启用多进程监管）"""
+    processes = get_config().worker.process_count
+    if processes > 1:
+        sys.exit(run_supervisor(processes))
+
     try:
         asyncio.run(run_worker())
     except KeyboardInterrupt:
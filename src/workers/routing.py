@@ -0,0 +1,144 @@
+"""
+Activity 任务队列路由
+
+职责：
+- Activity 按分组（robot / facility / notification / llm）使用独立任务队列 {task_queue}-{分组}，
+  由各自的 Worker 以独立并发上限执行：长时间的机器人等待与 LLM 调用不会占满开门、呼梯所需的槽位
+- 指定的短小、幂等 Activity 改为本地 Activity，在工作流 Worker 内直接执行，
+  不经过任务队列，历史中只记录一个 Marker 事件
+- 工作流侧拦截器按 Activity 名称完成以上处理，工作流代码无需改动
+"""
+
+import dataclasses
+from typing import AbstractSet, Any, Callable, Dict, List, Mapping, Optional, Sequence, Type
+
+from temporalio import workflow
+from temporalio.worker import (
+    Interceptor,
+    StartActivityInput,
+    StartLocalActivityInput,
+    WorkflowInboundInterceptor,
+    WorkflowInterceptorClassInput,
+    WorkflowOutboundInterceptor,
+)
+
+# 本地 Activity 的版本标记：开启前已在运行的工作流（历史中无此标记）重放时仍走普通 Activity
+LOCAL_ACTIVITIES_PATCH = "ecis-local-activities"
+
+
+def activity_name(fn: Callable) -> str:
+    """@activity.defn 函数注册到 Temporal 的名称"""
+    name: str = getattr(fn, "__temporal_activity_definition").name
+    return name
+
+
+class ActivityRouter:
+    """Activity 分组与任务队列"""
+
+    def __init__(self, task_queue: str, groups: Mapping[str, Sequence[Callable]]):
+        """
+        参数:
+            task_queue: 主任务队列（工作流所在队列），分组队列以其为前缀
+            groups: 分组名 → 该组的 Activity 函数
+        """
+        self._task_queue = task_queue
+        self._groups: Dict[str, List[Callable]] = {name: list(fns) for name, fns in groups.items()}
+        self._routes: Dict[str, str] = {}
+        for group, fns in self._groups.items():
+            for fn in fns:
+                name = activity_name(fn)
+                if name in self._routes:
+                    raise ValueError(f"Activity {name} is in more than one group")
+                self._routes[name] = self.task_queue(group)
+
+    @property
+    def groups(self) -> List[str]:
+        return list(self._groups)
+
+    def activities(self, group: str) -> List[Callable]:
+        return self._groups[group]
+
+    def task_queue(self, group: str) -> str:
+        """分组的任务队列"""
+        return f"{self._task_queue}-{group}"
+
+    def route(self, activity: str) -> Optional[str]:
+        """Activity 所在的任务队列（未分组时为 None，即沿用工作流的队列）"""
+        return self._routes.get(activity)
+
+    def interceptor(
+        self, local_activities: AbstractSet[str] = frozenset()
+    ) -> "ActivityRoutingInterceptor":
+        """
+        参数:
+            local_activities: 以本地 Activity 执行的 Activity 名称
+        """
+        return ActivityRoutingInterceptor(self._routes, local_activities)
+
+
+def _to_local(input: StartActivityInput) -> StartLocalActivityInput:
+    # 本地 Activity 没有任务队列与心跳，其余参数原样沿用；
+    # 按字段名复制，兼容各 SDK 版本新增的可选字段（如 summary、event_groups）
+    local_fields = {f.name for f in dataclasses.fields(StartLocalActivityInput)}
+    values = {
+        f.name: getattr(input, f.name)
+        for f in dataclasses.fields(input)
+        if f.name in local_fields
+    }
+    return StartLocalActivityInput(local_retry_threshold=None, **values)
+
+
+class _RoutingWorkflowOutbound(WorkflowOutboundInterceptor):
+    def __init__(
+        self,
+        next: WorkflowOutboundInterceptor,
+        routes: Dict[str, str],
+        local_activities: AbstractSet[str],
+    ):
+        super().__init__(next)
+        self._routes = routes
+        self._local_activities = local_activities
+
+    def start_activity(self, input: StartActivityInput) -> workflow.ActivityHandle[Any]:
+        if (
+            input.task_queue is None
+            and input.activity in self._local_activities
+            and workflow.patched(LOCAL_ACTIVITIES_PATCH)
+        ):
+            return super().start_local_activity(_to_local(input))
+        # 调用方显式指定的队列优先
+        if input.task_queue is None:
+            input.task_queue = self._routes.get(input.activity)
+        return super().start_activity(input)
+
+
+class _RoutingWorkflowInbound(WorkflowInboundInterceptor):
+    routes: Dict[str, str] = {}
+    local_activities: AbstractSet[str] = frozenset()
+
+    def init(self, outbound: WorkflowOutboundInterceptor) -> None:
+        super().init(_RoutingWorkflowOutbound(outbound, self.routes, self.local_activities))
+
+
+class ActivityRoutingInterceptor(Interceptor):
+    """工作流 Worker 拦截器：按 Activity 名称路由到分组任务队列，或改为本地 Activity"""
+
+    def __init__(
+        self, routes: Dict[str, str], local_activities: AbstractSet[str] = frozenset()
+    ):
+        """
+        参数:
+            routes: Activity 名称 → 任务队列
+            local_activities: 以本地 Activity 执行的 Activity 名称（须注册在工作流 Worker 上）
+        """
+        # 路由表在 Worker 启动时确定且不变，工作流重放时得到相同的队列
+        self._inbound: Type[WorkflowInboundInterceptor] = type(
+            "ActivityRoutingWorkflowInbound",
+            (_RoutingWorkflowInbound,),
+            {"routes": dict(routes), "local_activities": frozenset(local_activities)},
+        )
+
+    def workflow_interceptor_class(
+        self, input: WorkflowInterceptorClassInput
+    ) -> Type[WorkflowInboundInterceptor]:
+        return self._inbound
@@ -0,0 +1,224 @@
+"""
+Worker 多进程监管
+
+职责：
+- 在同一任务队列上启动 N 个 Worker 进程（工作流代码受 GIL 限制，单进程最多用满一个核）
+- 健康检查：子进程退出或心跳超时时按指数退避重启；子进程因配置错误退出时停止全部进程
+- 收到 SIGTERM / SIGINT 时通知全部子进程优雅关闭，超过宽限期后强制结束
+"""
+
+import logging
+import multiprocessing
+import multiprocessing.context
+import signal
+import time
+from typing import Any, Callable, List, Optional, cast
+
+logger = logging.getLogger(__name__)
+
+# 子进程入口：target(进程序号, 心跳) —— 心跳为共享的 double，子进程定期写入当前时间
+WorkerTarget = Callable[[int, Any], None]
+
+# 宽限期之外额外等待子进程退出的时间（断开连接、清理）
+_SHUTDOWN_MARGIN_SECONDS = 5.0
+
+# 子进程因配置错误退出的退出码（sysexits EX_CONFIG），重启无法恢复
+EXIT_CONFIG_ERROR = 78
+
+
+class _Slot:
+    """一个 Worker 进程位"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.process: Optional[multiprocessing.process.BaseProcess] = None
+        self.heartbeat: Any = None
+        self.started_at = 0.0
+        # 当前重启退避；进程不在运行时的重启时间
+        self.backoff = 0.0
+        self.restart_at = 0.0
+        # 因心跳超时已发送 SIGTERM 的时间
+        self.terminated_at = 0.0
+        self.restarts = 0
+
+
+class WorkerSupervisor:
+    """
+    Worker 进程监管
+
+    子进程以 spawn 方式启动（Temporal 客户端的 Rust 运行时不支持 fork 后继续使用），
+    各自连接 Temporal 并轮询同一任务队列
+    """
+
+    def __init__(
+        self,
+        target: WorkerTarget,
+        processes: int,
+        shutdown_grace_seconds: float = 30.0,
+        heartbeat_timeout_seconds: float = 60.0,
+        restart_backoff_seconds: float = 1.0,
+        restart_backoff_max_seconds: float = 60.0,
+        monitor_interval: float = 0.5,
+        start_method: str = "spawn",
+    ):
+        """
+        参数:
+            target: 子进程入口（spawn 时须为模块级函数）
+            processes: 进程数
+            shutdown_grace_seconds: 关闭时等待子进程排空的时间
+            heartbeat_timeout_seconds: 心跳超时（0 关闭心跳检查）
+            restart_backoff_seconds: 首次重启退避
+            restart_backoff_max_seconds: 重启退避上限；进程稳定运行超过该时间后退避清零
+            monitor_interval: 健康检查间隔
+            start_method: multiprocessing 启动方式
+        """
+        if processes < 1:
+            raise ValueError("processes must be >= 1")
+        self._target = target
+        self._grace = shutdown_grace_seconds
+        self._heartbeat_timeout = heartbeat_timeout_seconds
+        self._backoff = restart_backoff_seconds
+        self._backoff_max = restart_backoff_max_seconds
+        self._monitor_interval = monitor_interval
+        # 各启动方式的上下文都提供 Process / Value，按 spawn 上下文标注类型
+        self._context = cast(
+            multiprocessing.context.SpawnContext, multiprocessing.get_context(start_method)
+        )
+        self._slots = [_Slot(i) for i in range(processes)]
+        self._stopping = False
+
+    @property
+    def processes(self) -> int:
+        return len(self._slots)
+
+    @property
+    def alive(self) -> int:
+        """存活的子进程数"""
+        return sum(1 for s in self._slots if s.process is not None and s.process.is_alive())
+
+    @property
+    def restarts(self) -> int:
+        """累计重启次数"""
+        return sum(s.restarts for s in self._slots)
+
+    def pids(self) -> List[Optional[int]]:
+        return [s.process.pid if s.process is not None else None for s in self._slots]
+
+    def start(self) -> None:
+        """启动全部子进程"""
+        for slot in self._slots:
+            self._spawn(slot)
+        logger.info(f"Started {len(self._slots)} worker processes")
+
+    def stop(self) -> None:
+        """请求停止（可在信号处理函数中调用），run() 随后完成关闭"""
+        self._stopping = True
+
+    def run(self) -> int:
+        """
+        启动子进程并监管，直到收到 SIGTERM / SIGINT
+
+        返回:
+            退出码：全部子进程正常退出时为 0
+        """
+
+        def signal_handler(signum, frame):
+            logger.info(f"Received signal {signum}, draining worker processes...")
+            self.stop()
+
+        signal.signal(signal.SIGINT, signal_handler)
+        signal.signal(signal.SIGTERM, signal_handler)
+
+        self.start()
+        while not self._stopping:
+            self.check()
+            time.sleep(self._monitor_interval)
+        return self.shutdown()
+
+    def check(self) -> None:
+        """健康检查一轮：重启已退出或心跳超时的子进程；子进程因配置错误退出时停止监管"""
+        now = time.time()
+        for slot in self._slots:
+            process = slot.process
+            if process is None:
+                if now >= slot.restart_at:
+                    slot.restarts += 1
+                    self._spawn(slot)
+                continue
+
+            if not process.is_alive():
+                process.join()
+                if process.exitcode == EXIT_CONFIG_ERROR:
+                    logger.error(
+                        f"Worker process {slot.index} (pid {process.pid}) exited with a "
+                        f"configuration error, stopping all worker processes"
+                    )
+                    self.stop()
+                    return
+                # 稳定运行足够久后再退出，视为偶发故障，退避从头开始
+                if now - slot.started_at >= self._backoff_max:
+                    slot.backoff = 0.0
+                slot.backoff = min(max(slot.backoff * 2, self._backoff), self._backoff_max)
+                slot.restart_at = now + slot.backoff
+                slot.process = None
+                logger.warning(
+                    f"Worker process {slot.index} (pid {process.pid}) exited with code "
+                    f"{process.exitcode}, restarting in {slot.backoff:.1f}s"
+                )
+                continue
+
+            if slot.terminated_at:
+                # 已要求关闭但仍未退出
+                if now - slot.terminated_at > self._grace:
+                    logger.error(f"Worker process {slot.index} (pid {process.pid}) killed")
+                    process.kill()
+                continue
+
+            silent = now - slot.heartbeat.value
+            if self._heartbeat_timeout > 0 and silent > self._heartbeat_timeout:
+                logger.error(
+                    f"Worker process {slot.index} (pid {process.pid}) missed heartbeats "
+                    f"for {silent:.0f}s, terminating"
+                )
+                process.terminate()
+                slot.terminated_at = now
+
+    def shutdown(self) -> int:
+        """
+        向全部子进程发送 SIGTERM，等待排空，超时后强制结束
+
+        返回:
+            退出码：全部子进程正常退出时为 0
+        """
+        self._stopping = True
+        processes = [s.process for s in self._slots if s.process is not None]
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+        deadline = time.monotonic() + self._grace + _SHUTDOWN_MARGIN_SECONDS
+        for process in processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+        for process in processes:
+            if process.is_alive():
+                logger.error(f"Worker process pid {process.pid} did not drain in time, killing")
+                process.kill()
+                process.join()
+
+        failed = [p.pid for p in processes if p.exitcode != 0]
+        if failed:
+            logger.warning(f"Worker processes exited abnormally: {failed}")
+        logger.info("All worker processes stopped")
+        return 1 if failed else 0
+
+    def _spawn(self, slot: _Slot) -> None:
+        slot.heartbeat = self._context.Value("d", time.time(), lock=False)
+        slot.process = self._context.Process(
+            target=self._target,
+            args=(slot.index, slot.heartbeat),
+            name=f"ecis-worker-{slot.index}",
+            daemon=False,
+        )
+        slot.process.start()
+        slot.started_at = time.time()
+        slot.terminated_at = 0.0
@@ -0,0 +1,309 @@
+"""
+Worker 并发与轮询调优
+
+职责：
+- 由 WorkerConfig 生成 Worker 的并发上限、粘性缓存与轮询参数
+- 自动调优：按 Activity 排队延迟（调度到开始）与槽位饱和度调整 Activity 并发上限，
+  轮询数交由 SDK 按服务端反馈自动伸缩
+"""
+
+import asyncio
+import inspect
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from temporalio import activity
+from temporalio.worker import (
+    ActivityInboundInterceptor,
+    CustomSlotSupplier,
+    ExecuteActivityInput,
+    FixedSizeSlotSupplier,
+    Interceptor,
+    PollerBehaviorAutoscaling,
+    PollerBehaviorSimpleMaximum,
+    SlotMarkUsedContext,
+    SlotPermit,
+    SlotReleaseContext,
+    SlotReserveContext,
+    WorkerTuner,
+)
+
+from src.core.config import WorkerConfig
+
+logger = logging.getLogger(__name__)
+
+# SDK 的默认并发上限（未配置时使用）
+_SDK_DEFAULT_SLOTS = 100
+# 一个调整周期内保留的排队延迟样本数
+_MAX_LATENCY_SAMPLES = 1000
+# 峰值占用 / 上限达到该比例视为饱和，低于 _IDLE 视为空闲
+_SATURATED = 0.9
+_IDLE = 0.5
+
+
+class AdaptiveSlotSupplier(CustomSlotSupplier):
+    """
+    上限可调的 Activity 槽位供给
+
+    reserve_slot 在 Worker 事件循环中调用；mark_slot_used / release_slot 由 SDK 核心线程调用，
+    计数由线程锁保护，唤醒等待者通过 call_soon_threadsafe 回到事件循环
+    """
+
+    def __init__(
+        self,
+        minimum: int,
+        maximum: int,
+        target_queue_latency: float,
+        initial: Optional[int] = None,
+    ):
+        """
+        参数:
+            minimum: 上限的下界
+            maximum: 上限的上界
+            target_queue_latency: 目标排队延迟（秒）
+            initial: 初始上限（默认 minimum）
+        """
+        if not 1 <= minimum <= maximum:
+            raise ValueError("require 1 <= minimum <= maximum")
+        self._minimum = minimum
+        self._maximum = maximum
+        self._target = target_queue_latency
+        self._limit = min(max(initial or minimum, minimum), maximum)
+        self._lock = threading.Lock()
+        # 已发出的许可（含正在轮询、尚未拿到任务的）与实际执行中的任务
+        self._reserved = 0
+        self._used = 0
+        # 当前调整周期内的峰值占用与排队延迟样本
+        self._peak_used = 0
+        self._latencies: Deque[float] = deque(maxlen=_MAX_LATENCY_SAMPLES)
+        self._waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    @property
+    def used(self) -> int:
+        return self._used
+
+    async def reserve_slot(self, ctx: SlotReserveContext) -> SlotPermit:
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                if self._reserved < self._limit:
+                    self._reserved += 1
+                    return SlotPermit()
+                waiter = loop.create_future()
+                self._waiters.append((loop, waiter))
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                with self._lock:
+                    if (loop, waiter) in self._waiters:
+                        self._waiters.remove((loop, waiter))
+                    else:
+                        # 已被唤醒却不再需要，把机会让给下一个等待者
+                        self._wake(1)
+                raise
+
+    def try_reserve_slot(self, ctx: SlotReserveContext) -> Optional[SlotPermit]:
+        with self._lock:
+            if self._reserved < self._limit:
+                self._reserved += 1
+                return SlotPermit()
+        return None
+
+    def mark_slot_used(self, ctx: SlotMarkUsedContext) -> None:
+        with self._lock:
+            self._used += 1
+            self._peak_used = max(self._peak_used, self._used)
+
+    def release_slot(self, ctx: SlotReleaseContext) -> None:
+        with self._lock:
+            self._reserved -= 1
+            if ctx.slot_info is not None:
+                self._used -= 1
+            if self._reserved < self._limit:
+                self._wake(1)
+
+    def observe_queue_latency(self, seconds: float) -> None:
+        """记录一次 Activity 排队延迟"""
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def adjust(self) -> int:
+        """
+        按上一周期的观测调整上限
+
+        排队延迟超过目标且槽位饱和时（Worker 是瓶颈）按 1.5 倍扩大；
+        延迟低于目标一半且占用不到一半时每次缩小 10%
+
+        返回:
+            新上限
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+            latency = latencies[int(len(latencies) * 0.9)] if latencies else 0.0
+            saturation = self._peak_used / self._limit
+            limit = self._limit
+            if latency > self._target and saturation >= _SATURATED:
+                limit = min(self._maximum, limit + max(1, limit // 2))
+            elif latency < self._target / 2 and saturation < _IDLE:
+                limit = max(self._minimum, limit - max(1, limit // 10))
+
+            if limit != self._limit:
+                logger.info(
+                    f"Activity slots {self._limit} -> {limit} "
+                    f"(p90 queue latency {latency:.2f}s, saturation {saturation:.0%})"
+                )
+                self._limit = limit
+                self._wake(limit - self._reserved)
+            self._latencies.clear()
+            self._peak_used = self._used
+            return limit
+
+    def _wake(self, count: int) -> None:
+        """唤醒至多 count 个等待者（调用方持有锁）"""
+        while count > 0 and self._waiters:
+            loop, waiter = self._waiters.popleft()
+            loop.call_soon_threadsafe(_resolve, waiter)
+            count -= 1
+
+
+def _resolve(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class _QueueLatencyActivityInbound(ActivityInboundInterceptor):
+    def __init__(self, next: ActivityInboundInterceptor, observe: Callable[[float], None]):
+        super().__init__(next)
+        self._observe = observe
+
+    async def execute_activity(self, input: ExecuteActivityInput) -> Any:
+        info = activity.info()
+        if info.current_attempt_scheduled_time is not None and info.started_time is not None:
+            latency = info.started_time - info.current_attempt_scheduled_time
+            self._observe(max(0.0, latency.total_seconds()))
+        return await super().execute_activity(input)
+
+
+class QueueLatencyInterceptor(Interceptor):
+    """记录每个 Activity 从调度到开始执行的排队延迟"""
+
+    def __init__(self, observe: Callable[[float], None]):
+        self._observe = observe
+
+    def intercept_activity(self, next: ActivityInboundInterceptor) -> ActivityInboundInterceptor:
+        return _QueueLatencyActivityInbound(next, self._observe)
+
+
+class ActivityAutotuner:
+    """Activity 并发自动调优（槽位供给 + 排队延迟采集 + 周期调整）"""
+
+    def __init__(
+        self,
+        minimum: int,
+        maximum: int,
+        target_queue_latency: float,
+        interval: float,
+        initial: Optional[int] = None,
+    ):
+        self.supplier = AdaptiveSlotSupplier(minimum, maximum, target_queue_latency, initial)
+        self.interceptor = QueueLatencyInterceptor(self.supplier.observe_queue_latency)
+        self._interval = interval
+
+    @classmethod
+    def from_config(
+        cls,
+        config: WorkerConfig,
+        initial: Optional[int] = None,
+        maximum: Optional[int] = None,
+    ) -> "ActivityAutotuner":
+        """
+        参数:
+            config: Worker 配置
+            initial: 初始上限（默认 max_concurrent_activities）
+            maximum: 上限的上界，不超过 autotune_max_activities（如分组的独立上限）
+        """
+        upper = config.autotune_max_activities
+        if maximum is not None:
+            upper = min(maximum, upper)
+        return cls(
+            minimum=min(config.autotune_min_activities, upper),
+            maximum=upper,
+            target_queue_latency=config.autotune_target_queue_latency_seconds,
+            interval=config.autotune_interval_seconds,
+            initial=initial or config.max_concurrent_activities,
+        )
+
+    def tuner(self, workflow_slots: int, local_activity_slots: int) -> WorkerTuner:
+        """Activity 使用自适应槽位，其余为固定槽位"""
+        suppliers: Dict[str, Any] = dict(
+            workflow_supplier=FixedSizeSlotSupplier(workflow_slots),
+            activity_supplier=self.supplier,
+            local_activity_supplier=FixedSizeSlotSupplier(local_activity_slots),
+        )
+        # Nexus 槽位只在较新的 SDK 中存在（且为必填）
+        if "nexus_supplier" in inspect.signature(WorkerTuner.create_composite).parameters:
+            suppliers["nexus_supplier"] = FixedSizeSlotSupplier(_SDK_DEFAULT_SLOTS)
+        return WorkerTuner.create_composite(**suppliers)
+
+    async def run(self) -> None:
+        """周期调整，直到被取消"""
+        while True:
+            await asyncio.sleep(self._interval)
+            self.supplier.adjust()
+
+
+def worker_options(
+    config: WorkerConfig,
+    autotuner: Optional[ActivityAutotuner] = None,
+    max_concurrent_activities: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    生成 Worker 的并发、缓存与轮询参数
+
+    参数:
+        config: Worker 配置
+        autotuner: 自动调优器（为 None 时使用固定上限与固定轮询数）
+        max_concurrent_activities: Activity 并发上限（默认取配置，如分组 Worker 的独立上限）
+
+    返回:
+        传给 temporalio.worker.Worker 的关键字参数
+    """
+    options: Dict[str, Any] = {"max_cached_workflows": config.max_cached_workflows}
+    if autotuner is None:
+        options.update(
+            max_concurrent_workflow_tasks=config.max_concurrent_workflow_tasks,
+            max_concurrent_activities=max_concurrent_activities
+            or config.max_concurrent_activities,
+            max_concurrent_local_activities=config.max_concurrent_local_activities,
+            workflow_task_poller_behavior=PollerBehaviorSimpleMaximum(
+                config.workflow_task_pollers
+            ),
+            activity_task_poller_behavior=PollerBehaviorSimpleMaximum(
+                config.activity_task_pollers
+            ),
+        )
+        return options
+
+    interceptors: List[Interceptor] = [autotuner.interceptor]
+    options.update(
+        tuner=autotuner.tuner(
+            config.max_concurrent_workflow_tasks or _SDK_DEFAULT_SLOTS,
+            config.max_concurrent_local_activities or _SDK_DEFAULT_SLOTS,
+        ),
+        interceptors=interceptors,
+        workflow_task_poller_behavior=PollerBehaviorAutoscaling(
+            maximum=config.autotune_max_pollers,
+            initial=min(config.workflow_task_pollers, config.autotune_max_pollers),
+        ),
+        activity_task_poller_behavior=PollerBehaviorAutoscaling(
+            maximum=config.autotune_max_pollers,
+            initial=min(config.activity_task_pollers, config.autotune_max_pollers),
+        ),
+    )
+    return options
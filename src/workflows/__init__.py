@@ -26,6 +26,12 @@ from .scheduled import (
     ScheduledTaskInput,
     ScheduledTaskResult,
 )
+from .registry import (
+    WORKFLOW_TYPE_ATTRIBUTE,
+    WorkflowRegistry,
+    WorkflowType,
+    workflow_registry,
+)
 
 __all__ = [
     # Cleaning
@@ -46,4 +52,9 @@ __all__ = [
     "ScheduledPatrolWorkflow",
     "ScheduledTaskInput",
     "ScheduledTaskResult",
+    # Registry
+    "WORKFLOW_TYPE_ATTRIBUTE",
+    "WorkflowRegistry",
+    "WorkflowType",
+    "workflow_registry",
 ]
@@ -10,6 +10,7 @@ from typing import Any, Dict, Optional
 
 from temporalio import workflow
 from temporalio.common import RetryPolicy
+from temporalio.exceptions import ActivityError, TimeoutError as ActivityTimeoutError
 
 with workflow.unsafe.imports_passed_through():
     from src.activities.facility import (
@@ -23,6 +24,7 @@ with workflow.unsafe.imports_passed_through():
     from src.activities.robot import (
         RobotTaskParams,
         assign_task_to_robot,
+        await_robot_task_completion,
         find_available_robot,
         get_robot_status,
         wait_for_robot_task_completion,
@@ -38,6 +40,8 @@ class CleaningWorkflowInput:
     cleaning_mode: str = "standard"  # standard, deep, quick
     robot_id: Optional[str] = None  # 指定机器人，否则自动选择
     priority: int = 3
+    # 事件驱动等待任务完成（不占用 Activity 槽位），由 WORKER_ROBOT_COMPLETION_ASYNC 决定
+    event_driven_completion: bool = False
 
 
 @dataclass
@@ -86,6 +90,24 @@ class RobotCleaningWorkflow:
             "error": self._error,
         }
 
+    async def _await_completion(self, task_id: str, timeout_seconds: int) -> Dict[str, Any]:
+        """
+        事件驱动等待任务完成：登记后由完成事件异步完成，期间无心跳
+
+        超时即为任务超时（不重试，重试只会重新登记），返回 timeout 状态
+        """
+        try:
+            return await workflow.execute_activity(
+                await_robot_task_completion,
+                args=[task_id, timeout_seconds],
+                start_to_close_timeout=timedelta(seconds=timeout_seconds),
+                retry_policy=RetryPolicy(maximum_attempts=1),
+            )
+        except ActivityError as e:
+            if not isinstance(e.cause, ActivityTimeoutError):
+                raise
+            return {"task_id": task_id, "status": "timeout", "result": {}}
+
     @workflow.signal
     async def cancel_cleaning(self, reason: str = ""):
         """取消清洁信号"""
@@ -267,12 +289,15 @@ class RobotCleaningWorkflow:
             self._progress = 60
             workflow.logger.info(f"Waiting for cleaning task completion: {task_id}")
 
-            completion_result = await workflow.execute_activity(
-                wait_for_robot_task_completion,
-                args=[task_id, 3600],  # 1小时超时
-                start_to_close_timeout=timedelta(hours=2),
-                heartbeat_timeout=timedelta(minutes=1),
-            )
+            if input.event_driven_completion:
+                completion_result = await self._await_completion(task_id, 3600)  # 1小时超时
+            else:
+                completion_result = await workflow.execute_activity(
+                    wait_for_robot_task_completion,
+                    args=[task_id, 3600],  # 1小时超时
+                    start_to_close_timeout=timedelta(hours=2),
+                    heartbeat_timeout=timedelta(minutes=1),
+                )
 
             if completion_result["status"] != "completed":
                 return CleaningWorkflowResult(
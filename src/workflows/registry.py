@@ -0,0 +1,138 @@
+"""
+工作流类型注册表
+
+职责：
+- 类型名 → 工作流类 / 输入数据类 / 工作流 ID 前缀
+- 启动时以自定义搜索属性 EcisWorkflowType 标记工作流类型
+- 列表过滤与类型识别走搜索属性索引，而非 WorkflowId 前缀扫描
+
+搜索属性需在命名空间中预先创建：
+    temporal operator search-attribute create --name EcisWorkflowType --type Keyword
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Type
+
+from temporalio.common import SearchAttributeKey, SearchAttributePair, TypedSearchAttributes
+
+from .approval import ApprovalWorkflow, ApprovalWorkflowInput, MultiStageApprovalWorkflow
+from .cleaning import CleaningWorkflowInput, RobotCleaningWorkflow
+from .delivery import DeliveryWorkflow, DeliveryWorkflowInput
+from .scheduled import ScheduledCleaningWorkflow, ScheduledPatrolWorkflow, ScheduledTaskInput
+
+# 工作流类型搜索属性（Keyword，可索引）
+WORKFLOW_TYPE_ATTRIBUTE = SearchAttributeKey.for_keyword("EcisWorkflowType")
+
+UNKNOWN_WORKFLOW_TYPE = "unknown"
+
+
+@dataclass(frozen=True)
+class WorkflowType:
+    """工作流类型"""
+
+    name: str
+    workflow: Type
+    # 单一输入数据类；多参数工作流为 None
+    input_type: Optional[Type]
+    id_prefix: str
+
+    @property
+    def temporal_name(self) -> str:
+        """Temporal 中的工作流类型名（@workflow.defn 默认取类名）"""
+        name: str = getattr(self.workflow, "__temporal_workflow_definition").name
+        return name
+
+    def new_input(self, **kwargs: Any) -> Any:
+        """构造输入数据"""
+        if self.input_type is None:
+            raise TypeError(f"Workflow type {self.name} takes positional arguments")
+        return self.input_type(**kwargs)
+
+
+class WorkflowRegistry:
+    """工作流类型注册表"""
+
+    def __init__(self, types: Iterable[WorkflowType] = ()):
+        self._types: Dict[str, WorkflowType] = {}
+        self._by_temporal_name: Dict[str, WorkflowType] = {}
+        for workflow_type in types:
+            self.register(workflow_type)
+
+    def register(self, workflow_type: WorkflowType) -> None:
+        """
+        注册工作流类型
+
+        异常:
+            ValueError: 类型名重复
+        """
+        if workflow_type.name in self._types:
+            raise ValueError(f"Workflow type already registered: {workflow_type.name}")
+        self._types[workflow_type.name] = workflow_type
+        self._by_temporal_name[workflow_type.temporal_name] = workflow_type
+
+    def get(self, name: str) -> Optional[WorkflowType]:
+        return self._types.get(name)
+
+    def names(self) -> List[str]:
+        return list(self._types)
+
+    def workflow_classes(self) -> List[Type]:
+        """全部工作流类（供 Worker 注册）"""
+        return [t.workflow for t in self._types.values()]
+
+    def search_attributes(self, name: str) -> TypedSearchAttributes:
+        """启动工作流时附带的搜索属性"""
+        return TypedSearchAttributes([SearchAttributePair(WORKFLOW_TYPE_ATTRIBUTE, name)])
+
+    def query(self, name: str) -> str:
+        """按类型过滤的可见性查询"""
+        return f'{WORKFLOW_TYPE_ATTRIBUTE.name} = "{name}"'
+
+    def classify(
+        self,
+        workflow_id: str,
+        temporal_name: Optional[str] = None,
+        search_attributes: Optional[TypedSearchAttributes] = None,
+    ) -> str:
+        """
+        识别工作流类型
+
+        依次取搜索属性、Temporal 工作流类型名、工作流 ID 前缀（兼容未打标的旧工作流）
+
+        返回:
+            类型名，无法识别时为 "unknown"
+        """
+        if search_attributes is not None:
+            name = search_attributes.get(WORKFLOW_TYPE_ATTRIBUTE)
+            if name:
+                return name
+        if temporal_name:
+            workflow_type = self._by_temporal_name.get(temporal_name)
+            if workflow_type is not None:
+                return workflow_type.name
+        for workflow_type in self._types.values():
+            if workflow_id.startswith(f"{workflow_type.id_prefix}-"):
+                return workflow_type.name
+        return UNKNOWN_WORKFLOW_TYPE
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._types
+
+    def __len__(self) -> int:
+        return len(self._types)
+
+
+workflow_registry = WorkflowRegistry(
+    [
+        WorkflowType("cleaning", RobotCleaningWorkflow, CleaningWorkflowInput, "cleaning"),
+        WorkflowType("approval", ApprovalWorkflow, ApprovalWorkflowInput, "approval"),
+        WorkflowType("multi_stage_approval", MultiStageApprovalWorkflow, None, "multi-approval"),
+        WorkflowType("delivery", DeliveryWorkflow, DeliveryWorkflowInput, "delivery"),
+        WorkflowType(
+            "scheduled_cleaning", ScheduledCleaningWorkflow, ScheduledTaskInput, "scheduled-cleaning"
+        ),
+        WorkflowType(
+            "scheduled_patrol", ScheduledPatrolWorkflow, ScheduledTaskInput, "scheduled-patrol"
+        ),
+    ]
+)
@@ -4,6 +4,11 @@ API 集成测试
 测试 API 端点的完整功能
 """
 
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
 import pytest
 from fastapi.testclient import TestClient
 
@@ -94,6 +99,43 @@ class TestTasksAPI:
         data = response.json()
         assert data["new_status"] == "busy"
 
+    def test_agent_heartbeat(self, client):
+        """测试 Agent 心跳"""
+        client.post(
+            "/api/v1/tasks/agents",
+            json={
+                "agent_id": "heartbeat-robot",
+                "agent_type": "robot",
+                "capabilities": ["heartbeat.test"],
+                "lease_ttl": 30,
+            },
+        )
+        response = client.post(
+            "/api/v1/tasks/agents/heartbeat-robot/heartbeat",
+            json={"metadata": {"floor": 3}},
+        )
+        assert response.status_code == 200
+        assert response.json()["agent_status"] == "ready"
+
+        response = client.post("/api/v1/tasks/agents/missing-robot/heartbeat")
+        assert response.status_code == 404
+
+    def test_agent_without_heartbeat_stays_ready(self, client):
+        """测试未指定租约的 Agent 不发心跳也保持 ready"""
+        client.post(
+            "/api/v1/tasks/agents",
+            json={
+                "agent_id": "no-lease-robot",
+                "agent_type": "robot",
+                "capabilities": ["no-lease.test"],
+            },
+        )
+        dispatcher = get_task_dispatcher()
+        assert "no-lease-robot" not in dispatcher.expire_leases(now=time.monotonic() + 3600)
+        assert dispatcher._agents["no-lease-robot"].status == "ready"
+
+        client.delete("/api/v1/tasks/agents/no-lease-robot")
+
     def test_get_stats(self, client):
         """测试获取统计信息"""
         response = client.get("/api/v1/tasks/stats/overview")
@@ -104,6 +146,16 @@ class TestTasksAPI:
         assert "total" in data["agents"]
         assert "ready" in data["agents"]
 
+    def test_get_stats_breakdown(self, client):
+        """测试获取分项统计"""
+        response = client.get(
+            "/api/v1/tasks/stats/overview", params={"breakdown": "true"}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert "robot" in data["by_agent_type"]
+        assert "by_capability" in data
+
     def test_dispatch_task(self, client):
         """测试任务分派"""
         response = client.post(
@@ -152,6 +204,186 @@ class TestTasksAPI:
         data = response.json()
         assert data["status"] == "completed"
 
+    def test_dispatch_batch(self, client):
+        """测试批量分派（部分失败）"""
+        client.post(
+            "/api/v1/tasks/agents",
+            json={
+                "agent_id": "batch-agent-001",
+                "agent_type": "robot",
+                "capabilities": ["batch.test"],
+                "max_load": 2,
+            },
+        )
+
+        response = client.post(
+            "/api/v1/tasks/dispatch/batch",
+            json={
+                "tasks": [
+                    {"capability": "batch.test", "parameters": {"n": 1}},
+                    {"capability": "nonexistent.capability", "parameters": {}},
+                    {"capability": "batch.test", "parameters": {"n": 2}},
+                    {"capability": "batch.test", "parameters": {"n": 3}},
+                ]
+            },
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["succeeded"] == 2
+        assert data["failed"] == 2
+        assert [item["index"] for item in data["results"]] == [0, 1, 2, 3]
+        assert [item["success"] for item in data["results"]] == [True, False, True, False]
+        assert data["results"][0]["agent_id"] == "batch-agent-001"
+        assert data["results"][1]["error"]["code"] == "NO_AVAILABLE_AGENT"
+
+    def test_dispatch_batch_empty(self, client):
+        """测试空批量分派"""
+        response = client.post("/api/v1/tasks/dispatch/batch", json={"tasks": []})
+        assert response.status_code == 422
+
+    def test_dispatch_queue_backpressure(self, client, monkeypatch):
+        """测试排队分派与队列满时的 429"""
+        client.post(
+            "/api/v1/tasks/agents",
+            json={
+                "agent_id": "queue-test-robot",
+                "agent_type": "robot",
+                "capabilities": ["queue.test"],
+                "max_load": 1,
+            },
+        )
+        monkeypatch.setattr(get_task_dispatcher()._queue, "_max_depth", 1)
+        body = {"capability": "queue.test", "parameters": {}, "queue": True}
+
+        assert client.post("/api/v1/tasks/dispatch", json=body).json()["status"] == "assigned"
+        queued = client.post("/api/v1/tasks/dispatch", json=body)
+        assert queued.json()["status"] == "queued"
+
+        response = client.post("/api/v1/tasks/dispatch", json=body)
+        assert response.status_code == 429
+        assert "Retry-After" in response.headers
+
+        client.delete("/api/v1/tasks/agents/queue-test-robot")
+        client.post(f"/api/v1/tasks/{queued.json()['task_id']}/complete", params={"success": False})
+
+    def test_robot_task_completion(self, client, monkeypatch):
+        """测试机器人任务完成回调与 Federation 事件完成等待中的 Activity"""
+        from temporalio.service import RPCError, RPCStatusCode
+
+        from src.core.temporal_client import get_temporal_pool
+        from src.services import robot_completions
+
+        completions = robot_completions.RobotTaskCompletions(
+            robot_completions.InMemoryCompletionRegistry()
+        )
+        monkeypatch.setattr(robot_completions, "_robot_task_completions", completions)
+        completed = []
+
+        class FakeHandle:
+            def __init__(self, task_token):
+                self.task_token = task_token
+
+            async def complete(self, result):
+                if self.task_token == b"gone":
+                    raise RPCError("activity not found", RPCStatusCode.NOT_FOUND, b"")
+                completed.append((self.task_token, result))
+
+        class FakePool:
+            async def acquire(self):
+                return SimpleNamespace(get_async_activity_handle=FakeHandle)
+
+        async def register(*tokens):
+            for task_id, token in tokens:
+                await completions.register(task_id, token, 60)
+
+        asyncio.run(register(("robot-1", b"t1"), ("robot-2", b"t2"), ("robot-3", b"gone")))
+
+        app.dependency_overrides[get_temporal_pool] = FakePool
+        try:
+            response = client.post(
+                "/api/v1/tasks/robot/robot-1/completion",
+                json={"status": "completed", "result": {"area_cleaned_sqm": 150}},
+            )
+            assert response.json()["delivered"] is True
+
+            response = client.post(
+                "/api/v1/tasks/robot/events",
+                json={"event_type": "task.failed", "data": {"task_id": "robot-2", "reason": "x"}},
+            )
+            assert response.json()["status"] == "failed"
+
+            # 尚无等待方：结果暂存
+            response = client.post("/api/v1/tasks/robot/robot-9/completion", json={})
+            assert response.json()["delivered"] is False
+
+            assert client.post("/api/v1/tasks/robot/robot-3/completion", json={}).status_code == 404
+            response = client.post(
+                "/api/v1/tasks/robot/events", json={"event_type": "task.progress", "data": {}}
+            )
+            assert response.status_code == 400
+        finally:
+            app.dependency_overrides.clear()
+
+        assert [token for token, _ in completed] == [b"t1", b"t2"]
+        assert completed[0][1]["result"] == {"area_cleaned_sqm": 150}
+        assert completed[1][1]["status"] == "failed"
+        assert completed[1][1]["result"] == {"reason": "x"}
+
+
+class TestJSONResponses:
+    """JSON 响应序列化测试"""
+
+    def test_dumps_matches_stdlib(self):
+        """测试 orjson 与标准库回退输出一致"""
+        from datetime import datetime
+
+        from pydantic import BaseModel
+
+        from src.api import responses
+
+        class Item(BaseModel):
+            name: str
+
+        content = {"time": datetime(2024, 1, 1, 8, 30), "items": [Item(name="楼层")], 1: None}
+        fast = responses.dumps(content)
+
+        orjson, responses.orjson = responses.orjson, None
+        try:
+            fallback = responses.dumps(content)
+        finally:
+            responses.orjson = orjson
+
+        assert json.loads(fast) == json.loads(fallback) == {
+            "time": "2024-01-01T08:30:00",
+            "items": [{"name": "楼层"}],
+            "1": None,
+        }
+
+    def test_serialized_cache_version(self):
+        """测试预序列化缓存按版本失效"""
+        from src.api.responses import SerializedCache
+
+        cache = SerializedCache()
+        calls = []
+
+        def build():
+            calls.append(1)
+            return {"count": len(calls)}
+
+        assert cache.response(1, "k", build).body == b'{"count":1}'
+        assert cache.response(1, "k", build).body == b'{"count":1}'
+        assert cache.response(2, "k", build).body == b'{"count":2}'
+
+    def test_serialized_cache_bounded(self):
+        """测试预序列化缓存条目数有上限，淘汰最久未用的"""
+        from src.api.responses import SerializedCache
+
+        cache = SerializedCache(max_entries=2)
+        for key in ("a", "b", "a", "c"):
+            cache.response(1, key, lambda: {"key": key})
+
+        assert list(cache._bodies) == ["a", "c"]
+
 
 class TestDeliveryAPI:
     """配送 API 测试（无Temporal时跳过）"""
@@ -197,3 +429,102 @@ class TestWorkflowsAPI:
             },
         )
         assert response.status_code in [404, 405, 422]
+
+    def test_export_workflows_ndjson(self, client, monkeypatch):
+        """测试 NDJSON 导出"""
+        from src.api.routes import workflows
+        from src.services.workflow_service import WorkflowService
+        from tests.test_services import _FakeVisibility
+
+        service = WorkflowService(_FakeVisibility(3))
+
+        async def fake_service():
+            return service
+
+        monkeypatch.setattr(workflows, "get_workflow_service", fake_service)
+        response = client.get("/api/v1/workflows/export", params={"page_size": 2})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert [row["workflow_id"] for row in rows] == [
+            "cleaning-0000", "cleaning-0001", "cleaning-0002",
+        ]
+
+    def test_batch_start_validation(self, client):
+        """测试批量启动请求验证"""
+        response = client.post(
+            "/api/v1/workflows/start/batch",
+            json={"workflow_type": "cleaning", "items": []},
+        )
+        assert response.status_code == 422
+
+    def test_batch_cancel_requires_target(self, client, monkeypatch):
+        """测试批量取消需指定目标"""
+        from src.api.routes import workflows
+        from src.services.workflow_service import WorkflowService
+        from tests.test_services import _FakeHandles
+
+        service = WorkflowService(_FakeHandles())
+
+        async def fake_service():
+            return service
+
+        monkeypatch.setattr(workflows, "get_workflow_service", fake_service)
+        response = client.post("/api/v1/workflows/cancel/batch", json={})
+        assert response.status_code == 400
+
+        response = client.post(
+            "/api/v1/workflows/cancel/batch", json={"workflow_ids": ["delivery-1"]}
+        )
+        assert response.status_code == 200
+        assert response.json()["succeeded"] == 1
+
+    def test_workflow_events_stream(self, client):
+        """测试进度推送：工作流已结束时推送 closed 后关闭"""
+        from temporalio.client import WorkflowExecutionStatus
+
+        from src.core.temporal_client import get_temporal_pool
+
+        class FakeHandle:
+            async def describe(self):
+                return SimpleNamespace(status=WorkflowExecutionStatus.COMPLETED)
+
+        class FakePool:
+            async def acquire(self):
+                return SimpleNamespace(get_workflow_handle=lambda workflow_id: FakeHandle())
+
+        app.dependency_overrides[get_temporal_pool] = FakePool
+        try:
+            response = client.get("/api/v1/workflows/events-test-1/events")
+        finally:
+            app.dependency_overrides.clear()
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert response.text == (
+            'event: closed\ndata: {"status": "COMPLETED", "details": {}}\n\n'
+        )
+
+    def test_workflow_status_without_status(self, client):
+        """测试 describe 未返回状态时报告 UNKNOWN 而不是失败"""
+        from src.core.temporal_client import get_temporal_pool
+
+        class FakeHandle:
+            async def describe(self):
+                return SimpleNamespace(status=None)
+
+            async def query(self, name):
+                return {"step": "init"}
+
+        class FakePool:
+            async def acquire(self):
+                return SimpleNamespace(get_workflow_handle=lambda workflow_id: FakeHandle())
+
+        app.dependency_overrides[get_temporal_pool] = FakePool
+        try:
+            response = client.get("/api/v1/workflows/no-status-1")
+        finally:
+            app.dependency_overrides.clear()
+
+        assert response.status_code == 200
+        assert response.json()["status"] == "UNKNOWN"
@@ -4,7 +4,8 @@ Core 模块测试
 
 import pytest
 
-from src.core.config import Config, get_config, reset_config
+from src.core import temporal_client
+from src.core.config import Config, TemporalConfig, get_config, reset_config
 from src.core.exceptions import (
     OrchestratorError,
     WorkflowNotFoundError,
@@ -12,6 +13,7 @@ from src.core.exceptions import (
     NoAvailableAgentError,
     ApprovalTimeoutError,
 )
+from src.core.temporal_client import TemporalClientPool
 
 
 class TestConfig:
@@ -98,3 +100,48 @@ class TestExceptions:
         assert "ar-789" in error.message
         assert error.code == "APPROVAL_TIMEOUT"
         assert error.details["timeout_hours"] == 24
+
+
+class TestTemporalClientPool:
+    """Temporal 客户端池测试"""
+
+    @pytest.fixture
+    def connects(self, monkeypatch):
+        """替换 Client.connect，记录每次建立的连接"""
+        calls = []
+
+        async def fake_connect(address, namespace="default"):
+            calls.append((address, namespace))
+            return f"client-{len(calls)}"
+
+        monkeypatch.setattr(temporal_client.Client, "connect", fake_connect)
+        return calls
+
+    async def test_not_initialized(self):
+        """测试未连接时获取客户端"""
+        pool = TemporalClientPool(TemporalConfig())
+        assert not pool.connected
+        with pytest.raises(RuntimeError, match="not initialized"):
+            pool.get()
+
+    async def test_round_robin(self, connects):
+        """测试多连接轮询"""
+        pool = TemporalClientPool(TemporalConfig(client_pool_size=3, namespace="ecis"))
+        await pool.connect()
+        await pool.connect()
+
+        assert pool.size == 3
+        assert connects == [("localhost:7233", "ecis")] * 3
+        assert [pool.get() for _ in range(4)] == [
+            "client-1", "client-2", "client-3", "client-1",
+        ]
+
+    async def test_acquire_connects_lazily(self, connects):
+        """测试首次获取时建立连接，之后复用"""
+        pool = TemporalClientPool(TemporalConfig())
+        assert await pool.acquire() == "client-1"
+        assert await pool.acquire() == "client-1"
+        assert len(connects) == 1
+
+        await pool.close()
+        assert not pool.connected
@@ -4,6 +4,9 @@
 测试编排器与各组件的完整集成
 """
 
+import asyncio
+
+import httpx
 import pytest
 import threading
 from fastapi.testclient import TestClient
@@ -12,6 +15,7 @@ import sys
 sys.path.insert(0, '/root/projects/ecis/ecis-orchestrator')
 
 from src.api.main import app
+from src.services.task_dispatcher import get_task_dispatcher
 
 
 @pytest.fixture
@@ -346,3 +350,47 @@ class TestConcurrency:
 
         success_count = sum(1 for code in results if code == 200)
         assert success_count > 0
+
+    async def test_dispatch_stress_never_exceeds_max_load(self, monkeypatch):
+        """测试 10k 并发分派下 Agent 负载不超过 max_load"""
+        dispatcher = get_task_dispatcher()
+        agent_ids = [f'stress-robot-{i:02d}' for i in range(20)]
+
+        async def slow_deliver(assignment, parameters):
+            # 在预留与提交之间让出事件循环，放大交错
+            await asyncio.sleep(0)
+
+        monkeypatch.setattr(dispatcher, '_deliver_task', slow_deliver)
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            for agent_id in agent_ids:
+                await client.post(
+                    '/api/v1/tasks/agents',
+                    json={
+                        'agent_id': agent_id,
+                        'agent_type': 'robot',
+                        'capabilities': ['stress.dispatch.*'],
+                        'max_load': 5,
+                    }
+                )
+
+            responses = await asyncio.gather(*[
+                client.post(
+                    '/api/v1/tasks/dispatch',
+                    json={'capability': 'stress.dispatch.run', 'parameters': {'n': n}},
+                )
+                for n in range(10_000)
+            ])
+
+        success = [r.json() for r in responses if r.status_code == 200]
+        assert len(success) == len(agent_ids) * 5
+        for agent_id in agent_ids:
+            agent = dispatcher._agents[agent_id]
+            assert agent.current_load == agent.max_load
+            assert sum(1 for r in success if r['agent_id'] == agent_id) == agent.max_load
+
+        for r in success:
+            dispatcher.complete_task(r['task_id'])
+        for agent_id in agent_ids:
+            dispatcher.unregister_agent(agent_id)
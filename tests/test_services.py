@@ -2,15 +2,50 @@
 Services 模块单元测试
 """
 
+import asyncio
+import os
+import random
+import signal
+import time
+from types import SimpleNamespace
+
 import pytest
 from datetime import datetime, timezone
+from temporalio.common import TypedSearchAttributes
 
+from src.core.exceptions import (
+    DispatchQueueFullError,
+    NoAvailableAgentError,
+    TaskDispatchError,
+    WorkflowValidationError,
+)
+from src.core.config import DispatcherConfig
+from src.services.agent_leases import LeaseTable
+from src.services.agent_scoring import (
+    FunctionScorer,
+    LocationScorer,
+    ScoringContext,
+    parse_battery,
+    parse_floor,
+)
+from src.services.assignment_history import AssignmentHistory
+from src.services.capability_index import CapabilityIndex, capability_matches
+from src.services.robot_completions import InMemoryCompletionRegistry, RobotTaskCompletions
 from src.services.task_dispatcher import (
     TaskDispatcher,
     AgentInfo,
+    DispatchRequest,
     TaskAssignment,
     get_task_dispatcher,
 )
+from src.services.workflow_cache import WorkflowReadCache
+from src.services.workflow_events import WorkflowEventHub, WorkflowProgress
+from src.services.workflow_service import WorkflowService, WorkflowStartRequest
+from src.core.config import WorkerConfig
+from src.workers.routing import ActivityRouter, activity_name
+from src.workers.supervisor import EXIT_CONFIG_ERROR, WorkerSupervisor
+from src.workers.tuning import ActivityAutotuner, AdaptiveSlotSupplier, worker_options
+from src.workflows.registry import WORKFLOW_TYPE_ATTRIBUTE, workflow_registry
 
 
 class TestAgentInfo:
@@ -170,6 +205,1899 @@ class TestTaskDispatcher:
         assert stats["agents"]["busy"] == 1
 
 
+class TestCapabilityIndex:
+    """CapabilityIndex 测试"""
+
+    def test_lookup_exact_and_wildcard(self):
+        """测试精确与通配匹配"""
+        index = CapabilityIndex()
+        index.add("a1", ["cleaning.floor.standard"])
+        index.add("a2", ["delivery.*"])
+        index.add("a3", ["cleaning"])
+
+        assert index.lookup("cleaning.floor.standard") == {"a1", "a3"}
+        assert index.lookup("delivery.package") == {"a2"}
+        assert index.lookup("delivery.*") == {"a2"}
+        assert index.lookup("patrol") == set()
+
+    def test_remove_prunes_agent(self):
+        """测试移除 Agent"""
+        index = CapabilityIndex()
+        index.add("a1", ["cleaning.floor.standard", "patrol.*"])
+        index.remove("a1")
+
+        assert "a1" not in index
+        assert index.lookup("cleaning.floor.standard") == set()
+        assert index._root.children == {}
+
+    @pytest.mark.parametrize(
+        "pattern,capability",
+        [
+            ("cleaning.floor.standard", "cleaning.floor.standard"),
+            ("cleaning.*", "cleaning.floor.standard"),
+            ("cleaning", "cleaning.floor.deep"),
+            ("*.floor", "cleaning.floor.quick"),
+            ("delivery.*", "delivery.*"),
+            ("delivery.item", "delivery.*"),
+            ("cleaning.floor.standard", "cleaning"),
+            ("patrol.*", "cleaning.floor"),
+        ],
+    )
+    def test_index_agrees_with_matcher(self, pattern, capability):
+        """测试索引与逐条匹配结果一致"""
+        index = CapabilityIndex()
+        index.add("agent", [pattern])
+        assert ("agent" in index.lookup(capability)) == capability_matches(pattern, capability)
+
+    def test_dispatcher_index_follows_status(self):
+        """测试索引随 Agent 状态更新"""
+        dispatcher = TaskDispatcher()
+        dispatcher.register_agent(
+            AgentInfo(
+                agent_id="agent-100",
+                agent_type="robot",
+                capabilities=["cleaning.*"],
+                status="ready",
+            )
+        )
+
+        dispatcher.update_agent_status("agent-100", "offline")
+        assert dispatcher.find_available_agents("cleaning.floor") == []
+
+        dispatcher.update_agent_status("agent-100", "ready")
+        assert len(dispatcher.find_available_agents("cleaning.floor")) == 1
+
+        dispatcher.unregister_agent("agent-100")
+        assert dispatcher.find_available_agents("cleaning.floor") == []
+
+
+class TestLeastLoadedSelection:
+    """负载堆选择测试"""
+
+    def setup_method(self):
+        """测试前设置"""
+        self.dispatcher = TaskDispatcher()
+
+    def _register(self, agent_id, capabilities, current_load=0, max_load=5, agent_type="robot"):
+        self.dispatcher.register_agent(
+            AgentInfo(
+                agent_id=agent_id,
+                agent_type=agent_type,
+                capabilities=capabilities,
+                status="ready",
+                current_load=current_load,
+                max_load=max_load,
+            )
+        )
+
+    async def test_dispatch_spreads_load(self):
+        """测试连续分派按负载轮转"""
+        for i in range(3):
+            self._register(f"agent-{i}", ["cleaning.*"], max_load=2)
+
+        agent_ids = [
+            (await self.dispatcher.dispatch_task("cleaning.floor", {})).agent_id
+            for _ in range(6)
+        ]
+        assert agent_ids == ["agent-0", "agent-1", "agent-2"] * 2
+
+        with pytest.raises(NoAvailableAgentError):
+            await self.dispatcher.dispatch_task("cleaning.floor", {})
+
+    async def test_completed_task_frees_agent(self):
+        """测试完成任务后满载 Agent 重新可选"""
+        self._register("agent-a", ["delivery.*"], max_load=1)
+        self._register("agent-b", ["delivery.*"], current_load=1, max_load=2)
+
+        first = await self.dispatcher.dispatch_task("delivery.package", {})
+        assert first.agent_id == "agent-a"
+        assert self.dispatcher.select_best_agent("delivery.package").agent_id == "agent-b"
+
+        self.dispatcher.complete_task(first.task_id)
+        assert self.dispatcher.select_best_agent("delivery.package").agent_id == "agent-a"
+
+    def test_status_change_updates_heap(self):
+        """测试状态变化同步到负载堆"""
+        self._register("agent-a", ["patrol.*"], current_load=0)
+        self._register("agent-b", ["patrol.*"], current_load=2)
+        assert self.dispatcher.select_best_agent("patrol.night").agent_id == "agent-a"
+
+        self.dispatcher.update_agent_status("agent-a", "offline")
+        assert self.dispatcher.select_best_agent("patrol.night").agent_id == "agent-b"
+
+        self.dispatcher.unregister_agent("agent-b")
+        with pytest.raises(NoAvailableAgentError):
+            self.dispatcher.select_best_agent("patrol.night")
+
+        self.dispatcher.update_agent_status("agent-a", "ready")
+        assert self.dispatcher.select_best_agent("patrol.night").agent_id == "agent-a"
+
+    def test_agent_type_and_prefer_agent(self):
+        """测试类型过滤与优先 Agent"""
+        self._register("robot-a", ["door.open"], current_load=3)
+        self._register("facility-a", ["door.open"], agent_type="facility", current_load=4)
+
+        assert self.dispatcher.select_best_agent("door.open", "facility").agent_id == "facility-a"
+        assert (
+            self.dispatcher.select_best_agent("door.open", prefer_agent_id="facility-a").agent_id
+            == "facility-a"
+        )
+
+    async def test_matches_sorted_selection(self):
+        """测试随机负载变化下与排序选择结果一致"""
+        rng = random.Random(7)
+        for i in range(50):
+            self._register(
+                f"agent-{i:02d}",
+                rng.sample(["cleaning.*", "delivery.*", "patrol.*"], 2),
+                max_load=3,
+            )
+
+        live = []
+        for _ in range(300):
+            capability = rng.choice(["cleaning.floor", "delivery.package", "patrol.night"])
+            available = self.dispatcher.find_available_agents(capability)
+            if live and (not available or rng.random() < 0.4):
+                self.dispatcher.complete_task(live.pop(rng.randrange(len(live))))
+                continue
+            if not available:
+                continue
+
+            expected = min(available, key=lambda a: a.current_load)
+            assignment = await self.dispatcher.dispatch_task(capability, {})
+            assert assignment.agent_id == expected.agent_id
+            live.append(assignment.task_id)
+
+
+class TestAtomicDispatch:
+    """预留式分派测试"""
+
+    def setup_method(self):
+        """测试前设置"""
+        self.dispatcher = TaskDispatcher()
+        self.dispatcher.register_agent(
+            AgentInfo(
+                agent_id="agent-r",
+                agent_type="robot",
+                capabilities=["cleaning.*"],
+                status="ready",
+                max_load=2,
+            )
+        )
+
+    async def test_interleaved_dispatch_respects_max_load(self):
+        """测试下发期间交错的分派不会超载"""
+        async def slow_deliver(assignment, parameters):
+            await asyncio.sleep(0)
+
+        self.dispatcher._deliver_task = slow_deliver
+        results = await asyncio.gather(
+            *[self.dispatcher.dispatch_task("cleaning.floor", {}) for _ in range(10)],
+            return_exceptions=True,
+        )
+
+        assert sum(1 for r in results if isinstance(r, TaskAssignment)) == 2
+        assert all(
+            isinstance(r, (TaskAssignment, NoAvailableAgentError)) for r in results
+        )
+        assert self.dispatcher._agents["agent-r"].current_load == 2
+
+    async def test_failed_delivery_releases_reservation(self):
+        """测试下发失败时释放预留"""
+        async def failing_deliver(assignment, parameters):
+            raise RuntimeError("gateway down")
+
+        self.dispatcher._deliver_task = failing_deliver
+        with pytest.raises(TaskDispatchError):
+            await self.dispatcher.dispatch_task("cleaning.floor", {})
+
+        assert self.dispatcher._agents["agent-r"].current_load == 0
+        assert self.dispatcher._assignments == {}
+
+    async def test_double_complete_releases_once(self):
+        """测试重复完成只释放一次负载"""
+        first = await self.dispatcher.dispatch_task("cleaning.floor", {})
+        await self.dispatcher.dispatch_task("cleaning.floor", {})
+
+        self.dispatcher.complete_task(first.task_id)
+        self.dispatcher.complete_task(first.task_id, success=False)
+
+        assert self.dispatcher._agents["agent-r"].current_load == 1
+        assert first.status == "completed"
+
+
+class TestBatchDispatch:
+    """批量分派测试"""
+
+    def setup_method(self):
+        """测试前设置"""
+        self.dispatcher = TaskDispatcher()
+        for i, load in enumerate([2, 0, 1]):
+            self.dispatcher.register_agent(
+                AgentInfo(
+                    agent_id=f"agent-{i}",
+                    agent_type="robot",
+                    capabilities=["cleaning.*"],
+                    status="ready",
+                    current_load=load,
+                    max_load=3,
+                )
+            )
+
+    async def test_batch_fills_least_loaded_first(self):
+        """测试批量分派按负载均衡并保持顺序"""
+        results = await self.dispatcher.dispatch_tasks(
+            [DispatchRequest(capability="cleaning.floor") for _ in range(7)]
+        )
+
+        assert [r.index for r in results] == list(range(7))
+        assert [r.success for r in results] == [True] * 6 + [False]
+        assert [r.assignment.agent_id for r in results[:3]] == ["agent-1", "agent-1", "agent-2"]
+        assert results[6].error["code"] == "NO_AVAILABLE_AGENT"
+        assert all(a.current_load == 3 for a in self.dispatcher._agents.values())
+
+    async def test_batch_partial_delivery_failure(self):
+        """测试单项下发失败只影响该项"""
+        async def flaky_deliver(assignment, parameters):
+            if parameters.get("fail"):
+                raise RuntimeError("robot rejected")
+
+        self.dispatcher._deliver_task = flaky_deliver
+        results = await self.dispatcher.dispatch_tasks([
+            DispatchRequest(capability="cleaning.floor", parameters={"fail": True}),
+            DispatchRequest(capability="cleaning.floor", prefer_agent_id="agent-0"),
+            DispatchRequest(capability="patrol.night"),
+        ])
+
+        assert results[0].error["code"] == "TASK_DISPATCH_FAILED"
+        assert results[1].assignment.agent_id == "agent-0"
+        assert results[2].error["code"] == "NO_AVAILABLE_AGENT"
+        assert sum(a.current_load for a in self.dispatcher._agents.values()) == 4
+        assert list(self.dispatcher._assignments) == [results[1].assignment.task_id]
+
+
+    async def test_batch_queue(self):
+        """测试批量分派中请求排队的任务暂无可用 Agent 时入队"""
+        results = await self.dispatcher.dispatch_tasks(
+            [DispatchRequest(capability="cleaning.floor") for _ in range(6)]
+            + [
+                DispatchRequest(capability="cleaning.floor", queue=True),
+                DispatchRequest(capability="cleaning.floor"),
+                DispatchRequest(capability="patrol.night", queue=True),
+            ]
+        )
+
+        assert [r.success for r in results] == [True] * 7 + [False, False]
+        queued = results[6].assignment
+        assert (queued.status, queued.agent_id) == ("queued", "")
+        assert results[7].error["code"] == results[8].error["code"] == "NO_AVAILABLE_AGENT"
+
+        self.dispatcher.complete_task(results[0].assignment.task_id)
+        await self.dispatcher.flush_background()
+        assert queued.status == "assigned"
+
+
+class TestAgentTaskIndex:
+    """Agent 执行中任务索引测试"""
+
+    def setup_method(self):
+        """测试前设置"""
+        self.dispatcher = TaskDispatcher()
+        for agent_id, load in [("robot-a", 0), ("robot-b", 1)]:
+            self.dispatcher.register_agent(
+                AgentInfo(
+                    agent_id=agent_id,
+                    agent_type="robot",
+                    capabilities=["cleaning.*"],
+                    status="ready",
+                    current_load=load,
+                    max_load=3,
+                )
+            )
+
+    async def test_index_follows_dispatch_and_complete(self):
+        """测试索引随分派与完成更新"""
+        first = await self.dispatcher.dispatch_task("cleaning.floor", {}, prefer_agent_id="robot-a")
+        second = await self.dispatcher.dispatch_task("cleaning.floor", {}, prefer_agent_id="robot-a")
+        self.dispatcher.complete_task(first.task_id)
+
+        assert self.dispatcher.get_agent_tasks("robot-a") == [second]
+        self.dispatcher.complete_task(second.task_id)
+        assert self.dispatcher.get_agent_tasks("robot-a") == []
+        assert "robot-a" not in self.dispatcher._agent_tasks
+
+    async def test_unregister_requeues_in_flight_tasks(self):
+        """测试注销 Agent 时执行中的任务重新分派"""
+        task = await self.dispatcher.dispatch_task(
+            "cleaning.floor", {"zone": "lobby"}, prefer_agent_id="robot-a", priority=1
+        )
+
+        orphaned = self.dispatcher.unregister_agent("robot-a")
+        await self.dispatcher.flush_background()
+
+        assert orphaned == [task]
+        assert task.agent_id == "robot-b"
+        assert task.status == "assigned"
+        assert task.parameters == {"zone": "lobby"}
+        assert self.dispatcher.get_agent_tasks("robot-b") == [task]
+        assert self.dispatcher._agents["robot-b"].current_load == 2
+
+    async def test_unregister_without_agents_fails_tasks(self):
+        """测试无可接手 Agent 或不重新分派时任务标记为失败"""
+        first = await self.dispatcher.dispatch_task("cleaning.floor", {}, prefer_agent_id="robot-a")
+        second = await self.dispatcher.dispatch_task("cleaning.floor", {}, prefer_agent_id="robot-b")
+
+        self.dispatcher.unregister_agent("robot-a", requeue=False)
+        self.dispatcher.unregister_agent("robot-b")
+        await self.dispatcher.flush_background()
+
+        assert first.status == "failed"
+        assert second.status == "failed"
+        assert self.dispatcher._assignments == {}
+        assert self.dispatcher.get_stats()["tasks"]["failed"] == 2
+
+
+class TestDispatchQueue:
+    """分派等待队列测试"""
+
+    def setup_method(self):
+        """测试前设置"""
+        self.dispatcher = TaskDispatcher(config=DispatcherConfig(queue_max_depth=3))
+        self.dispatcher.register_agent(
+            AgentInfo(
+                agent_id="robot-a",
+                agent_type="robot",
+                capabilities=["cleaning.*"],
+                status="ready",
+                max_load=1,
+            )
+        )
+
+    async def test_queue_drains_by_priority_then_age(self):
+        """测试 Agent 空闲时按优先级、入队顺序分派"""
+        running = await self.dispatcher.dispatch_task("cleaning.floor", {}, queue=True)
+        low = await self.dispatcher.dispatch_task("cleaning.floor", {}, priority=5, queue=True)
+        first = await self.dispatcher.dispatch_task("cleaning.floor", {}, priority=1, queue=True)
+        second = await self.dispatcher.dispatch_task("cleaning.glass", {}, priority=1, queue=True)
+
+        assert running.status == "assigned"
+        assert [low.status, first.status, second.status] == ["queued"] * 3
+        assert self.dispatcher.get_stats()["tasks"]["queued"] == 3
+
+        for expected in (first, second, low):
+            self.dispatcher.complete_task(self.dispatcher.get_agent_tasks("robot-a")[0].task_id)
+            await self.dispatcher.flush_background()
+            assert expected.status == "assigned"
+            assert expected.agent_id == "robot-a"
+            assert self.dispatcher.get_agent_tasks("robot-a") == [expected]
+
+    async def test_queue_full_and_unknown_capability(self):
+        """测试队列满时拒绝入队，无匹配 Agent 时不排队"""
+        await self.dispatcher.dispatch_task("cleaning.floor", {})
+        for _ in range(3):
+            await self.dispatcher.dispatch_task("cleaning.floor", {}, queue=True)
+
+        with pytest.raises(DispatchQueueFullError):
+            await self.dispatcher.dispatch_task("cleaning.floor", {}, queue=True)
+        with pytest.raises(NoAvailableAgentError):
+            await self.dispatcher.dispatch_task("patrol.night", {}, queue=True)
+        with pytest.raises(NoAvailableAgentError):
+            await self.dispatcher.dispatch_task("cleaning.floor", {})
+
+    async def test_status_change_drains_and_cancel_removes(self):
+        """测试 Agent 恢复 ready 时分派，排队中的任务可直接结束"""
+        self.dispatcher.update_agent_status("robot-a", "busy")
+        cancelled = await self.dispatcher.dispatch_task("cleaning.floor", {}, queue=True)
+        waiting = await self.dispatcher.dispatch_task("cleaning.floor", {}, queue=True)
+
+        self.dispatcher.complete_task(cancelled.task_id, success=False)
+        self.dispatcher.update_agent_status("robot-a", "ready")
+        await self.dispatcher.flush_background()
+
+        assert cancelled.status == "failed"
+        assert self.dispatcher.get_assignment(cancelled.task_id) is cancelled
+        assert waiting.status == "assigned"
+        assert self.dispatcher._agents["robot-a"].current_load == 1
+
+
+class TestAgentScoring:
+    """位置感知评分测试"""
+
+    def _robot(self, agent_id: str, load: int = 0, **metadata) -> AgentInfo:
+        return AgentInfo(
+            agent_id=agent_id,
+            agent_type="robot",
+            capabilities=["delivery.*"],
+            status="ready",
+            current_load=load,
+            metadata=metadata,
+        )
+
+    def test_context_from_parameters(self):
+        """测试从任务参数解析位置"""
+        assert parse_floor("building-a-12") == 12
+        assert parse_floor("lobby") is None
+        assert parse_floor("building-a--1") == -1
+        assert parse_floor(-2.0) == -2
+        assert parse_floor(float("nan")) is None
+        assert parse_floor(float("inf")) is None
+        assert ScoringContext.from_parameters({"floor_id": "tower-3"}).floor == 3
+        context = ScoringContext.from_parameters({"position": {"x": 1, "y": 2}})
+        assert context.position == (1.0, 2.0)
+        assert not ScoringContext.from_parameters({"zone": "a"}).has_location
+
+    async def test_dispatch_prefers_same_floor(self):
+        """测试带楼层的任务优先同层 Agent，不带位置时仍按负载选择"""
+        dispatcher = TaskDispatcher(scorer=LocationScorer())
+        dispatcher.register_agent(self._robot("robot-far", floor=1, battery_level=100))
+        dispatcher.register_agent(self._robot("robot-near", load=2, floor=8, battery_level=90))
+        dispatcher.register_agent(self._robot("robot-low", floor=8, battery_level=5))
+
+        located = await dispatcher.dispatch_task("delivery.package", {"floor": 8})
+        unlocated = await dispatcher.dispatch_task("delivery.package", {})
+
+        assert located.agent_id == "robot-near"
+        assert unlocated.agent_id in ("robot-far", "robot-low")
+
+    async def test_invalid_battery_ignored(self):
+        """测试心跳上报的非数值电量不影响分派"""
+        dispatcher = TaskDispatcher(scorer=LocationScorer())
+        dispatcher.register_agent(self._robot("robot-odd", floor=8, battery_level="high"))
+        dispatcher.register_agent(self._robot("robot-low", floor=8, battery_level="5"))
+
+        assignment = await dispatcher.dispatch_task("delivery.package", {"floor": 8})
+        assert assignment.agent_id == "robot-odd"
+        assert parse_battery("87.5") == 87.5
+        assert parse_battery(True) is None
+
+    async def test_custom_scorer(self):
+        """测试自定义评分函数"""
+        dispatcher = TaskDispatcher(
+            scorer=FunctionScorer(lambda agent, context: -agent.metadata.get("speed", 0))
+        )
+        dispatcher.register_agent(self._robot("robot-slow", speed=1))
+        dispatcher.register_agent(self._robot("robot-fast", speed=3))
+
+        assignment = await dispatcher.dispatch_task("delivery.package", {"floor": 2})
+        assert assignment.agent_id == "robot-fast"
+
+    def test_vectorized_matches_python(self):
+        """测试向量化评分与纯 Python 评分一致"""
+        pytest.importorskip("numpy")
+        from src.services.agent_scoring import VectorizedLocationScorer
+
+        rng = random.Random(7)
+        agents = [
+            self._robot(
+                f"robot-{i}",
+                load=rng.randint(0, 4),
+                **{
+                    k: v
+                    for k, v in {
+                        "floor": rng.choice([None, rng.randint(1, 20)]),
+                        "battery_level": rng.choice([None, rng.uniform(0, 100)]),
+                        "position": rng.choice([None, [rng.uniform(0, 80), rng.uniform(0, 40)]]),
+                    }.items()
+                    if v is not None
+                },
+            )
+            for i in range(200)
+        ]
+        vectorized = VectorizedLocationScorer(capacity=16)
+        for agent in agents:
+            vectorized.update(agent)
+        vectorized.remove("robot-3")
+        agents.pop(3)
+        agents[10].current_load = 5
+        vectorized.update_load(agents[10])
+
+        python = LocationScorer()
+        for context in [
+            ScoringContext(floor=7),
+            ScoringContext(position=(10.0, 5.0)),
+            ScoringContext(floor=3, position=(40.0, 20.0)),
+        ]:
+            expected = python.scores(agents, context)
+            actual = vectorized.scores(agents, context)
+            assert list(actual) == pytest.approx(expected)
+            assert vectorized.select(agents, context) is python.select(agents, context)
+
+
+class TestAgentLeases:
+    """心跳租约测试"""
+
+    def test_lease_table_expiry_and_renewal(self):
+        """测试续约推迟过期，过期只报告一次"""
+        now = [0.0]
+        leases = LeaseTable(clock=lambda: now[0])
+        leases.renew("robot-a", 10)
+        leases.renew("robot-b", 10)
+        leases.renew("robot-c", 30)
+        leases.remove("robot-c")
+
+        now[0] = 8
+        leases.renew("robot-a", 10)
+
+        assert leases.expire(now=12) == ["robot-b"]
+        assert leases.expire(now=12) == []
+        assert leases.expire(now=40) == ["robot-a"]
+        assert len(leases) == 0
+
+    def test_lease_table_compacts_renewals(self):
+        """测试频繁续约时堆大小有界"""
+        leases = LeaseTable()
+        for _ in range(100):
+            for i in range(50):
+                leases.renew(f"robot-{i}", 60)
+        assert len(leases._heap) <= 2 * 50 + 64 + 1
+
+    async def test_expired_agent_goes_offline_and_tasks_requeue(self):
+        """测试租约过期的 Agent 离线，任务转给其他 Agent，心跳后恢复"""
+        dispatcher = TaskDispatcher()
+        for agent_id, ttl in [("robot-a", 30), ("robot-b", None)]:
+            dispatcher.register_agent(
+                AgentInfo(
+                    agent_id=agent_id,
+                    agent_type="robot",
+                    capabilities=["cleaning.*"],
+                    status="ready",
+                ),
+                lease_ttl=ttl,
+            )
+        task = await dispatcher.dispatch_task("cleaning.floor", {}, prefer_agent_id="robot-a")
+
+        assert dispatcher.expire_leases(now=time.monotonic() + 60) == ["robot-a"]
+        await dispatcher.flush_background()
+
+        assert dispatcher._agents["robot-a"].status == "offline"
+        assert dispatcher._agents["robot-a"].current_load == 0
+        assert task.agent_id == "robot-b"
+        assert dispatcher.get_agent_tasks("robot-b") == [task]
+
+        assert dispatcher.heartbeat("robot-a", {"battery_level": 80})
+        assert dispatcher._agents["robot-a"].status == "ready"
+        assert dispatcher._agents["robot-a"].metadata["battery_level"] == 80
+        assert not dispatcher.heartbeat("robot-missing")
+
+
+class TestDispatchStats:
+    """增量统计测试"""
+
+    def setup_method(self):
+        """测试前设置"""
+        self.dispatcher = TaskDispatcher()
+        for agent_id, agent_type, status in [
+            ("robot-a", "robot", "ready"),
+            ("robot-b", "robot", "busy"),
+            ("door-a", "facility", "ready"),
+        ]:
+            self.dispatcher.register_agent(
+                AgentInfo(
+                    agent_id=agent_id,
+                    agent_type=agent_type,
+                    capabilities=["cleaning.*", "door.*"],
+                    status=status,
+                )
+            )
+
+    def _scan(self) -> dict:
+        """全量扫描得到的统计，用于与增量计数对比"""
+        agents = list(self.dispatcher._agents.values())
+        return {
+            "total": len(agents),
+            "ready": sum(1 for a in agents if a.status == "ready"),
+            "busy": sum(1 for a in agents if a.status == "busy"),
+            "offline": sum(1 for a in agents if a.status == "offline"),
+        }
+
+    async def test_counters_follow_transitions(self):
+        """测试计数器随注册、状态变化、分派、完成增量更新"""
+        first = await self.dispatcher.dispatch_task("cleaning.floor", {}, agent_type="robot")
+        second = await self.dispatcher.dispatch_task("door.open", {}, agent_type="facility")
+        await self.dispatcher.dispatch_task("cleaning.floor", {}, agent_type="robot")
+        self.dispatcher.complete_task(first.task_id)
+        self.dispatcher.complete_task(first.task_id)
+        self.dispatcher.complete_task(second.task_id, success=False)
+
+        self.dispatcher.update_agent_status("robot-b", "offline")
+        self.dispatcher.unregister_agent("door-a")
+        self.dispatcher.register_agent(
+            AgentInfo(agent_id="robot-a", agent_type="robot", capabilities=[], status="busy")
+        )
+
+        stats = self.dispatcher.get_stats()
+        assert stats["agents"] == self._scan()
+        assert stats["tasks"] == {
+            "total": 3, "pending": 1, "accepted": 0, "completed": 1, "failed": 1, "queued": 0,
+        }
+
+    async def test_breakdown(self):
+        """测试按 Agent 类型、按能力的分项统计"""
+        task = await self.dispatcher.dispatch_task("door.open", {}, agent_type="facility")
+        await self.dispatcher.dispatch_task("cleaning.floor", {}, agent_type="robot")
+        self.dispatcher.complete_task(task.task_id)
+
+        stats = self.dispatcher.get_stats(breakdown=True)
+
+        assert stats["by_agent_type"]["robot"]["agents"]["busy"] == 1
+        assert stats["by_agent_type"]["facility"]["tasks"]["completed"] == 1
+        assert stats["by_capability"]["cleaning.floor"]["tasks"]["pending"] == 1
+        assert stats["by_capability"]["door.open"]["tasks"]["total"] == 1
+        assert "by_capability" not in self.dispatcher.get_stats()
+
+
+class TestAssignmentHistory:
+    """任务分配历史测试"""
+
+    def _assignment(self, task_id: str) -> TaskAssignment:
+        return TaskAssignment(
+            task_id=task_id,
+            agent_id="agent-r",
+            agent_type="robot",
+            capability="cleaning.floor",
+            assigned_at=datetime.now(timezone.utc),
+            status="completed",
+        )
+
+    def test_evicts_oldest_beyond_max_size(self):
+        """测试超出容量时淘汰最早结束的分配"""
+        history = AssignmentHistory(max_size=3)
+        for i in range(5):
+            history.add(self._assignment(f"task-{i}"))
+
+        assert len(history) == 3
+        assert history.get("task-1") is None
+        assert [a.task_id for a in history.values()] == ["task-2", "task-3", "task-4"]
+
+    def test_evicts_expired(self):
+        """测试超过保留时长的分配被淘汰"""
+        now = [0.0]
+        history = AssignmentHistory(ttl=10, clock=lambda: now[0])
+        history.add(self._assignment("task-old"))
+        now[0] = 5
+        history.add(self._assignment("task-new"))
+
+        now[0] = 12
+        assert history.get("task-old") is None
+        assert history.get("task-new") is not None
+        assert len(history) == 1
+
+    def test_unflushed_only_when_persisting(self):
+        """测试仅在开启持久化时记录待写分配"""
+        history = AssignmentHistory()
+        history.add(self._assignment("task-a"))
+        assert history.take_unflushed() == []
+
+        history = AssignmentHistory(persist=True)
+        history.add(self._assignment("task-a"))
+        history.add(self._assignment("task-b"))
+        pending = history.take_unflushed()
+        assert [a.task_id for a in pending] == ["task-a", "task-b"]
+        assert history.unflushed_count() == 0
+
+        history.add(self._assignment("task-c"))
+        history.restore_unflushed(pending)
+        assert [a.task_id for a in history.take_unflushed()] == ["task-a", "task-b", "task-c"]
+
+    async def test_dispatcher_moves_finished_out_of_hot_map(self):
+        """测试已结束的分配移出执行中映射且数量有界"""
+        dispatcher = TaskDispatcher(config=DispatcherConfig(history_max_size=2))
+        dispatcher.register_agent(
+            AgentInfo(
+                agent_id="agent-r",
+                agent_type="robot",
+                capabilities=["cleaning.*"],
+                status="ready",
+            )
+        )
+
+        task_ids = []
+        for _ in range(4):
+            assignment = await dispatcher.dispatch_task("cleaning.floor", {})
+            dispatcher.complete_task(assignment.task_id)
+            task_ids.append(assignment.task_id)
+        live = await dispatcher.dispatch_task("cleaning.floor", {})
+
+        assert list(dispatcher._assignments) == [live.task_id]
+        assert dispatcher.get_assignment(task_ids[-1]).finished_at is not None
+        assert dispatcher.get_assignment(task_ids[0]) is None
+        assert len(dispatcher._history) == 2
+
+
+class TestSharedDispatchStore:
+    """共享分派存储测试（两个 TaskDispatcher 模拟两个进程）"""
+
+    @pytest.fixture
+    async def dispatchers(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        from src.services.redis_store import RedisDispatchStore
+
+        server = fakeredis.FakeServer()
+        first, second = (
+            TaskDispatcher(
+                RedisDispatchStore(fakeredis.FakeAsyncRedis(server=server, decode_responses=True))
+            )
+            for _ in range(2)
+        )
+        first.register_agent(
+            AgentInfo(
+                agent_id="agent-r",
+                agent_type="robot",
+                capabilities=["cleaning.*"],
+                status="ready",
+                max_load=3,
+            )
+        )
+        await first.flush_background()
+        await second.sync_from_store()
+        yield first, second
+        await first.close()
+        await second.close()
+
+    async def test_registration_visible_after_sync(self, dispatchers):
+        """测试一个进程的注册对另一个进程可见"""
+        first, second = dispatchers
+
+        assert second._agents["agent-r"].capabilities == ["cleaning.*"]
+
+        first.update_agent_status("agent-r", "busy")
+        await first.flush_background()
+        await second.sync_from_store()
+        assert second.find_available_agents("cleaning.floor") == []
+
+    async def test_concurrent_dispatch_respects_shared_max_load(self, dispatchers):
+        """测试两个进程并发分派不超过共享上限"""
+        first, second = dispatchers
+
+        results = await asyncio.gather(
+            *[d.dispatch_task("cleaning.floor", {}) for d in (first, second) * 5],
+            return_exceptions=True,
+        )
+
+        assert sum(1 for r in results if isinstance(r, TaskAssignment)) == 3
+        agents, _ = await first._store.load_agents()
+        assert agents[0].current_load == 3
+
+    async def test_finish_from_other_process_releases_load(self, dispatchers):
+        """测试在另一个进程完成任务只释放一次负载"""
+        first, second = dispatchers
+
+        assignment = await first.dispatch_task("cleaning.floor", {})
+        assert (await second.lookup_assignment(assignment.task_id)).agent_id == "agent-r"
+
+        assert await second.finish_task(assignment.task_id)
+        assert await first.finish_task(assignment.task_id, success=False)
+
+        agents, _ = await first._store.load_agents()
+        assert agents[0].current_load == 0
+        stored = await second.lookup_assignment(assignment.task_id)
+        assert stored.status == "completed"
+        assert not await second.finish_task("missing-task")
+
+    async def test_heartbeat_metadata_survives_sync(self, dispatchers):
+        """测试心跳元数据写入共享存储，其他进程改动注册表后刷新不会丢失"""
+        first, second = dispatchers
+
+        assert first.heartbeat("agent-r", {"floor": 8, "battery_level": 90})
+        await first.flush_background()
+        second.heartbeat("agent-r", {"battery_level": 80})
+        second.update_agent_status("agent-r", "busy")
+        await second.flush_background()
+
+        await first.sync_from_store()
+        await second.sync_from_store()
+        for dispatcher in (first, second):
+            agent = dispatcher._agents["agent-r"]
+            assert agent.status == "busy"
+            assert agent.metadata == {"floor": 8, "battery_level": 80}
+
+    async def test_queue_drains_on_capacity_freed_elsewhere(self, dispatchers, monkeypatch):
+        """测试其他进程释放负载后，排队的任务在定期刷新时分派"""
+        first, second = dispatchers
+        monkeypatch.setattr(second._config, "queue_sync_interval_seconds", 0.01)
+
+        running = [await first.dispatch_task("cleaning.floor", {}) for _ in range(3)]
+        await second.sync_from_store()
+        queued = await second.dispatch_task("cleaning.floor", {}, queue=True)
+        assert queued.status == "queued"
+
+        assert await first.finish_task(running[0].task_id)
+        second.start_queue_monitor()
+        for _ in range(100):
+            if queued.status == "assigned":
+                break
+            await asyncio.sleep(0.01)
+        await second.flush_background()
+
+        assert (queued.status, queued.agent_id) == ("assigned", "agent-r")
+        agents, _ = await first._store.load_agents()
+        assert agents[0].current_load == 3
+
+    async def test_task_finished_by_other_process(self, dispatchers):
+        """测试其他进程结束的任务在分派进程中也按共享记录结束"""
+        first, second = dispatchers
+
+        assignment = await first.dispatch_task("cleaning.floor", {})
+        assert await second.finish_task(assignment.task_id, success=False)
+
+        stored = await first.lookup_assignment(assignment.task_id)
+        assert stored.status == "failed"
+        assert first.get_agent_tasks("agent-r") == []
+        assert first._agents["agent-r"].current_load == 0
+
+        # 在分派进程再次结束不改变共享记录的状态
+        other = await first.dispatch_task("cleaning.floor", {})
+        assert await second.finish_task(other.task_id)
+        assert await first.finish_task(other.task_id, success=False)
+        assert first.get_assignment(other.task_id).status == "completed"
+        assert first.get_agent_tasks("agent-r") == []
+
+    async def test_unregister_without_requeue_fails_shared_record(self, dispatchers):
+        """测试注销 Agent 且不重新分派时共享记录标记为失败；任务记录带过期时间"""
+        first, second = dispatchers
+
+        assignment = await first.dispatch_task("cleaning.floor", {})
+        key = first._store._task_key(assignment.task_id)
+        assert 0 < await first._store._redis.ttl(key) <= 7 * 86400
+
+        first.unregister_agent("agent-r", requeue=False)
+        await first.flush_background()
+
+        stored = await second.lookup_assignment(assignment.task_id)
+        assert stored.status == "failed"
+        assert 0 < await first._store._redis.ttl(key) <= 86400
+
+    async def test_agent_unregistered_by_other_process_dropped(self, dispatchers):
+        """测试其他进程注销的 Agent 在预留失败后从本地注册表移除"""
+        first, second = dispatchers
+
+        second.unregister_agent("agent-r")
+        await second.flush_background()
+
+        with pytest.raises(NoAvailableAgentError):
+            await first.dispatch_task("cleaning.floor", {})
+        assert "agent-r" not in first._agents
+
+    async def test_lease_shared_between_processes(self, dispatchers):
+        """测试心跳发往另一进程时租约不过期，真正过期后任一进程的心跳都能恢复"""
+        first, second = dispatchers
+        first.register_agent(
+            AgentInfo(
+                agent_id="agent-l",
+                agent_type="robot",
+                capabilities=["lease.*"],
+                status="ready",
+            ),
+            lease_ttl=30,
+        )
+        await first.flush_background()
+        await second.sync_from_store()
+
+        # 心跳只到达 second，first 的本地租约到期：以共享租约为准，不置为 offline
+        assert second.heartbeat("agent-l")
+        await second.flush_background()
+        assert first.expire_leases(now=time.monotonic() + 60) == ["agent-l"]
+        await first.flush_background()
+        assert first._agents["agent-l"].status == "ready"
+        assert "agent-l" in first._leases
+
+        # 共享租约也已过期：置为 offline，对所有进程可见，且不能再被预留
+        await first._store._redis.delete(first._store._lease_key("agent-l"))
+        first.expire_leases(now=time.monotonic() + 120)
+        await first.flush_background()
+        await second.sync_from_store()
+        assert second._agents["agent-l"].status == "offline"
+        assert not (await first._store.reserve("agent-l"))[0]
+
+        # 心跳发往 second 同样恢复为 ready
+        second.heartbeat("agent-l")
+        await second.flush_background()
+        assert second._agents["agent-l"].status == "ready"
+        await first.sync_from_store()
+        assert first._agents["agent-l"].status == "ready"
+        assert (await first._store.reserve("agent-l"))[0]
+
+
+class _FakeVisibility:
+    """按页返回工作流的假 Temporal 客户端"""
+
+    def __init__(self, count: int):
+        self.workflows = [
+            SimpleNamespace(
+                id=f"cleaning-{i:04d}",
+                workflow_type="RobotCleaningWorkflow",
+                typed_search_attributes=TypedSearchAttributes.empty,
+                status=None,
+                start_time=None,
+                close_time=None,
+            )
+            for i in range(count)
+        ]
+        self.requests = []
+
+    def list_workflows(self, query=None, page_size=1000, next_page_token=None):
+        return _FakeVisibilityIterator(self, query, page_size, next_page_token)
+
+
+class _FakeVisibilityIterator:
+    """模仿 WorkflowExecutionAsyncIterator：按令牌逐页读取"""
+
+    def __init__(self, visibility, query, page_size, next_page_token):
+        self._visibility = visibility
+        self._query = query
+        self._page_size = page_size
+        self.current_page = None
+        self.next_page_token = next_page_token
+
+    async def fetch_next_page(self):
+        token = self.next_page_token
+        self._visibility.requests.append((self._query, self._page_size, token))
+        start = int(token or b"0")
+        end = start + self._page_size
+        self.current_page = self._visibility.workflows[start:end]
+        self.next_page_token = str(end).encode() if end < len(self._visibility.workflows) else None
+
+    async def _iterate(self):
+        while True:
+            await self.fetch_next_page()
+            for workflow in self.current_page:
+                yield workflow
+            if self.next_page_token is None:
+                return
+
+    def __aiter__(self):
+        return self._iterate()
+
+
+class TestWorkflowListPagination:
+    """工作流列表分页测试"""
+
+    async def test_pages_follow_native_tokens(self):
+        """测试逐页读取，每页只请求一次"""
+        visibility = _FakeVisibility(5)
+        service = WorkflowService(visibility)
+        service._prefetch_pages = 0
+
+        seen = []
+        token = None
+        while True:
+            page = await service.list_workflows(page_size=2, next_page_token=token)
+            seen += [w.workflow_id for w in page.workflows]
+            token = page.next_page_token
+            if token is None:
+                break
+
+        assert seen == [f"cleaning-{i:04d}" for i in range(5)]
+        assert [r[2] for r in visibility.requests] == [None, b"2", b"4"]
+
+    async def test_cursor_is_stable_and_bound_to_filters(self):
+        """测试游标稳定且与过滤条件绑定"""
+        service = WorkflowService(_FakeVisibility(5))
+        service._prefetch_pages = 0
+
+        first = await service.list_workflows(workflow_type="cleaning", page_size=2)
+        again = await service.list_workflows(workflow_type="cleaning", page_size=2)
+        assert first.next_page_token == again.next_page_token
+
+        with pytest.raises(WorkflowValidationError):
+            await service.list_workflows(page_size=2, next_page_token=first.next_page_token)
+        with pytest.raises(WorkflowValidationError):
+            await service.list_workflows(page_size=2, next_page_token="not a cursor!")
+
+    async def test_prefetch_next_page(self):
+        """测试翻页时后台预取下一页，只读第一页时不预取"""
+        visibility = _FakeVisibility(7)
+        service = WorkflowService(visibility)
+        service._prefetch_pages = 1
+
+        first = await service.list_workflows(page_size=2)
+        await asyncio.sleep(0)
+        assert len(visibility.requests) == 1
+
+        second = await service.list_workflows(page_size=2, next_page_token=first.next_page_token)
+        assert [w.workflow_id for w in second.workflows] == ["cleaning-0002", "cleaning-0003"]
+        await asyncio.sleep(0)
+        assert [r[2] for r in visibility.requests] == [None, b"2", b"4"]
+
+        # 第三页取自预取结果，只新增了第四页的预取
+        third = await service.list_workflows(page_size=2, next_page_token=second.next_page_token)
+        assert [w.workflow_id for w in third.workflows] == ["cleaning-0004", "cleaning-0005"]
+        await asyncio.sleep(0)
+        assert [r[2] for r in visibility.requests] == [None, b"2", b"4", b"6"]
+
+    async def test_type_filter_uses_search_attribute(self):
+        """测试按类型过滤走搜索属性"""
+        visibility = _FakeVisibility(1)
+        service = WorkflowService(visibility)
+        service._prefetch_pages = 0
+
+        await service.list_workflows(workflow_type="delivery", status="Running")
+        assert visibility.requests[0][0] == (
+            'EcisWorkflowType = "delivery" AND ExecutionStatus = "Running"'
+        )
+
+        with pytest.raises(WorkflowValidationError):
+            await service.list_workflows(workflow_type="nonexistent")
+        with pytest.raises(WorkflowValidationError):
+            service.iter_workflows(workflow_type="nonexistent")
+
+    async def test_iter_workflows_reads_lazily(self):
+        """测试流式遍历按需逐页读取"""
+        visibility = _FakeVisibility(5)
+        service = WorkflowService(visibility)
+
+        stream = service.iter_workflows(page_size=2)
+        first = await stream.__anext__()
+        assert first.workflow_id == "cleaning-0000"
+        assert len(visibility.requests) == 1
+
+        rest = [w.workflow_id async for w in stream]
+        assert rest == [f"cleaning-{i:04d}" for i in range(1, 5)]
+        assert [r[2] for r in visibility.requests] == [None, b"2", b"4"]
+
+
+class _FakeStarter:
+    """记录 start_workflow 调用与并发峰值的假 Temporal 客户端"""
+
+    def __init__(self, fail_ids=()):
+        self.started = {}
+        self.active = 0
+        self.peak = 0
+        self.fail_ids = set(fail_ids)
+
+    async def start_workflow(self, run, arg, *, id, task_queue, **kwargs):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(0.001)
+            if id in self.fail_ids:
+                raise RuntimeError("namespace unavailable")
+            self.started.setdefault(id, (arg, kwargs))
+        finally:
+            self.active -= 1
+
+
+class TestBulkWorkflowStart:
+    """批量启动工作流测试"""
+
+    async def test_bounded_concurrency(self):
+        """测试并发数受限且逐项返回结果"""
+        starter = _FakeStarter(fail_ids={"cleaning-b1-3"})
+        service = WorkflowService(starter)
+        requests = [WorkflowStartRequest(input={"floor_id": f"floor-{i}"}) for i in range(20)]
+
+        results = await service.start_workflows("cleaning", requests, batch_id="b1", concurrency=4)
+
+        assert starter.peak == 4
+        assert [r.index for r in results] == list(range(20))
+        assert [r.workflow_id for r in results][:2] == ["cleaning-b1-0", "cleaning-b1-1"]
+        assert [r.success for r in results].count(False) == 1
+        assert results[3].error["code"] == "WORKFLOW_START_FAILED"
+
+        arg, kwargs = starter.started["cleaning-b1-0"]
+        assert arg.floor_id == "floor-0"
+        assert kwargs["search_attributes"].get(WORKFLOW_TYPE_ATTRIBUTE) == "cleaning"
+
+    async def test_cleaning_completion_mode_default(self, monkeypatch):
+        """测试批量启动的清洁工作流默认使用配置的完成方式，请求项可单独指定"""
+        starter = _FakeStarter()
+        service = WorkflowService(starter)
+        monkeypatch.setattr(service._config.worker, "robot_completion_async", True)
+
+        await service.start_workflows(
+            "cleaning",
+            [
+                WorkflowStartRequest(input={"floor_id": "floor-0"}),
+                WorkflowStartRequest(
+                    input={"floor_id": "floor-1", "event_driven_completion": False}
+                ),
+            ],
+            batch_id="mode",
+        )
+
+        assert starter.started["cleaning-mode-0"][0].event_driven_completion
+        assert not starter.started["cleaning-mode-1"][0].event_driven_completion
+
+    async def test_invalid_items(self):
+        """测试输入错误只影响单项，不支持的类型整体拒绝"""
+        service = WorkflowService(_FakeStarter())
+        results = await service.start_workflows(
+            "delivery",
+            [
+                WorkflowStartRequest(input={"bad_field": 1}),
+                WorkflowStartRequest(
+                    input={
+                        "pickup_location": "a",
+                        "delivery_location": "b",
+                        "item_description": "c",
+                        "recipient_id": "r",
+                        "sender_id": "s",
+                    },
+                    workflow_id="delivery-fixed",
+                ),
+            ],
+        )
+        assert results[0].error["code"] == "WORKFLOW_VALIDATION_FAILED"
+        assert results[1].success and results[1].workflow_id == "delivery-fixed"
+
+        with pytest.raises(WorkflowValidationError):
+            await service.start_workflows("multi_stage_approval", [WorkflowStartRequest()])
+
+
+class _FakeHandles:
+    """记录信号与取消的假 Temporal 客户端"""
+
+    def __init__(self, running=(), missing=()):
+        self.running = list(running)
+        self.missing = set(missing)
+        self.signals = []
+        self.cancelled = []
+        self.list_queries = []
+
+    def get_workflow_handle(self, workflow_id):
+        client = self
+
+        class Handle:
+            async def signal(self, signal, *args, **kwargs):
+                if workflow_id in client.missing:
+                    raise RuntimeError("workflow not found")
+                client.signals.append((workflow_id, signal, kwargs.get("args")))
+
+            async def cancel(self):
+                if workflow_id in client.missing:
+                    raise RuntimeError("workflow not found")
+                client.cancelled.append(workflow_id)
+
+        return Handle()
+
+    async def _iterate(self, limit):
+        for workflow_id in self.running[:limit]:
+            yield SimpleNamespace(id=workflow_id)
+
+    def list_workflows(self, query=None, limit=None, **kwargs):
+        self.list_queries.append(query)
+        return self._iterate(limit)
+
+
+class TestBatchWorkflowOperations:
+    """批量信号 / 取消测试"""
+
+    async def test_cancel_by_query(self):
+        """测试按查询批量取消"""
+        client = _FakeHandles(running=[f"delivery-{i}" for i in range(5)], missing={"delivery-2"})
+        service = WorkflowService(client)
+
+        query = 'EcisWorkflowType = "delivery" AND ExecutionStatus = "Running"'
+        result = await service.cancel_workflows(query=query, concurrency=2)
+
+        assert client.list_queries == [query]
+        assert (result.matched, result.succeeded, result.failed) == (5, 4, 1)
+        assert sorted(client.cancelled) == ["delivery-0", "delivery-1", "delivery-3", "delivery-4"]
+        failed = [r for r in result.results if not r.success]
+        assert failed[0].workflow_id == "delivery-2"
+        assert failed[0].error["code"] == "WORKFLOW_NOT_FOUND"
+
+    async def test_approve_by_ids(self):
+        """测试按 ID 批量审批（重复 ID 只处理一次）"""
+        client = _FakeHandles()
+        service = WorkflowService(client)
+
+        result = await service.signal_workflows(
+            "approve", ["ops", "routine", {}], workflow_ids=["approval-1", "approval-2", "approval-1"]
+        )
+
+        assert result.succeeded == 2
+        assert [s[0] for s in client.signals] == ["approval-1", "approval-2"]
+        assert client.signals[0][2] == ["ops", "routine", {}]
+
+    async def test_requests_spread_over_pool(self, monkeypatch):
+        """测试服务单例每次调用从客户端池轮询取连接，连接池关闭后重新连接"""
+        from temporalio.client import Client
+
+        from src.core.config import TemporalConfig
+        from src.core.temporal_client import TemporalClientPool
+        from src.services import workflow_service
+
+        clients = []
+
+        async def fake_connect(address, namespace="default"):
+            clients.append(_FakeHandles())
+            return clients[-1]
+
+        monkeypatch.setattr(Client, "connect", fake_connect)
+        pool = TemporalClientPool(TemporalConfig(client_pool_size=2))
+        monkeypatch.setattr(workflow_service, "get_temporal_pool", lambda: pool)
+        monkeypatch.setattr(workflow_service, "_workflow_service", None)
+
+        service = await workflow_service.get_workflow_service()
+        await service.signal_workflows("approve", [], workflow_ids=["a-1", "a-2", "a-3", "a-4"])
+        assert [len(c.signals) for c in clients] == [2, 2]
+
+        await pool.close()
+        assert await workflow_service.get_workflow_service() is service
+        await service.cancel_workflow("a-1")
+        assert len(clients) == 4
+
+    async def test_target_validation(self):
+        """测试必须且只能指定 ID 列表或查询之一"""
+        service = WorkflowService(_FakeHandles())
+        with pytest.raises(WorkflowValidationError):
+            await service.cancel_workflows()
+        with pytest.raises(WorkflowValidationError):
+            await service.cancel_workflows(workflow_ids=["a"], query="ExecutionStatus = 'Running'")
+
+
+class TestWorkflowReadCache:
+    """工作流读缓存测试"""
+
+    @pytest.fixture
+    def clock(self):
+        now = [0.0]
+        return now
+
+    def _loader(self, calls, gate=None):
+        async def load():
+            calls.append(1)
+            if gate is not None:
+                await gate.wait()
+            return {"status": "pending", "call": len(calls)}
+
+        return load
+
+    async def test_concurrent_reads_coalesce(self, clock):
+        """测试并发读取只调用一次"""
+        cache = WorkflowReadCache(0.5, clock=lambda: clock[0])
+        calls, gate = [], asyncio.Event()
+
+        readers = [
+            asyncio.create_task(cache.get("wf-1", "query:get_status", self._loader(calls, gate)))
+            for _ in range(10)
+        ]
+        await asyncio.sleep(0)
+        gate.set()
+        results = await asyncio.gather(*readers)
+
+        assert len(calls) == 1
+        assert all(result["call"] == 1 for result in results)
+
+    async def test_ttl_expiry(self, clock):
+        """测试过期后重新读取"""
+        cache = WorkflowReadCache(0.5, clock=lambda: clock[0])
+        calls = []
+
+        await cache.get("wf-1", "describe", self._loader(calls))
+        clock[0] = 0.4
+        await cache.get("wf-1", "describe", self._loader(calls))
+        assert len(calls) == 1
+
+        clock[0] = 0.6
+        result = await cache.get("wf-1", "describe", self._loader(calls))
+        assert result["call"] == 2
+
+    async def test_invalidate_discards_inflight(self, clock):
+        """测试失效后进行中的读取结果不写入缓存"""
+        cache = WorkflowReadCache(0.5, clock=lambda: clock[0])
+        calls, gate = [], asyncio.Event()
+
+        reader = asyncio.create_task(cache.get("wf-1", "describe", self._loader(calls, gate)))
+        await asyncio.sleep(0)
+        cache.invalidate("wf-1")
+        gate.set()
+        assert (await reader)["call"] == 1
+        assert len(cache) == 0
+
+        await cache.get("wf-1", "describe", self._loader(calls))
+        assert len(calls) == 2
+
+    async def test_errors_not_cached(self, clock):
+        """测试读取失败不缓存"""
+        cache = WorkflowReadCache(0.5, clock=lambda: clock[0])
+
+        async def fail():
+            raise RuntimeError("workflow not found")
+
+        with pytest.raises(RuntimeError):
+            await cache.get("wf-1", "describe", fail)
+        assert len(cache) == 0
+
+    async def test_disabled(self, clock):
+        """测试 TTL 为 0 时不缓存"""
+        cache = WorkflowReadCache(0, clock=lambda: clock[0])
+        calls = []
+        await cache.get("wf-1", "describe", self._loader(calls))
+        await cache.get("wf-1", "describe", self._loader(calls))
+        assert len(calls) == 2
+
+
+class TestWorkflowEventHub:
+    """工作流进度推送测试"""
+
+    def _poller(self, states):
+        """依次返回 states 中的进度，之后保持最后一个"""
+        calls = []
+
+        async def poll():
+            calls.append(1)
+            return states[min(len(calls), len(states)) - 1]
+
+        return poll, calls
+
+    async def test_shared_poller_pushes_changes_only(self):
+        """测试多个订阅者共用一个轮询，且只推送变化"""
+        hub = WorkflowEventHub(poll_interval=0.001)
+        states = [
+            WorkflowProgress("RUNNING", {"progress": 10}),
+            WorkflowProgress("RUNNING", {"progress": 10}),
+            WorkflowProgress("RUNNING", {"progress": 50}),
+            WorkflowProgress("COMPLETED", closed=True),
+        ]
+        poll, calls = self._poller(states)
+
+        subscriptions = [hub.subscribe("cleaning-1", poll) for _ in range(100)]
+        received = await asyncio.gather(*(self._collect(sub) for sub in subscriptions))
+
+        assert len(calls) == 4
+        for events in received:
+            assert events == [
+                ("progress", {"progress": 10}),
+                ("progress", {"progress": 50}),
+                ("closed", {}),
+            ]
+        assert hub.subscriber_count("cleaning-1") == 0
+
+    async def _collect(self, subscription):
+        async with subscription:
+            return [(event.event, event.data["details"]) async for event in subscription]
+
+    async def test_late_subscriber_gets_current_state(self):
+        """测试后加入的订阅者立即收到当前状态"""
+        hub = WorkflowEventHub(poll_interval=60)
+        poll, calls = self._poller([WorkflowProgress("RUNNING", {"progress": 30})])
+
+        first = hub.subscribe("delivery-1", poll)
+        assert (await first.next_event()).data["details"] == {"progress": 30}
+
+        second = hub.subscribe("delivery-1", poll)
+        assert (await second.next_event(timeout=1)).data["details"] == {"progress": 30}
+        assert len(calls) == 1
+
+        first.close()
+        second.close()
+        assert hub.subscriber_count("delivery-1") == 0
+
+    async def test_poll_error_ends_subscription(self):
+        """测试轮询失败推送 error 后结束"""
+        hub = WorkflowEventHub(poll_interval=0.001)
+
+        async def poll():
+            raise RuntimeError("workflow not found")
+
+        events = await self._collect_raw(hub.subscribe("missing", poll))
+        assert [event.event for event in events] == ["error"]
+
+    async def _collect_raw(self, subscription):
+        async with subscription:
+            return [event async for event in subscription]
+
+
+class TestWorkflowRegistry:
+    """工作流类型注册表测试"""
+
+    def test_covers_all_workflows(self):
+        """测试注册表覆盖 Worker 注册的全部工作流"""
+        from src.workers.main_worker import WORKFLOWS
+
+        import src.workflows as workflows
+
+        defined = {
+            cls
+            for cls in vars(workflows).values()
+            if isinstance(cls, type) and hasattr(cls, "__temporal_workflow_definition")
+        }
+        assert set(WORKFLOWS) == defined
+        assert set(workflow_registry.workflow_classes()) == defined
+
+    def test_classify(self):
+        """测试类型识别优先级：搜索属性 > 工作流类型名 > ID 前缀"""
+        tagged = workflow_registry.search_attributes("delivery")
+        assert tagged.get(WORKFLOW_TYPE_ATTRIBUTE) == "delivery"
+
+        assert workflow_registry.classify("cleaning-1", "ApprovalWorkflow", tagged) == "delivery"
+        assert workflow_registry.classify("wf-1", "ScheduledPatrolWorkflow") == "scheduled_patrol"
+        assert workflow_registry.classify("approval-1") == "approval"
+        assert workflow_registry.classify("wf-1", "SomethingElse") == "unknown"
+
+
+def _crashing_worker(index, heartbeat):
+    """立即异常退出的 Worker"""
+    os._exit(3)
+
+
+def _misconfigured_worker(index, heartbeat):
+    """因配置错误退出的 Worker"""
+    os._exit(EXIT_CONFIG_ERROR)
+
+
+def _draining_worker(index, heartbeat):
+    """持续写心跳，收到 SIGTERM 后正常退出的 Worker"""
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.append(signum))
+    while not stopping:
+        heartbeat.value = time.time()
+        time.sleep(0.01)
+
+
+def _hung_worker(index, heartbeat):
+    """不写心跳的 Worker"""
+    heartbeat.value = 0.0
+    time.sleep(30)
+
+
+def _wait_until(condition, timeout=5.0, step=None):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        if step is not None:
+            step()
+        time.sleep(0.02)
+
+
+class TestWorkerSupervisor:
+    """Worker 多进程监管测试（fork 启动以使用本模块中的测试入口）"""
+
+    def test_drain_on_shutdown(self):
+        """测试关闭时子进程收到 SIGTERM 并正常退出"""
+        supervisor = WorkerSupervisor(_draining_worker, 3, start_method="fork")
+        supervisor.start()
+        try:
+            assert supervisor.alive == 3
+            assert len(set(supervisor.pids())) == 3
+            # 等待子进程装好 SIGTERM 处理函数（开始写心跳）
+            _wait_until(
+                lambda: all(s.heartbeat.value > s.started_at for s in supervisor._slots)
+            )
+            supervisor.check()
+            assert supervisor.restarts == 0
+        finally:
+            assert supervisor.shutdown() == 0
+        assert supervisor.alive == 0
+
+    def test_restart_crashed_process_with_backoff(self):
+        """测试子进程退出后按退避重启"""
+        supervisor = WorkerSupervisor(
+            _crashing_worker,
+            1,
+            restart_backoff_seconds=0.05,
+            restart_backoff_max_seconds=10.0,
+            start_method="fork",
+        )
+        supervisor.start()
+        try:
+            _wait_until(lambda: supervisor.restarts >= 2, step=supervisor.check)
+            slot = supervisor._slots[0]
+            assert slot.backoff >= 0.1
+        finally:
+            assert supervisor.shutdown() == 1
+
+    def test_restart_on_missed_heartbeat(self):
+        """测试心跳超时的子进程被终止并重启"""
+        supervisor = WorkerSupervisor(
+            _hung_worker,
+            1,
+            heartbeat_timeout_seconds=0.1,
+            restart_backoff_seconds=0.01,
+            start_method="fork",
+        )
+        supervisor.start()
+        try:
+            first = supervisor.pids()[0]
+            _wait_until(
+                lambda: supervisor.restarts >= 1 and supervisor.pids()[0] not in (None, first),
+                step=supervisor.check,
+            )
+        finally:
+            supervisor.shutdown()
+        assert supervisor.alive == 0
+
+    def test_config_error_stops_supervisor(self):
+        """测试子进程因配置错误退出时不再重启，监管进程停止"""
+        supervisor = WorkerSupervisor(
+            _misconfigured_worker, 2, restart_backoff_seconds=0.01, start_method="fork"
+        )
+        supervisor.start()
+        try:
+            _wait_until(lambda: supervisor._stopping, step=supervisor.check)
+            assert supervisor.restarts == 0
+        finally:
+            assert supervisor.shutdown() == 1
+
+    def test_rejects_zero_processes(self):
+        """测试进程数必须为正"""
+        with pytest.raises(ValueError):
+            WorkerSupervisor(_draining_worker, 0)
+
+
+class TestWorkerTuning:
+    """Worker 并发调优测试"""
+
+    async def test_slot_limit_blocks_until_release(self):
+        """测试槽位用尽时等待，释放后唤醒"""
+        supplier = AdaptiveSlotSupplier(1, 4, target_queue_latency=0.5, initial=2)
+        permits = [await supplier.reserve_slot(None) for _ in range(2)]
+        assert supplier.try_reserve_slot(None) is None
+
+        waiting = asyncio.create_task(supplier.reserve_slot(None))
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+
+        # release_slot 由 SDK 核心线程调用
+        release = SimpleNamespace(slot_info=None, permit=permits[0])
+        await asyncio.to_thread(supplier.release_slot, release)
+        await asyncio.wait_for(waiting, 1.0)
+
+    async def test_cancelled_waiter_passes_wakeup(self):
+        """测试已唤醒但被取消的等待者把槽位让给下一个"""
+        supplier = AdaptiveSlotSupplier(1, 1, target_queue_latency=0.5)
+        permit = await supplier.reserve_slot(None)
+        first = asyncio.create_task(supplier.reserve_slot(None))
+        second = asyncio.create_task(supplier.reserve_slot(None))
+        await asyncio.sleep(0.01)
+
+        supplier.release_slot(SimpleNamespace(slot_info=None, permit=permit))
+        first.cancel()
+        await asyncio.wait_for(second, 1.0)
+        assert first.cancelled()
+
+    def test_adjust_grows_when_saturated_and_queueing(self):
+        """测试排队延迟高且槽位饱和时扩大上限，空闲时缩小"""
+        supplier = AdaptiveSlotSupplier(2, 12, target_queue_latency=0.5, initial=4)
+        for _ in range(4):
+            supplier.try_reserve_slot(None)
+            supplier.mark_slot_used(None)
+        for _ in range(10):
+            supplier.observe_queue_latency(2.0)
+        assert supplier.adjust() == 6
+        # 新增的上限立即可用
+        for _ in range(2):
+            assert supplier.try_reserve_slot(None) is not None
+            supplier.mark_slot_used(None)
+
+        for _ in range(10):
+            supplier.observe_queue_latency(2.0)
+        assert supplier.adjust() == 9
+
+        # 延迟高但未饱和：瓶颈不在本 Worker，不扩大
+        for _ in range(5):
+            supplier.release_slot(SimpleNamespace(slot_info="used", permit=None))
+        supplier.adjust()
+        supplier.observe_queue_latency(2.0)
+        assert supplier.adjust() == 9
+
+        # 空闲：逐步缩小到下限
+        for _ in range(50):
+            supplier.adjust()
+        assert supplier.limit == 2
+
+    def test_worker_options(self):
+        """测试固定参数与自动调优两种模式的 Worker 参数"""
+        from temporalio.worker import PollerBehaviorAutoscaling, PollerBehaviorSimpleMaximum
+
+        config = WorkerConfig(max_concurrent_activities=50, activity_task_pollers=8)
+        options = worker_options(config)
+        assert options["max_concurrent_activities"] == 50
+        assert options["activity_task_poller_behavior"] == PollerBehaviorSimpleMaximum(8)
+        assert "tuner" not in options
+
+        autotuner = ActivityAutotuner.from_config(config)
+        options = worker_options(config, autotuner)
+        assert "max_concurrent_activities" not in options
+        assert options["tuner"]._get_activity_task_slot_supplier() is autotuner.supplier
+        assert options["interceptors"] == [autotuner.interceptor]
+        assert options["activity_task_poller_behavior"] == PollerBehaviorAutoscaling(
+            maximum=20, initial=8
+        )
+        assert autotuner.supplier.limit == 50
+
+    def test_group_limit_caps_autotune(self):
+        """测试分组上限作为自动调优的上界"""
+        config = WorkerConfig(autotune_min_activities=10, autotune_max_activities=1000)
+        supplier = ActivityAutotuner.from_config(config, 20, maximum=20).supplier
+
+        for _ in range(20):
+            supplier.try_reserve_slot(None)
+            supplier.mark_slot_used(None)
+        supplier.observe_queue_latency(5.0)
+        assert supplier.adjust() == 20
+
+        small = ActivityAutotuner.from_config(config, 5, maximum=5).supplier
+        assert small.limit == 5
+        assert ActivityAutotuner.from_config(config).supplier._maximum == 1000
+
+
+class TestActivityRouting:
+    """Activity 任务队列路由测试"""
+
+    def test_groups_cover_all_activities(self):
+        """测试每个 Activity 恰好属于一个分组"""
+        from src.workers.main_worker import ACTIVITIES, ACTIVITY_GROUPS
+
+        router = ActivityRouter("main", ACTIVITY_GROUPS)
+        assert router.groups == ["robot", "facility", "notification", "llm"]
+        assert len(ACTIVITIES) == len({activity_name(fn) for fn in ACTIVITIES}) == 24
+        assert all(router.route(activity_name(fn)) for fn in ACTIVITIES)
+        assert router.route("open_door") == "main-facility"
+        assert router.route("wait_for_robot_task_completion") == "main-robot"
+        assert router.route("await_robot_task_completion") == "main-robot"
+        assert router.route("unknown") is None
+
+    def test_duplicate_activity_rejected(self):
+        """测试同一 Activity 不能出现在两个分组"""
+        from src.activities.facility import open_door
+
+        with pytest.raises(ValueError):
+            ActivityRouter("main", {"a": [open_door], "b": [open_door]})
+
+    def test_interceptor_fills_task_queue(self):
+        """测试工作流拦截器按名称填入任务队列，显式指定的队列不变"""
+        from src.workers.main_worker import ACTIVITY_GROUPS
+
+        started = []
+
+        class Next:
+            def start_activity(self, input):
+                started.append(input.task_queue)
+
+        interceptor = ActivityRouter("main", ACTIVITY_GROUPS).interceptor()
+        inbound = interceptor.workflow_interceptor_class(None)(None)
+        captured = {}
+        inbound.next = SimpleNamespace(init=lambda outbound: captured.update(outbound=outbound))
+        inbound.init(Next())
+        outbound = captured["outbound"]
+
+        outbound.start_activity(SimpleNamespace(activity="call_elevator", task_queue=None))
+        outbound.start_activity(SimpleNamespace(activity="analyze_exception", task_queue=None))
+        outbound.start_activity(SimpleNamespace(activity="open_door", task_queue="custom"))
+        outbound.start_activity(SimpleNamespace(activity="other", task_queue=None))
+        assert started == ["main-facility", "main-llm", "custom", None]
+
+    def test_split_queues_keep_main_queue_activities(self, monkeypatch):
+        """测试默认不拆分；拆分后主队列 Worker 仍执行开启前调度到主队列的 Activity"""
+        from src.core.config import get_config
+        from src.workers import main_worker
+
+        created = []
+        monkeypatch.setattr(
+            main_worker, "Worker", lambda client, **kwargs: created.append(kwargs)
+        )
+        config = get_config()
+        assert not WorkerConfig().split_activity_queues
+
+        monkeypatch.setattr(config.worker, "split_activity_queues", True)
+        main_worker.create_workers(None, config)
+
+        main = config.temporal.task_queue
+        assert [w["task_queue"] for w in created] == [
+            main, f"{main}-robot", f"{main}-facility", f"{main}-notification", f"{main}-llm",
+        ]
+        assert created[0]["activities"] == main_worker.ACTIVITIES
+
+    def test_local_activities(self, monkeypatch):
+        """测试指定的 Activity 改为本地 Activity；开启前启动的工作流仍走任务队列"""
+        from datetime import timedelta
+
+        from temporalio.worker import StartActivityInput
+
+        from src.workers import routing
+
+        calls = []
+
+        class Next:
+            def start_activity(self, input):
+                calls.append(("remote", input.activity, input.task_queue))
+
+            def start_local_activity(self, input):
+                calls.append(("local", input.activity, input.start_to_close_timeout))
+
+        interceptor = routing.ActivityRoutingInterceptor(
+            {"open_door": "main-facility"}, {"open_door"}
+        )
+        inbound = interceptor.workflow_interceptor_class(None)(None)
+        captured = {}
+        inbound.next = SimpleNamespace(init=lambda outbound: captured.update(outbound=outbound))
+        inbound.init(Next())
+
+        def start(patched):
+            monkeypatch.setattr(routing.workflow, "patched", lambda patch_id: patched)
+            captured["outbound"].start_activity(
+                StartActivityInput(
+                    activity="open_door",
+                    args=["door-1"],
+                    activity_id=None,
+                    task_queue=None,
+                    schedule_to_close_timeout=None,
+                    schedule_to_start_timeout=None,
+                    start_to_close_timeout=timedelta(seconds=30),
+                    heartbeat_timeout=None,
+                    retry_policy=None,
+                    cancellation_type=None,
+                    headers={},
+                    disable_eager_execution=False,
+                    versioning_intent=None,
+                    summary=None,
+                    event_groups=None,
+                    priority=None,
+                    arg_types=None,
+                    ret_type=None,
+                )
+            )
+
+        start(patched=True)
+        start(patched=False)
+        assert calls == [
+            ("local", "open_door", timedelta(seconds=30)),
+            ("remote", "open_door", "main-facility"),
+        ]
+
+
+class TestRobotTaskCompletions:
+    """机器人任务完成（事件驱动）测试"""
+
+    @pytest.fixture(params=["memory", "redis"])
+    def completions(self, request):
+        if request.param == "memory":
+            return RobotTaskCompletions(InMemoryCompletionRegistry())
+        fakeredis = pytest.importorskip("fakeredis")
+        from src.services.robot_completions import RedisCompletionRegistry
+
+        return RobotTaskCompletions(
+            RedisCompletionRegistry(fakeredis.FakeAsyncRedis(decode_responses=True))
+        )
+
+    @pytest.fixture
+    def client(self):
+        completed = []
+
+        class Handle:
+            def __init__(self, task_token):
+                self.task_token = task_token
+
+            async def complete(self, result):
+                completed.append((self.task_token, result))
+
+        return SimpleNamespace(
+            completed=completed,
+            get_async_activity_handle=lambda task_token: Handle(task_token),
+        )
+
+    async def test_completion_after_register(self, completions, client):
+        """测试登记后到达的完成事件完成对应 Activity，且只完成一次"""
+        assert await completions.register("task-1", b"token-1", 3600) is None
+
+        assert await completions.complete(client, "task-1", "completed", {"area": 150})
+        assert client.completed == [
+            (b"token-1", {"task_id": "task-1", "status": "completed", "result": {"area": 150}})
+        ]
+
+        # 重复投递：token 已取走，结果暂存而不再完成
+        assert not await completions.complete(client, "task-1", "completed")
+        assert len(client.completed) == 1
+
+    async def test_completion_before_register(self, completions, client):
+        """测试完成事件先于登记到达时，登记直接返回结果"""
+        assert not await completions.complete(client, "task-2", "failed", {"reason": "blocked"})
+
+        early = await completions.register("task-2", b"token-2", 3600)
+        assert early == {"task_id": "task-2", "status": "failed", "result": {"reason": "blocked"}}
+        assert client.completed == []
+
+    async def test_activity_completes_async(self, monkeypatch):
+        """测试事件驱动的等待 Activity 登记后以异步完成方式返回"""
+        from temporalio import activity
+        from temporalio.testing import ActivityEnvironment
+
+        from src.activities.robot import await_robot_task_completion
+        from src.services import robot_completions
+
+        completions = RobotTaskCompletions(InMemoryCompletionRegistry())
+        monkeypatch.setattr(robot_completions, "_robot_task_completions", completions)
+        env = ActivityEnvironment()
+
+        with pytest.raises(activity._CompleteAsyncError):
+            await env.run(await_robot_task_completion, "task-3", 60)
+        assert await completions._registry.peek("token:task-3") is not None
+
+        # 完成事件已先到达：直接返回
+        await completions._registry.put(
+            "result:task-4", {"task_id": "task-4", "status": "completed", "result": {}}, 60
+        )
+        result = await env.run(await_robot_task_completion, "task-4", 60)
+        assert result["status"] == "completed"
+
+    def test_worker_requires_shared_registry(self, monkeypatch):
+        """测试开启事件驱动而未开启 Redis 登记表时 Worker 拒绝启动"""
+        from src.core.config import get_config
+        from src.workers.main_worker import create_workers
+
+        config = get_config()
+        monkeypatch.setattr(config.worker, "robot_completion_async", True)
+        monkeypatch.setattr(config.redis, "robot_completions_enabled", False)
+
+        with pytest.raises(ValueError, match="REDIS_ROBOT_COMPLETIONS_ENABLED"):
+            create_workers(None, config)
+
+    async def test_registration_outlives_activity_timeout(self, monkeypatch):
+        """测试登记保留到 Activity 超时之后"""
+        import dataclasses
+        from datetime import timedelta
+
+        from temporalio import activity
+        from temporalio.testing import ActivityEnvironment
+
+        from src.activities.robot import await_robot_task_completion
+        from src.services import robot_completions
+
+        completions = RobotTaskCompletions(InMemoryCompletionRegistry())
+        monkeypatch.setattr(robot_completions, "_robot_task_completions", completions)
+        env = ActivityEnvironment()
+        env.info = dataclasses.replace(env.info, start_to_close_timeout=timedelta(hours=2))
+
+        with pytest.raises(activity._CompleteAsyncError):
+            await env.run(await_robot_task_completion, "task-5", 60)
+        deadline, _ = completions._registry._entries["token:task-5"]
+        assert deadline > time.monotonic() + 2 * 3600
+
+    async def test_workflow_wait_timeout_is_not_retried(self, monkeypatch):
+        """测试事件驱动等待超时返回 timeout 状态，且不重试"""
+        from temporalio.exceptions import ActivityError, TimeoutError, TimeoutType
+
+        from src.workflows import cleaning
+
+        calls = []
+
+        async def execute_activity(fn, args, **options):
+            calls.append(options)
+            error = ActivityError(
+                "activity timed out",
+                scheduled_event_id=1,
+                started_event_id=2,
+                identity="worker",
+                activity_type="await_robot_task_completion",
+                activity_id="1",
+                retry_state=None,
+            )
+            error.__cause__ = TimeoutError(
+                "timeout", type=TimeoutType.START_TO_CLOSE, last_heartbeat_details=[]
+            )
+            raise error
+
+        monkeypatch.setattr(cleaning.workflow, "execute_activity", execute_activity)
+        result = await cleaning.RobotCleaningWorkflow()._await_completion("task-6", 3600)
+
+        assert result == {"task_id": "task-6", "status": "timeout", "result": {}}
+        assert calls[0]["retry_policy"].maximum_attempts == 1
+        assert calls[0]["start_to_close_timeout"].total_seconds() == 3600
+
+
 class TestTaskDispatcherSingleton:
     """TaskDispatcher 单例测试"""
 
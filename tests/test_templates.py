@@ -155,6 +155,42 @@ class TestTemplateAPI:
         assert "edges" in data
         assert "variables" in data
 
+    def test_template_responses_follow_reload(self, client, tmp_path, monkeypatch):
+        """测试预序列化响应在模板文件修改并重新加载后更新"""
+        import json
+        import shutil
+
+        from src.services import template_service as module
+
+        shutil.copytree(TemplateService().templates_dir, tmp_path / "templates")
+        service = TemplateService(str(tmp_path / "templates"))
+        monkeypatch.setattr(module, "_template_service", service)
+        url = "/api/v1/templates/robot-cleaning-workflow"
+        assert client.get(url).json()["name"] == "机器人清洁工作流"
+
+        path = tmp_path / "templates" / "cleaning" / "robot-cleaning-workflow.json"
+        data = json.loads(path.read_text(encoding="utf-8"))
+        data["name"] = "已修改"
+        path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        # 重新加载前仍返回缓存的响应
+        assert client.get(url).json()["name"] == "机器人清洁工作流"
+
+        version = service.version
+        client.post("/api/v1/templates/reload")
+        assert service.version == version + 1
+        assert client.get(url).json()["name"] == "已修改"
+        listed = client.get("/api/v1/templates", params={"category": "cleaning"}).json()
+        assert [t["name"] for t in listed["templates"]] == ["已修改"]
+
+    def test_unknown_category_not_cached(self, client):
+        """测试未知分类的列表不进入预序列化缓存"""
+        from src.api.routes import templates
+
+        response = client.get("/api/v1/templates", params={"category": "no-such-category"})
+        assert response.status_code == 200
+        assert response.json()["total"] == 0
+        assert ("list", "no-such-category") not in templates._responses._bodies
+
     def test_get_nonexistent_template(self, client):
         """测试获取不存在的模板"""
         response = client.get("/api/v1/templates/nonexistent")